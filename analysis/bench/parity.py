@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import importlib
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.bench.synthetic import make_market
+from analysis.src.attribution import compute_attribution
+from analysis.src.build_frames import FrameBuilder
+from analysis.src.portfolio import compute_portfolio_returns
+from analysis.src.regimes import compute_regimes
+from analysis.src.rolling_model import run_rolling_ols
+
+# Engines share the reference signatures:
+#   rolling(frame, y_col, x_cols, window, min_nobs) -> exposures
+#   attribution(frame, exposures, y_col) -> attribution
+#   regimes(returns, vol_window_weeks, lookback_weeks, percentile) -> regimes
+REFERENCE: Dict[str, Callable[..., pd.DataFrame]] = {
+    "rolling": run_rolling_ols,
+    "attribution": compute_attribution,
+    "regimes": compute_regimes,
+}
+ENGINES: Dict[str, Dict[str, Callable[..., pd.DataFrame]]] = {kind: {} for kind in REFERENCE}
+
+# (atol, rtol) per kind; a value passes when |alt - ref| <= atol + rtol * |ref|.
+TOLERANCES: Dict[str, Tuple[float, float]] = {
+    "rolling": (1e-8, 1e-6),
+    "attribution": (1e-10, 1e-8),
+    "regimes": (1e-10, 1e-8),
+}
+
+
+def register_engine(kind: str, name: str, fn: Callable[..., pd.DataFrame]) -> None:
+    """Make `fn` an alternate `kind` engine checked against the reference."""
+    if kind not in REFERENCE:
+        raise ValueError(f"Unknown engine kind {kind!r}; expected one of {sorted(REFERENCE)}")
+    ENGINES[kind][name] = fn
+
+
+def load_engine(spec: str) -> None:
+    """Register an engine from "kind=package.module:function" (the CLI's --engine)."""
+    kind, sep, target = spec.partition("=")
+    module, colon, attr = target.partition(":")
+    if not sep or not colon:
+        raise ValueError(f"--engine expects kind=package.module:function, got {spec!r}")
+    register_engine(kind, target, getattr(importlib.import_module(module), attr))
+
+
+@dataclass
+class ParityCase:
+    kind: str
+    name: str
+    kwargs: Dict[str, Any] = field(repr=False)
+
+
+def make_cases(seed: int = 0, periods: int = 260, window: int = 52, min_nobs: int = 45) -> List[ParityCase]:
+    """
+    Shared inputs for every engine: a clean synthetic sleeve plus the edge
+    cases (scattered NaNs, histories shorter than / just past the window,
+    collinear regressors, exact zero returns in the explained_share
+    denominator).
+    """
+    market = make_market(8, periods, freq="W-FRI", seed=seed)
+    sleeve = market.sleeves[0]
+    frame = FrameBuilder(market.returns, market.factors, market.weights, market.sleeves).frame(sleeve.name)
+    x_cols = sleeve.x_cols(market.factor_set)
+    rng = np.random.default_rng(seed)
+
+    nans = frame.copy()
+    for col in nans.columns:
+        nans.loc[nans.index[rng.choice(len(nans), size=len(nans) // 40, replace=False)], col] = np.nan
+    collinear = frame.copy()
+    collinear["HML"] = 2.0 * collinear["SMB"]
+    zeros = frame.copy()
+    zeros.iloc[::7, zeros.columns.get_loc("Y")] = 0.0
+
+    frames = {
+        "base": frame,
+        "nans": nans,
+        "short": frame.iloc[: window - 1],
+        "just_past_window": frame.iloc[: window + 3],
+        "collinear": collinear,
+        "zero_returns": zeros,
+    }
+    cases = [
+        ParityCase("rolling", name, {"frame": f, "y_col": "Y", "x_cols": x_cols, "window": window, "min_nobs": min_nobs})
+        for name, f in frames.items()
+    ]
+    for name, f in frames.items():
+        try:  # every attribution engine sees the reference exposures
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # the collinear case is rank-deficient by design
+                exposures = run_rolling_ols(f, "Y", x_cols, window=window, min_nobs=min_nobs)
+        except Exception:
+            continue
+        cases.append(ParityCase("attribution", name, {"frame": f, "exposures": exposures, "y_col": "Y"}))
+
+    port = compute_portfolio_returns(market.returns, market.weights)
+    flat = port.copy()
+    flat.iloc[40:80] = 0.0
+    gappy = port.copy()
+    gappy.iloc[rng.choice(len(gappy), size=10, replace=False)] = np.nan
+    series = {"base": port, "nans": gappy, "zero_returns": flat, "short": port.iloc[:50]}
+    cases += [
+        ParityCase("regimes", name, {"returns": s, "vol_window_weeks": 8, "lookback_weeks": 52, "percentile": 0.75})
+        for name, s in series.items()
+    ]
+    return cases
+
+
+def _as_float(s: pd.Series) -> np.ndarray | None:
+    # object columns of numbers and pd.NA (e.g. explained_share) count as numeric
+    if pd.api.types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        return None
+    if not pd.api.types.is_numeric_dtype(s):
+        try:
+            s = pd.to_numeric(s)
+        except (TypeError, ValueError):
+            return None
+    return s.to_numpy(dtype=float, na_value=np.nan)
+
+
+def compare_frames(ref: pd.DataFrame, alt: pd.DataFrame, atol: float, rtol: float) -> dict:
+    """
+    Per-column max absolute / relative deviation of `alt` from `ref`. NaN in
+    both counts as equal; NaN in only one is a `nan_mismatch`. Non-numeric
+    columns (e.g. regime labels) must match exactly.
+    """
+    out: Dict[str, Any] = {
+        "rows": [len(ref), len(alt)],
+        "index_match": bool(ref.index.equals(alt.index)),
+        "missing_columns": [c for c in ref.columns if c not in alt.columns],
+        "extra_columns": [c for c in alt.columns if c not in ref.columns],
+        "columns": {},
+    }
+    passed = out["index_match"] and not out["missing_columns"]
+    if out["index_match"]:
+        for col in ref.columns.intersection(alt.columns, sort=False):
+            r, a = ref[col], alt[col]
+            rv, av = _as_float(r), _as_float(a)
+            if rv is not None and av is not None:
+                rn, an = np.isnan(rv), np.isnan(av)
+                both = ~rn & ~an
+                diff = np.abs(av[both] - rv[both])
+                scale = np.abs(rv[both])
+                rel = diff / np.where(scale > 0, scale, np.inf)
+                ok = diff <= atol + rtol * scale
+                stats = {
+                    "max_abs": float(diff.max()) if diff.size else 0.0,
+                    "max_rel": float(rel.max()) if rel.size else 0.0,
+                    "nan_mismatch": int((rn != an).sum()),
+                    "out_of_tolerance": int((~ok).sum()),
+                }
+            else:
+                rl, al = r.astype(str).where(r.notna(), ""), a.astype(str).where(a.notna(), "")
+                mism = int((rl.to_numpy() != al.to_numpy()).sum())
+                stats = {"max_abs": None, "max_rel": None, "nan_mismatch": 0, "out_of_tolerance": mism}
+            stats["passed"] = stats["nan_mismatch"] == 0 and stats["out_of_tolerance"] == 0
+            passed = passed and stats["passed"]
+            out["columns"][str(col)] = stats
+    out["passed"] = bool(passed)
+    return out
+
+
+def _timed(fn: Callable[..., pd.DataFrame], kwargs: dict, repeat: int) -> Tuple[Any, float, int]:
+    """(result or raised exception, best time, warnings raised per call)."""
+    best, result = float("inf"), None
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            try:
+                result = fn(**kwargs)
+            except Exception as exc:
+                return exc, time.perf_counter() - t0, len(caught)
+            best = min(best, time.perf_counter() - t0)
+    return result, best, len(caught) // repeat
+
+
+def check_engine(kind: str, name: str, fn: Callable[..., pd.DataFrame], cases: Sequence[ParityCase], repeat: int = 3, tolerances: Dict[str, Tuple[float, float]] | None = None) -> List[dict]:
+    """
+    Run the reference and `fn` on every `kind` case. A case passes when the
+    outputs agree within tolerance, or both raise the same exception type.
+    `speedup` is reference time / engine time (best of `repeat`).
+    """
+    atol, rtol = (tolerances or TOLERANCES)[kind]
+    report = []
+    for case in (c for c in cases if c.kind == kind):
+        ref, ref_s, ref_warn = _timed(REFERENCE[kind], case.kwargs, repeat)
+        alt, alt_s, alt_warn = _timed(fn, case.kwargs, repeat)
+        entry = {"kind": kind, "case": case.name, "engine": name, "reference_s": ref_s, "engine_s": alt_s}
+        entry["warnings"] = {"reference": ref_warn, "engine": alt_warn}
+        entry["speedup"] = ref_s / alt_s if alt_s > 0 else None
+        if isinstance(ref, Exception) or isinstance(alt, Exception):
+            same = type(ref) is type(alt)
+            entry.update(passed=same, error={"reference": repr(ref) if isinstance(ref, Exception) else None, "engine": repr(alt) if isinstance(alt, Exception) else None})
+        else:
+            entry.update(compare_frames(ref, alt, atol, rtol))
+        report.append(entry)
+    return report
+
+
+def run_parity(
+    engines: Dict[str, Dict[str, Callable[..., pd.DataFrame]]] | None = None,
+    repeat: int = 3,
+    seed: int = 0,
+    tolerances: Dict[str, Tuple[float, float]] | None = None,
+) -> dict:
+    """
+    Check every registered engine (default: `ENGINES`) against the
+    reference on the shared cases. With no alternates for a kind, the
+    reference is checked against itself, which confirms it is deterministic
+    and times it.
+    """
+    engines = ENGINES if engines is None else engines
+    cases = make_cases(seed=seed)
+    checks: List[dict] = []
+    for kind, reference in REFERENCE.items():
+        candidates = engines.get(kind) or {"reference": reference}
+        for name, fn in candidates.items():
+            checks += check_engine(kind, name, fn, cases, repeat=repeat, tolerances=tolerances)
+    return {"seed": seed, "tolerances": tolerances or TOLERANCES, "passed": all(c["passed"] for c in checks), "checks": checks}
+
+
+def format_parity(report: dict) -> str:
+    lines = [f"{'kind':<12} {'case':<17} {'engine':<28} {'max abs':>10} {'max rel':>10} {'speedup':>8}  result"]
+    for c in report["checks"]:
+        cols = c.get("columns", {}).values()
+        max_abs = max((s["max_abs"] for s in cols if s["max_abs"] is not None), default=None)
+        max_rel = max((s["max_rel"] for s in cols if s["max_rel"] is not None), default=None)
+        if c["passed"]:
+            result = "ok" if "error" not in c else "ok (both raised)"
+        else:
+            bad = [k for k, s in c.get("columns", {}).items() if not s["passed"]]
+            if "error" in c:
+                result = f"FAIL {c['error']}"
+            elif not c.get("index_match", True):
+                result = f"FAIL index differs (rows {c['rows'][0]} vs {c['rows'][1]})"
+            else:
+                result = f"FAIL {', '.join(bad + c.get('missing_columns', []))}"
+        fmt = lambda v: "-" if v is None else f"{v:.2e}"
+        speed = "-" if c["speedup"] is None else f"{c['speedup']:.2f}x"
+        lines.append(f"{c['kind']:<12} {c['case']:<17} {c['engine'][:28]:<28} {fmt(max_abs):>10} {fmt(max_rel):>10} {speed:>8}  {result}")
+    return "\n".join(lines)
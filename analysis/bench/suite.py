@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analysis.bench.synthetic import PERIODS_PER_YEAR, SyntheticMarket, make_market, write_market
+from analysis.src.attribution import compute_attribution
+from analysis.src.build_frames import FrameBuilder, build_frames, quality_report
+from analysis.src.config import get_config
+from analysis.src.export_json import export_json_bundle
+from analysis.src.portfolio import compute_portfolio_returns
+from analysis.src.profiling import rows
+from analysis.src.regimes import compute_regimes, summarize_regimes
+from analysis.src.rolling_model import run_rolling_ols
+from analysis.src.stages import site_meta
+
+CASES = (
+    "build_frames",
+    "compute_portfolio_returns",
+    "run_rolling_ols",
+    "compute_attribution",
+    "compute_regimes",
+    "export_json_bundle",
+)
+DEFAULT_TICKERS = (10, 100, 1000)
+DEFAULT_FREQS = ("W-FRI", "B")
+
+
+@dataclass(frozen=True)
+class Scale:
+    tickers: int
+    freq: str
+    years: int = 10
+
+    @property
+    def periods(self) -> int:
+        return self.years * PERIODS_PER_YEAR[self.freq]
+
+    @property
+    def label(self) -> str:
+        return f"{self.tickers}x{self.periods}{self.freq}"
+
+
+class _Fixture:
+    """
+    Inputs for every case at one scale, computed once and untimed: the
+    market on disk, its frames, exposures, attribution and regimes.
+    """
+
+    def __init__(self, market: SyntheticMarket, work: Path):
+        self.market = market
+        self.work = work
+        self.cfg = replace(
+            get_config(freq=market.freq, factor_set=market.factor_set),
+            tickers=tuple(market.returns.columns),
+            weights=market.weights,
+        )
+        self.paths = write_market(market, work / "data")
+        builder = FrameBuilder(
+            returns=market.returns,
+            factors=market.factors,
+            weights=market.weights,
+            sleeves=market.sleeves,
+            factor_set=market.factor_set,
+        )
+        self.frames = {s.name: builder.frame(s.name) for s in market.sleeves}
+        self.x_cols = market.sleeves[0].x_cols(market.factor_set)
+        self.exposures = {name: self.rolling(frame) for name, frame in self.frames.items()}
+        self.attribution = {name: compute_attribution(self.frames[name], exp) for name, exp in self.exposures.items()}
+        self.portfolio = compute_portfolio_returns(market.returns, market.weights)
+        self.regimes, self.regime_summary = summarize_regimes(
+            returns=market.returns,
+            exposures=self.exposures["equity_us"],
+            attribution=self.attribution["equity_us"],
+            vol_window_weeks=self.cfg.vol_window_weeks,
+            lookback_weeks=self.cfg.vol_lookback_weeks,
+            percentile=self.cfg.vol_percentile,
+            weights=market.weights,
+        )
+        self.quality = quality_report(market.returns, {k: len(v) for k, v in self.frames.items()})
+
+    def rolling(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return run_rolling_ols(frame, "Y", self.x_cols, window=self.cfg.rolling_window_weeks, min_nobs=self.cfg.min_nobs)
+
+    def case(self, name: str, attempt: int) -> Callable[[], Any]:
+        """A zero-argument call for one timed attempt (any per-attempt setup happens here)."""
+        m, cfg = self.market, self.cfg
+        if name == "build_frames":
+            factor_paths = {k.removeprefix("factors_"): p for k, p in self.paths.items() if k.startswith("factors_")}
+            out_dir = self.work / f"frames_{attempt}" / "data" / "frames"
+            return lambda: build_frames(self.paths["returns"], factor_paths, out_dir, m.weights, m.sleeves, factor_set=m.factor_set)
+        if name == "compute_portfolio_returns":
+            return lambda: compute_portfolio_returns(m.returns, m.weights)
+        if name == "run_rolling_ols":
+            return lambda: self.rolling(self.frames["equity_us"])
+        if name == "compute_attribution":
+            return lambda: compute_attribution(self.frames["equity_us"], self.exposures["equity_us"])
+        if name == "compute_regimes":
+            return lambda: compute_regimes(self.portfolio, cfg.vol_window_weeks, cfg.vol_lookback_weeks, cfg.vol_percentile)
+        if name == "export_json_bundle":
+            # a fresh directory per attempt: an unchanged re-export skips every write
+            out = self.work / f"site_{attempt}"
+            return lambda: export_json_bundle(
+                out_json_dir=out,
+                meta=site_meta(cfg),
+                exposures_us_path=self.exposures["equity_us"],
+                exposures_intl_path=self.exposures["equity_intl"],
+                attrib_us_path=self.attribution["equity_us"],
+                attrib_intl_path=self.attribution["equity_intl"],
+                regimes_path=self.regimes,
+                regime_summary_path=self.regime_summary,
+                quality_report_path=self.quality,
+                layout=cfg.export_layout,
+                arrow=cfg.export_arrow,
+            )
+        raise ValueError(f"Unknown benchmark case {name!r}; expected one of {list(CASES)}")
+
+
+def _time_case(fixture: _Fixture, name: str, repeat: int) -> dict:
+    times: List[float] = []
+    out = None
+    for attempt in range(repeat):
+        call = fixture.case(name, attempt)
+        t0 = time.perf_counter()
+        out = call()
+        times.append(time.perf_counter() - t0)
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "max_s": max(times),
+        "repeat": repeat,
+        "rows_out": rows(out) if isinstance(out, (pd.DataFrame, pd.Series)) else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(
+    scales: Sequence[Scale],
+    cases: Sequence[str] = CASES,
+    repeat: int = 3,
+    seed: int = 0,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """
+    Time each case at each scale on a seeded synthetic market. Every case
+    reports the best, median and worst of `repeat` attempts; setup (data
+    generation, upstream stages) is never timed.
+    """
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases {unknown}; expected some of {list(CASES)}")
+    results: Dict[str, dict] = {}
+    for scale in scales:
+        t0 = time.perf_counter()
+        market = make_market(scale.tickers, scale.periods, freq=scale.freq, seed=seed)
+        work = Path(tempfile.mkdtemp(prefix="bench-"))
+        try:
+            fixture = _Fixture(market, work)
+            log(f"[bench] {scale.label}: setup {time.perf_counter() - t0:.2f}s")
+            for name in cases:
+                timing = _time_case(fixture, name, repeat)
+                results[f"{name}[{scale.label}]"] = {
+                    "case": name,
+                    "tickers": scale.tickers,
+                    "freq": scale.freq,
+                    "periods": scale.periods,
+                    **timing,
+                }
+                log(f"[bench]   {name:<26} min {timing['min_s'] * 1000:9.1f} ms  median {timing['median_s'] * 1000:9.1f} ms")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "env": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def write_results(results: dict, path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25, min_delta_s: float = 0.005, metric: str = "min_s") -> List[dict]:
+    """
+    One row per benchmark key in either run. A case regresses when it is
+    slower than the baseline by more than `threshold` (a fraction) and by
+    more than `min_delta_s` seconds, so sub-millisecond jitter never flags.
+    """
+    cur, base = current["results"], baseline["results"]
+    out = []
+    for key in sorted(set(cur) | set(base)):
+        if key not in base:
+            out.append({"key": key, "status": "new", "current_s": cur[key][metric], "baseline_s": None, "ratio": None})
+            continue
+        if key not in cur:
+            out.append({"key": key, "status": "missing", "current_s": None, "baseline_s": base[key][metric], "ratio": None})
+            continue
+        c, b = cur[key][metric], base[key][metric]
+        ratio = c / b if b > 0 else float("inf")
+        if ratio > 1 + threshold and c - b > min_delta_s:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and b - c > min_delta_s:
+            status = "improved"
+        else:
+            status = "ok"
+        out.append({"key": key, "status": status, "current_s": c, "baseline_s": b, "ratio": ratio})
+    return out
+
+
+def format_comparison(rows_: List[dict]) -> str:
+    def ms(v):
+        return "-" if v is None else f"{v * 1000:.1f}"
+
+    width = max([len(r["key"]) for r in rows_] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline ms':>12}  {'current ms':>12}  {'ratio':>7}  status"]
+    for r in rows_:
+        ratio = "-" if r["ratio"] is None else f"{r['ratio']:.2f}x"
+        lines.append(f"{r['key']:<{width}}  {ms(r['baseline_s']):>12}  {ms(r['current_s']):>12}  {ratio:>7}  {r['status']}")
+    return "\n".join(lines)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.config import Sleeve, factor_columns
+
+PERIODS_PER_YEAR = {"W-FRI": 52, "B": 252}
+
+# Annualized vols in the calm state; stress multiplies every shock by STRESS_VOL.
+FACTOR_VOL = {"MKT_RF": 0.16, "SMB": 0.10, "HML": 0.10, "RMW": 0.07, "CMA": 0.07, "MOM": 0.14}
+IDIO_VOL = 0.20
+STRESS_VOL = 2.5
+RF_ANNUAL = 0.02
+# Expected regime durations in years (sets the per-period switching probabilities).
+CALM_YEARS = 2.0
+STRESS_YEARS = 0.5
+
+
+@dataclass
+class SyntheticMarket:
+    """
+    A seeded market with known structure: per-ticker returns are
+    rf + betas . factors + idiosyncratic noise, and every shock is scaled by a
+    two-state (calm/stress) Markov volatility regime.
+
+    The first half of the tickers loads on the "us" factors and forms the
+    equity_us sleeve; the rest loads on "dev_ex_us" (correlated with us) and
+    forms equity_intl. Weights are equal, so a sleeve's true beta is the mean
+    of its tickers' rows in `betas`.
+    """
+
+    returns: pd.DataFrame
+    factors: Dict[str, pd.DataFrame]
+    betas: pd.DataFrame
+    states: pd.Series
+    weights: Dict[str, float]
+    sleeves: Tuple[Sleeve, ...]
+    freq: str
+    factor_set: str
+
+    def sleeve_betas(self, name: str) -> pd.Series:
+        sleeve = next(s for s in self.sleeves if s.name == name)
+        return self.betas.loc[list(sleeve.tickers)].mean()
+
+
+def _regime_path(rng: np.random.Generator, periods: int, periods_per_year: int) -> np.ndarray:
+    leave = np.array([1.0 / (CALM_YEARS * periods_per_year), 1.0 / (STRESS_YEARS * periods_per_year)])
+    draws = rng.random(periods)
+    states = np.empty(periods, dtype=np.int8)
+    state = 0
+    for t in range(periods):
+        if draws[t] < leave[state]:
+            state = 1 - state
+        states[t] = state
+    return states
+
+
+def make_market(
+    n_tickers: int,
+    periods: int,
+    freq: str = "W-FRI",
+    seed: int = 0,
+    factor_set: str = "FF3",
+    start: str = "2010-01-01",
+) -> SyntheticMarket:
+    """Generate `n_tickers` x `periods` returns at `freq` ("W-FRI" or "B"); same seed, same market."""
+    if freq not in PERIODS_PER_YEAR:
+        raise ValueError(f"Unsupported frequency {freq!r}; expected one of {sorted(PERIODS_PER_YEAR)}")
+    if n_tickers < 2:
+        raise ValueError("Need at least 2 tickers (one per equity sleeve)")
+    ppy = PERIODS_PER_YEAR[freq]
+    rng = np.random.default_rng(seed)
+    cols = factor_columns(factor_set)
+    dates = pd.date_range(start, periods=periods, freq=freq, name="date")
+
+    states = _regime_path(rng, periods, ppy)
+    scale = np.where(states == 1, STRESS_VOL, 1.0)[:, None]
+    factor_vol = np.array([FACTOR_VOL[c] for c in cols]) / np.sqrt(ppy)
+    rf = np.full(periods, RF_ANNUAL / ppy)
+
+    f_us = rng.standard_normal((periods, len(cols))) * factor_vol * scale
+    f_dx = 0.7 * f_us + np.sqrt(1 - 0.7**2) * rng.standard_normal((periods, len(cols))) * factor_vol * scale
+    factors = {
+        region: pd.DataFrame(np.column_stack([f, rf]), index=dates, columns=[*cols, "RF"])
+        for region, f in (("us", f_us), ("dev_ex_us", f_dx))
+    }
+
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    betas = rng.uniform(-0.5, 0.8, (n_tickers, len(cols)))
+    betas[:, 0] = rng.uniform(0.6, 1.4, n_tickers)  # market loadings
+    n_us = n_tickers // 2
+    systematic = np.empty((periods, n_tickers))
+    systematic[:, :n_us] = f_us @ betas[:n_us].T
+    systematic[:, n_us:] = f_dx @ betas[n_us:].T
+    noise = rng.standard_normal((periods, n_tickers)) * (IDIO_VOL / np.sqrt(ppy)) * scale
+    returns = pd.DataFrame(rf[:, None] + systematic + noise, index=dates, columns=tickers)
+
+    sleeves = (
+        Sleeve("equity_us", tuple(tickers[:n_us]), target="excess", factors="us"),
+        Sleeve("equity_intl", tuple(tickers[n_us:]), target="excess", factors="dev_ex_us"),
+    )
+    return SyntheticMarket(
+        returns=returns,
+        factors=factors,
+        betas=pd.DataFrame(betas, index=tickers, columns=cols),
+        states=pd.Series(np.array(["calm", "stress"])[states], index=dates, name="regime"),
+        weights={t: 1.0 / n_tickers for t in tickers},
+        sleeves=sleeves,
+        freq=freq,
+        factor_set=factor_set,
+    )
+
+
+def write_market(market: SyntheticMarket, root: Path) -> Dict[str, Path]:
+    """Write the returns and factor tables as parquet under `root` (the layout `build_frames` reads)."""
+    (root / "factors").mkdir(parents=True, exist_ok=True)
+    paths = {"returns": root / "returns.parquet"}
+    market.returns.to_parquet(paths["returns"])
+    for region, df in market.factors.items():
+        paths[f"factors_{region}"] = root / "factors" / f"{region}.parquet"
+        df.to_parquet(paths[f"factors_{region}"])
+    return paths
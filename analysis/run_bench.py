@@ -0,0 +1,84 @@
+import argparse
+import json
+from pathlib import Path
+
+from analysis.bench.parity import format_parity, load_engine, run_parity
+from analysis.bench.suite import (
+    CASES,
+    DEFAULT_FREQS,
+    DEFAULT_TICKERS,
+    Scale,
+    compare,
+    format_comparison,
+    run_benchmarks,
+    write_results,
+)
+
+BENCH_DIR = Path(__file__).resolve().parent / "outputs" / "bench"
+
+
+def _csv(text: str) -> list[str]:
+    return [v.strip() for v in text.split(",") if v.strip()]
+
+
+def _report(current: dict, baseline_path: Path, threshold: float, min_delta: float) -> int:
+    rows = compare(current, json.loads(baseline_path.read_text()), threshold=threshold, min_delta_s=min_delta)
+    print(format_comparison(rows))
+    regressions = [r for r in rows if r["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {threshold:.0%} vs {baseline_path}")
+        return 1
+    print(f"No regressions beyond {threshold:.0%} vs {baseline_path}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on seeded synthetic markets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Time the cases at each scale and write a results JSON.")
+    run.add_argument("--tickers", default=",".join(map(str, DEFAULT_TICKERS)), help="Comma-separated ticker counts.")
+    run.add_argument("--freqs", default=",".join(DEFAULT_FREQS), help="Comma-separated frequencies (W-FRI, B).")
+    run.add_argument("--years", type=int, default=10, help="History length per scale.")
+    run.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases to time.")
+    run.add_argument("--repeat", type=int, default=3, help="Timed attempts per case (best and median are kept).")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--out", type=Path, default=BENCH_DIR / "latest.json")
+    run.add_argument("--save-baseline", action="store_true", help=f"Also save the results as {BENCH_DIR / 'baseline.json'}.")
+    run.add_argument("--baseline", type=Path, default=None, help="Compare against this baseline after running.")
+    run.add_argument("--threshold", type=float, default=0.25, help="Slowdown fraction that counts as a regression.")
+    run.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns smaller than this many seconds.")
+
+    cmp_ = sub.add_parser("compare", help="Compare a results JSON against a baseline; exit 1 on regressions.")
+    cmp_.add_argument("current", type=Path)
+    cmp_.add_argument("baseline", type=Path, nargs="?", default=BENCH_DIR / "baseline.json")
+    cmp_.add_argument("--threshold", type=float, default=0.25)
+    cmp_.add_argument("--min-delta", type=float, default=0.005)
+    par = sub.add_parser("parity", help="Check alternate engines against the reference implementations; exit 1 on a mismatch.")
+    par.add_argument("--engine", action="append", default=[], help="kind=package.module:function (kind: rolling, attribution, regimes; repeatable).")
+    par.add_argument("--repeat", type=int, default=3, help="Timed attempts per engine and case (best is kept).")
+    par.add_argument("--seed", type=int, default=0)
+    par.add_argument("--out", type=Path, default=BENCH_DIR / "parity.json")
+    args = parser.parse_args()
+
+    if args.command == "parity":
+        for spec in args.engine:
+            load_engine(spec)
+        report = run_parity(repeat=args.repeat, seed=args.seed)
+        print(format_parity(report))
+        print("Report:", write_results(report, args.out))
+        raise SystemExit(0 if report["passed"] else 1)
+    if args.command == "compare":
+        raise SystemExit(_report(json.loads(args.current.read_text()), args.baseline, args.threshold, args.min_delta))
+
+    scales = [Scale(int(n), freq, args.years) for freq in _csv(args.freqs) for n in _csv(args.tickers)]
+    results = run_benchmarks(scales, cases=_csv(args.cases), repeat=args.repeat, seed=args.seed)
+    print("Results:", write_results(results, args.out))
+    if args.save_baseline:
+        print("Baseline:", write_results(results, BENCH_DIR / "baseline.json"))
+    if args.baseline is not None:
+        raise SystemExit(_report(results, args.baseline, args.threshold, args.min_delta))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,183 +1,138 @@
 import argparse
+import json
+import resource
+import sys
+from dataclasses import replace
 
-from analysis.src.export_json import export_json_bundle
-from analysis.src.config import get_config
-from analysis.src.data_prices import fetch_prices_weekly
-from analysis.src.data_factors import fetch_all_factors
-from analysis.src.build_frames import build_frames
-from analysis.src.rolling_model import run_rolling_from_parquet
-from analysis.src.attribution import attribution_from_parquets
-from analysis.src.regimes import regimes_and_summary
-from analysis.src.portfolio import write_portfolio_summary
+from analysis.src import profiling
+from analysis.src.config import FACTOR_SETS, FREQ_PRESETS, factor_columns, get_config, get_sleeves
+
+# Only the standard library, config and profiling load at startup; stage modules
+# (pandas, pyarrow, statsmodels, yfinance, pydantic) load when a stage runs, so
+# --dry-run and runs that skip most stages start fast.
 
 def _print_config(cfg) -> None:
     print("CONFIG LOADED")
     print("Tickers:", cfg.tickers)
     print("Weights sum:", sum(cfg.weights.values()))
-    print("Frequency:", cfg.freq)
-    print("Rolling window:", cfg.rolling_window_weeks, "weeks | min_nobs:", cfg.min_nobs)
-    print("Regime:", f"vol_window={cfg.vol_window_weeks}w, p={cfg.vol_percentile}, lookback={cfg.vol_lookback_weeks}w")
+    print("Frequency:", cfg.freq, "| dtype:", cfg.dtype)
+    print("Factor set:", cfg.factor_set, factor_columns(cfg.factor_set))
+    print("Rolling window:", cfg.rolling_window_weeks, "periods | min_nobs:", cfg.min_nobs)
+    print("Regime:", f"vol_window={cfg.vol_window_weeks}, p={cfg.vol_percentile}, lookback={cfg.vol_lookback_weeks} periods")
     print("Output paths:", cfg.out_data, cfg.out_json, cfg.out_reports)
 
 
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS; RUSAGE_CHILDREN covers --jobs workers
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _report_memory(budget_mb: float | None) -> None:
+    peak_mb = _peak_rss_mb()
+    print(f"\nPeak RSS: {peak_mb:.1f} MB")
+    if budget_mb is not None and peak_mb > budget_mb:
+        raise SystemExit(f"Peak RSS {peak_mb:.1f} MB exceeded memory budget {budget_mb:.1f} MB")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run factor attribution pipeline.")
     parser.add_argument("--dry-run", action="store_true", help="Print config and exit.")
+    parser.add_argument("--plan", action="store_true", help="Print which stages would re-run and why, then exit (reads cached inputs only).")
+    parser.add_argument("--force", action="store_true", help="Re-run every stage even if its fingerprint is unchanged.")
+    parser.add_argument("--jobs", type=int, default=1, help="Run independent stages (sources, sleeves) on N worker processes.")
+    parser.add_argument("--profile", action="store_true", help="Time every stage/sub-step; write a trace + summary to outputs/reports.")
+    parser.add_argument("--freq", choices=sorted(FREQ_PRESETS), default=None, help="Pipeline frequency (W-FRI weekly, B daily).")
+    parser.add_argument("--factor-set", choices=sorted(FACTOR_SETS), default=None, help="Equity factor set (default FF3).")
+    parser.add_argument("--sleeves", default=None, help="Comma-separated sleeve names to build (default: all configured).")
+    parser.add_argument("--float32", action="store_true", help="Store return panels and frames as float32.")
+    parser.add_argument("--no-persist", action="store_true", help="Keep stage outputs in memory only (skip parquet copies).")
+    parser.add_argument("--export-layout", choices=("rows", "columnar"), default=None, help="Site JSON table layout (default rows).")
+    parser.add_argument("--export-decimals", type=int, default=None, help="Round exported floats to N decimals (default: full precision).")
+    parser.add_argument("--no-arrow", action="store_true", help="Skip the Arrow IPC copies of the site tables.")
+    parser.add_argument("--shard-by", default=None, help="Also export each table in shards: 'year' or a row count.")
+    parser.add_argument("--hashed-names", action="store_true", help="Put content hashes in exported file names.")
+    parser.add_argument("--exposures-cube", action="store_true", help="Also keep exposures for every sleeve and window in a memory-mapped cube.")
+    parser.add_argument("--comovement", action="store_true", help="Also build rolling pairwise correlations and per-ticker betas for the universe.")
+    parser.add_argument("--memory-budget-mb", type=float, default=None, help="Fail if peak RSS exceeds this budget.")
     args = parser.parse_args()
 
-    cfg = get_config()
+    cfg = get_config(freq=args.freq, dtype="float32" if args.float32 else None, factor_set=args.factor_set)
+    if args.export_layout:
+        cfg = replace(cfg, export_layout=args.export_layout)
+    if args.export_decimals is not None:
+        cfg = replace(cfg, export_decimals=args.export_decimals)
+    if args.no_arrow:
+        cfg = replace(cfg, export_arrow=False)
+    if args.shard_by:
+        cfg = replace(cfg, export_shard_by=args.shard_by)
+    if args.hashed_names:
+        cfg = replace(cfg, export_hashed_names=True)
+    if args.exposures_cube:
+        cfg = replace(cfg, exposures_cube=True)
+    if args.comovement:
+        cfg = replace(cfg, comovement=True)
+    sleeves = get_sleeves(cfg, args.sleeves.split(",") if args.sleeves else None)
     _print_config(cfg)
+    print("Sleeves:", [s.name for s in sleeves])
 
     if args.dry_run:
         return
 
-    # 1) Prices
-    print("\n[1/6] Fetching prices -> weekly returns (cached)")
-    price_out = fetch_prices_weekly(
-        tickers=cfg.tickers,
-        start=cfg.start,
-        end=cfg.end,
-        freq=cfg.freq,
-        cache_dir=cfg.out_data,
-        force=False,
-    )
-    print("Saved:", price_out)
-
-    # 2) Factors
-    print("\n[2/6] Fetching Fama-French factors (cached)")
-    factors_dir = cfg.out_data / "factors"
-    factors = fetch_all_factors(start=cfg.start, end=cfg.end, cache_dir=factors_dir, force=False)
-    print("Saved:", factors)
-
-    # 3) Frames
-    print("\n[3/6] Building model frames")
-    frames_dir = cfg.out_data / "frames"
-    frames = build_frames(
-        returns_path=price_out["weekly_returns"],
-        ff3_us_path=factors["ff3_us"],
-        ff3_devx_path=factors["ff3_dev_ex_us"],
-        out_dir=frames_dir,
-        weights=cfg.weights,
-        equity_us=cfg.equity_us,
-        equity_intl=cfg.equity_intl,
-        total_universe=cfg.tickers,
-    )
-    print("Saved frames:", frames)
-
-    # 3b) Portfolio summary
-    print("\n[3b/6] Portfolio summary")
-    summary_path = write_portfolio_summary(
-        returns_path=price_out["weekly_returns"],
-        out_path=cfg.out_reports / "portfolio_summary.json",
-        weights=cfg.weights,
-        freq=cfg.freq,
-        missing_price_policy="drop_any",
-        compounding="geometric",
-    )
-    print("Saved portfolio summary:", summary_path)
-
-    # 4) Rolling exposures
-    print("\n[4/6] Running rolling regressions -> exposures (cached)")
-    exposures_dir = cfg.out_data / "exposures"
-
-    exp_us = run_rolling_from_parquet(
-        frame_path=frames["frame_equity_us"],
-        out_path=exposures_dir / "exposures_equity_us.parquet",
-        window=cfg.rolling_window_weeks,
-        min_nobs=cfg.min_nobs,
-        y_col="Y",
-    )
-
-    exp_intl = run_rolling_from_parquet(
-        frame_path=frames["frame_equity_intl"],
-        out_path=exposures_dir / "exposures_equity_intl.parquet",
-        window=cfg.rolling_window_weeks,
-        min_nobs=cfg.min_nobs,
-        y_col="Y",
-    )
-
-    exp_macro = run_rolling_from_parquet(
-        frame_path=frames["frame_total_macro"],
-        out_path=exposures_dir / "exposures_total_macro.parquet",
-        window=cfg.rolling_window_weeks,
-        min_nobs=cfg.min_nobs,
-        y_col="Y",
-    )
-
-    print("Saved exposures:", exp_us, exp_intl, exp_macro)
-
-    # 5) Attribution
-    print("\n[5/6] Attribution (lagged exposures, no look-ahead)")
-    attrib_dir = cfg.out_data / "attribution"
-
-    a_us = attribution_from_parquets(
-        frame_path=frames["frame_equity_us"],
-        exposures_path=cfg.out_data / "exposures" / "exposures_equity_us.parquet",
-        out_path=attrib_dir / "attrib_equity_us.parquet",
-        y_col="Y",
-    )
-
-    a_intl = attribution_from_parquets(
-        frame_path=frames["frame_equity_intl"],
-        exposures_path=cfg.out_data / "exposures" / "exposures_equity_intl.parquet",
-        out_path=attrib_dir / "attrib_equity_intl.parquet",
-        y_col="Y",
-    )
-
-    a_macro = attribution_from_parquets(
-        frame_path=frames["frame_total_macro"],
-        exposures_path=cfg.out_data / "exposures" / "exposures_total_macro.parquet",
-        out_path=attrib_dir / "attrib_total_macro.parquet",
-        y_col="Y",
-    )
-
-    print("Saved attribution:", a_us, a_intl, a_macro)
-
-    # 6) Regimes
-    print("\n[6/6] Regime labeling + summary")
-    out_regimes = cfg.out_data / "regimes" / "regimes.parquet"
-    out_summary = cfg.out_reports / "regime_summary.json"
-    r_path, s_path = regimes_and_summary(
-        returns_path=cfg.out_data / "returns_weekly.parquet",
-        exposures_path=cfg.out_data / "exposures" / "exposures_equity_us.parquet",
-        attribution_path=cfg.out_data / "attribution" / "attrib_equity_us.parquet",
-        out_regimes_path=out_regimes,
-        out_summary_path=out_summary,
-        vol_window_weeks=cfg.vol_window_weeks,
-        lookback_weeks=cfg.vol_lookback_weeks,
-        percentile=cfg.vol_percentile,
-        weights=cfg.weights,
-    )
-    print("Saved regimes + summary:", r_path, s_path)
-    print("\nMilestone 3 complete if all files exist and no errors occurred.")
-    # 7) Export JSON for site (Milestone 4)
-    print("\n[7/7] Exporting JSON bundle for site")
-    meta = {
-        "tickers": list(cfg.tickers),
-        "weights": dict(cfg.weights),
-        "frequency": cfg.freq,
-        "rolling_window_weeks": cfg.rolling_window_weeks,
-        "min_nobs": cfg.min_nobs,
-        "factor_set": cfg.factor_set,
-        "regime": {
-            "vol_window_weeks": cfg.vol_window_weeks,
-            "percentile": cfg.vol_percentile,
-            "lookback_weeks": cfg.vol_lookback_weeks,
-        },
-    }
-
-    paths = export_json_bundle(
-        out_json_dir=cfg.site_public_data,
-        meta=meta,
-        exposures_us_path=cfg.out_data / "exposures" / "exposures_equity_us.parquet",
-        exposures_intl_path=cfg.out_data / "exposures" / "exposures_equity_intl.parquet",
-        attrib_us_path=cfg.out_data / "attribution" / "attrib_equity_us.parquet",
-        attrib_intl_path=cfg.out_data / "attribution" / "attrib_equity_intl.parquet",
-        regimes_path=cfg.out_data / "regimes" / "regimes.parquet",
-        regime_summary_path=cfg.out_reports / "regime_summary.json",
-        quality_report_path=cfg.out_reports / "quality_report.json",
-    )
-    print("Saved JSON:", paths)
+    from analysis.src.artifacts import ArtifactStore, write_generation
+    from analysis.src.dag import Pipeline
+    from analysis.src.stages import build_stages
+
+    pipeline = Pipeline(build_stages(cfg, sleeves))
+    if not {"equity_us", "equity_intl"} <= {s.name for s in sleeves}:
+        print("\nSkipping regimes + export: they need the equity_us and equity_intl sleeves.")
+
+    # Stage outputs stay in memory; parquet/JSON copies are written in the background.
+    # Stages whose fingerprint (code, config, input hashes) matches the last run are skipped.
+    print("\nPlan:" if args.plan else "\nRunning stages:")
+    profiling.enable(args.profile)
+    store = ArtifactStore(persist=not args.no_persist and not args.plan)
+    with profiling.span("pipeline", cat="run"):
+        try:
+            decisions = pipeline.execute(
+                cfg,
+                store,
+                state_path=cfg.out_data / "pipeline_state.json",
+                force=args.force,
+                plan_only=args.plan,
+                jobs=args.jobs,
+                profile=args.profile,
+            )
+        finally:
+            store.close()
+    ran = [d.stage for d in decisions if d.run]
+    print(f"\n{len(ran)} of {len(decisions)} stages {'would run' if args.plan else 'ran'}.")
+    if args.profile:
+        _write_profile(cfg, profiling.collect())
+    if not args.plan:
+        # source stages run every time; only the others write outputs the query service reads
+        sources = {s.name for s in pipeline.stages if s.always_run}
+        written = [name for name in ran if name not in sources] if store.persist else []
+        if written:
+            write_generation(cfg.out_data, written)  # after the profile too: it's attached to the manifest
+        _report_memory(args.memory_budget_mb)
+
+
+def _write_profile(cfg, events) -> None:
+    from analysis.src.export_json import attach_to_manifest
+
+    summary = profiling.summarize(events)
+    trace_path = profiling.write_trace(events, cfg.out_reports / "profile_trace.json")
+    (cfg.out_reports / "profile_summary.json").write_text(json.dumps(summary, indent=2))
+    table = profiling.format_table(summary)
+    (cfg.out_reports / "profile_summary.txt").write_text(table + "\n")
+    print("\nProfile:")
+    print(table)
+    print("Trace:", trace_path)
+    stages = [row for row in summary if row["kind"] == "stage"]
+    if attach_to_manifest(cfg.site_public_data, "profile", stages):
+        print("Attached stage profile to", cfg.site_public_data / "manifest.json")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,43 @@
+import argparse
+import signal
+import threading
+
+from analysis.src.config import get_config
+from analysis.src.query_service import QueryService, make_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve date-range, column and sleeve slices of the pipeline outputs from memory (local only)."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: loopback only).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="How often to check for a finished pipeline run.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    service = QueryService(cfg.out_data, cfg.site_public_data / "manifest.json")
+    server = make_server(service, args.host, args.port, verbose=args.verbose)
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=service.watch, args=(stop, args.poll_seconds), daemon=True)
+    watcher.start()
+
+    def _stop(signum, frame):
+        print(f"\n[serve] received signal {signum}, shutting down")
+        stop.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    host, port = server.server_address[:2]
+    print(f"[serve] http://{host}:{port}/tables  (reload check every {args.poll_seconds}s)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import json
+from pathlib import Path
+
+from analysis.src.config import FACTOR_SETS, FREQ_PRESETS, get_config, get_sleeves
+from analysis.src.sweep import expand_grid, run_sweep
+
+
+def _parse_value(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _parse_grid(items) -> dict:
+    grid = {}
+    for item in items:
+        key, sep, values = item.partition("=")
+        if not sep or not values:
+            raise SystemExit(f"--grid expects field=v1,v2,...; got {item!r}")
+        grid[key.strip()] = [_parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the model stages for many Config variants on one data load.")
+    parser.add_argument("--grid", action="append", default=[], help="field=v1,v2,... (repeatable; the cartesian product is swept).")
+    parser.add_argument("--variants", type=Path, default=None, help="JSON file with a list of override objects (e.g. weights).")
+    parser.add_argument("--name", default="sweep", help="Sweep name; outputs go to analysis/outputs/sweeps/<name>/.")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the variants.")
+    parser.add_argument("--force", action="store_true", help="Re-run every variant's stages.")
+    parser.add_argument("--freq", choices=sorted(FREQ_PRESETS), default=None, help="Pipeline frequency for the whole sweep.")
+    parser.add_argument("--factor-set", choices=sorted(FACTOR_SETS), default=None, help="Equity factor set for the whole sweep.")
+    parser.add_argument("--sleeves", default=None, help="Comma-separated sleeve names (default: all configured).")
+    args = parser.parse_args()
+
+    variants = expand_grid(_parse_grid(args.grid)) if args.grid else []
+    if args.variants is not None:
+        variants += json.loads(args.variants.read_text())
+    if not variants:
+        raise SystemExit("Nothing to sweep: pass --grid and/or --variants.")
+
+    cfg = get_config(freq=args.freq, factor_set=args.factor_set)
+    sleeves = get_sleeves(cfg, args.sleeves.split(",") if args.sleeves else None)
+    out_dir = cfg.root / "analysis" / "outputs" / "sweeps" / args.name
+    print(f"Sweeping {len(variants)} variants over sleeves {[s.name for s in sleeves]} -> {out_dir}")
+
+    index_path = run_sweep(cfg, sleeves, variants, out_dir, jobs=args.jobs, force=args.force)
+    index = json.loads(index_path.read_text())
+    failed = [v for v in index["variants"] if v["status"] != "ok"]
+    for v in index["variants"]:
+        if v["status"] == "ok":
+            print(f"  {v['variant']}: ran {len(v['stages_run'])} stages")
+        else:
+            print(f"  {v['variant']}: FAILED {v['error']}")
+    print("Comparison index:", index_path)
+    if failed:
+        raise SystemExit(f"{len(failed)} of {len(index['variants'])} variants failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import signal
+import threading
+
+from analysis.src.artifacts import ArtifactStore
+from analysis.src.config import FACTOR_SETS, FREQ_PRESETS, get_config, get_sleeves
+from analysis.src.watch import Watcher
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep the pipeline resident and recompute when new data lands.")
+    parser.add_argument("--poll-seconds", type=float, default=30.0, help="How often to check the cache for new bars.")
+    parser.add_argument("--refresh-seconds", type=float, default=None, help="Also re-download prices from the provider this often.")
+    parser.add_argument("--once", action="store_true", help="Run a single update and exit (e.g. from cron).")
+    parser.add_argument("--freq", choices=sorted(FREQ_PRESETS), default=None, help="Pipeline frequency (W-FRI weekly, B daily).")
+    parser.add_argument("--factor-set", choices=sorted(FACTOR_SETS), default=None, help="Equity factor set (default FF3).")
+    parser.add_argument("--sleeves", default=None, help="Comma-separated sleeve names (default: all configured).")
+    parser.add_argument("--float32", action="store_true", help="Store return panels and frames as float32.")
+    args = parser.parse_args()
+
+    cfg = get_config(freq=args.freq, dtype="float32" if args.float32 else None, factor_set=args.factor_set)
+    sleeves = get_sleeves(cfg, args.sleeves.split(",") if args.sleeves else None)
+    watcher = Watcher(cfg, sleeves, ArtifactStore(), refresh_seconds=args.refresh_seconds)
+
+    if args.once:
+        try:
+            watcher.update()
+        finally:
+            watcher.store.close()
+            watcher.write_status("stopped")
+        print(f"Updated through {watcher.status['last_bar']} in {watcher.status['last_cycle_seconds']}s")
+        return
+
+    stop = threading.Event()
+
+    def _stop(signum, frame):
+        print(f"\n[watch] received signal {signum}, shutting down")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[watch] polling every {args.poll_seconds}s; status -> {watcher.status_path}")
+    watcher.run(stop, poll_seconds=args.poll_seconds)
+
+
+if __name__ == "__main__":
+    main()
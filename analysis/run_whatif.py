@@ -0,0 +1,81 @@
+import argparse
+import json
+from pathlib import Path
+
+from analysis.src.config import FACTOR_SETS, FREQ_PRESETS, get_config, get_sleeves
+from analysis.src.whatif import WhatIf, max_deviation, move_weight, reference_run
+
+
+def _latest(df):
+    if df.empty:
+        return {}
+    row = df.iloc[-1]
+    return {"date": str(df.index[-1].date()), **{k: float(v) for k, v in row.items() if k.startswith(("alpha", "beta_", "r2"))}}
+
+
+def _summary(result) -> dict:
+    out = {
+        "weights": result.weights,
+        "elapsed_ms": round(result.elapsed_ms, 2),
+        "exposures": {name: _latest(df) for name, df in result.exposures.items()},
+        "attribution": {
+            name: {k: float(df[k].iloc[-1]) for k in ("cum_explained_return", "cum_residual_return")} if len(df) else {}
+            for name, df in result.attribution.items()
+        },
+    }
+    if result.regime_summary is not None:
+        out["regime_summary"] = result.regime_summary
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-weight the portfolio and see exposures, attribution and regime stats without a pipeline rerun.")
+    parser.add_argument("--move", action="append", default=[], help="FROM:TO:AMOUNT, e.g. QQQ:TLT:0.05 moves 5 points (repeatable).")
+    parser.add_argument("--set", action="append", default=[], help="TICKER=WEIGHT (repeatable; applied before --move).")
+    parser.add_argument("--freq", choices=sorted(FREQ_PRESETS), default=None, help="Pipeline frequency (W-FRI weekly, B daily).")
+    parser.add_argument("--factor-set", choices=sorted(FACTOR_SETS), default=None, help="Equity factor set (default FF3).")
+    parser.add_argument("--sleeves", default=None, help="Comma-separated sleeve names (default: all configured).")
+    parser.add_argument("--verify", action="store_true", help="Also run the full statsmodels path and report the largest deviation.")
+    parser.add_argument("--out", type=Path, default=None, help="Write base and scenario summaries as JSON.")
+    args = parser.parse_args()
+
+    cfg = get_config(freq=args.freq, factor_set=args.factor_set)
+    sleeves = get_sleeves(cfg, args.sleeves.split(",") if args.sleeves else None)
+    weights = dict(cfg.weights)
+    for item in args.set:
+        ticker, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects TICKER=WEIGHT; got {item!r}")
+        weights[ticker] = float(value)
+    for item in args.move:
+        parts = item.split(":")
+        if len(parts) != 3:
+            raise SystemExit(f"--move expects FROM:TO:AMOUNT; got {item!r}")
+        weights = move_weight(weights, parts[0], parts[1], float(parts[2]))
+
+    whatif = WhatIf.load(cfg, sleeves)
+    base, scenario = whatif.run(cfg.weights), whatif.run(weights)
+    print(f"Scenario computed in {scenario.elapsed_ms:.1f} ms")
+    changed = {t: (cfg.weights[t], w) for t, w in scenario.weights.items() if abs(w - cfg.weights[t]) > 1e-12}
+    for t, (old, new) in changed.items():
+        print(f"  {t}: {old:.4f} -> {new:.4f}")
+    for name in scenario.exposures:
+        b, s = _latest(base.exposures[name]), _latest(scenario.exposures[name])
+        print(f"{name} @ {s.get('date')}")
+        for k in (k for k in s if k != "date"):
+            print(f"  {k:<16} {b[k]:>10.4f} -> {s[k]:>10.4f}  ({s[k] - b[k]:+.4f})")
+    if scenario.regime_summary is not None:
+        print(f"stress fraction {base.regime_summary['stress_fraction']:.3f} -> {scenario.regime_summary['stress_fraction']:.3f}")
+
+    if args.verify:
+        full = reference_run(cfg, sleeves, whatif.returns, whatif.factors, weights)
+        deviation = max_deviation(scenario, full)
+        print(f"Full rerun took {full.elapsed_ms:.0f} ms; max abs deviation {max(deviation.values()):.2e}")
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps({"base": _summary(base), "scenario": _summary(scenario)}, indent=2))
+        print("Wrote", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from functools import reduce
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from analysis.src.validation import validate_dates
+
+
+def align_on_dates(
+    tables: Dict[str, pd.DataFrame],
+) -> Tuple[pd.DatetimeIndex, Dict[str, pd.DataFrame], Dict[str, int]]:
+    """
+    Restrict `tables` to the dates they all share.
+
+    Every index must be sorted and unique (checked), so the common axis is
+    an inner merge join: pandas walks monotonic indexes in one linear pass
+    rather than hashing them into sets. Returns (dates, aligned tables,
+    rows dropped per table).
+    """
+    for name, df in tables.items():
+        validate_dates(df.index, name)
+    dates = reduce(lambda a, b: a.join(b, how="inner"), (df.index for df in tables.values()))
+    aligned = {name: df.iloc[df.index.searchsorted(dates)] for name, df in tables.items()}
+    dropped = {name: int(len(tables[name]) - len(dates)) for name in tables}
+    return pd.DatetimeIndex(dates), aligned, dropped
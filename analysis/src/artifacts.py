@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analysis.src.profiling import span
+
+
+def normalize_index(df: pd.DataFrame) -> pd.DataFrame:
+    """Return `df` with a sorted DatetimeIndex, without copying when it already has one."""
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df = df.set_axis(pd.to_datetime(df.index))
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def write_parquet(df: pd.DataFrame, path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with span(f"write_parquet:{path.name}", rows_in=len(df)):
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=True), tmp)
+    tmp.replace(path)
+    return path
+
+
+def write_json(payload: Any, path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2))
+    tmp.replace(path)
+    return path
+
+
+GENERATION_FILE = "generation.json"
+
+
+def write_generation(out_data: Path, stages: List[str]) -> Path:
+    """
+    Bump the generation marker under `out_data`. Writers call it once a run's
+    outputs are on disk (after `ArtifactStore.flush`), so a reader keyed on
+    the marker, like the query service, never loads a half-written run.
+    """
+    path = out_data / GENERATION_FILE
+    try:
+        generation = int(json.loads(path.read_text())["generation"])
+    except (OSError, ValueError, KeyError, TypeError):
+        generation = 0
+    return write_json({"generation": generation + 1, "stages": stages}, path)
+
+
+def content_hash(value: Any) -> str:
+    """sha256 of an artifact's content: DataFrame values/index/columns/dtypes, or canonical JSON."""
+    h = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        h.update(json.dumps([[str(c), str(t)] for c, t in value.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    else:
+        h.update(json.dumps(value, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _load(path: Path) -> Any:
+    if path.suffix == ".json":
+        return json.loads(path.read_text())
+    return normalize_index(pd.read_parquet(path))
+
+
+class ArtifactStore:
+    """
+    In-process store for stage outputs.
+
+    Each table artifact is held once as a NumPy-backed DataFrame with a normalized
+    (sorted DatetimeIndex) index, so downstream stages get it without another
+    read_parquet / to_datetime / sort_index. JSON-like payloads (dicts) are held
+    as-is. `get` hands out the stored object itself; consumers must not mutate
+    it in place.
+
+    Persisting is optional. When enabled, tables go to parquet and payloads to
+    JSON on a background thread (pyarrow releases the GIL); `flush` waits for
+    the writes and re-raises any write error.
+    """
+
+    def __init__(self, persist: bool = True, max_workers: int = 2):
+        self.persist = persist
+        self._tables: Dict[str, Any] = {}
+        self._paths: Dict[str, Path] = {}
+        self._pending: List[Future] = []
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persist") if persist else None
+
+    def put(self, name: str, value: Any, path: Path | None = None) -> Any:
+        if isinstance(value, pd.DataFrame):
+            value = normalize_index(value)
+        self._tables[name] = value
+        if path is not None:
+            self._paths[name] = path
+            if self._pool is not None:
+                writer = write_parquet if isinstance(value, pd.DataFrame) else write_json
+                self._pending.append(self._pool.submit(writer, value, path))
+        return value
+
+    def register(self, name: str, path: Path) -> None:
+        """Point `name` at an artifact already on disk; it's loaded on first `get`."""
+        self._paths[name] = path
+
+    def get(self, name: str) -> Any:
+        if name not in self._tables:
+            if name not in self._paths:
+                raise KeyError(f"Unknown artifact {name!r}")
+            self._tables[name] = _load(self._paths[name])
+        return self._tables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tables or name in self._paths
+
+    def path(self, name: str) -> Path | None:
+        return self._paths.get(name)
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        for fut in pending:
+            fut.result()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
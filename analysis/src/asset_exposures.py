@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.config import Sleeve
+from analysis.src.rolling_model import rolling_ols_batch, window_sums
+
+
+def asset_fields(x_cols: Sequence[str]) -> List[str]:
+    """
+    Fields per (date, ticker). Only the coefficients (`linear_fields`) are
+    linear in y, so only they aggregate to portfolio level by a weighted sum.
+    """
+    return ["alpha", *(f"beta_{c}" for c in x_cols), "r2", "stderr_alpha", *(f"stderr_beta_{c}" for c in x_cols)]
+
+
+def linear_fields(x_cols: Sequence[str]) -> List[str]:
+    return ["alpha", *(f"beta_{c}" for c in x_cols)]
+
+
+def asset_factor_sources(tickers: Sequence[str], sleeves: Sequence[Sleeve]) -> Dict[str, str]:
+    """
+    Factor source per ticker: that of the first Fama-French sleeve holding it,
+    so every sleeve's holdings share the sleeve's regressors. Tickers only in
+    proxy sleeves (bonds, commodities, ...) use the first sleeve's source.
+    """
+    ff = [s for s in sleeves if s.factors != "proxies"]
+    if not ff:
+        raise ValueError("Per-asset exposures need at least one Fama-French sleeve")
+    sources: Dict[str, str] = {}
+    for s in ff:
+        for t in s.tickers:
+            sources.setdefault(t, s.factors)
+    return {t: sources.get(t, ff[0].factors) for t in tickers}
+
+
+def run_asset_rolling_ols(
+    returns: pd.DataFrame,
+    factors: Mapping[str, pd.DataFrame],
+    sources: Mapping[str, str],
+    x_cols: Sequence[str],
+    window: int,
+    min_nobs: int,
+) -> pd.DataFrame:
+    """
+    Rolling exposures of every ticker in `sources` (ticker -> factor source),
+    y = ticker return - RF, one batched pass per factor source.
+
+    Within a source, the rows are the dates with factors and at least one
+    ticker's return. Each ticker is fitted on its own windows: those where it
+    has a return on all `window` rows (its window observation count, as in
+    `comovement.rolling_comoments`); its other windows are NaN, so a late
+    listing or a gap doesn't cost the other tickers any dates. On the dates
+    where every held ticker has a fit, their windows cover the same rows, so a
+    sleeve's portfolio exposures there are exactly the weighted sum of its
+    holdings' (see `aggregate_exposures`, which drops the other dates).
+
+    Returns a date-indexed frame with (ticker, field) columns, ticker-major in
+    `sources` order: the dates x tickers x fields cube in wide form.
+    """
+    if window <= len(x_cols) + 1:
+        raise ValueError(f"Rolling window ({window}) must exceed regressors + intercept ({len(x_cols) + 1}).")
+    fields = asset_fields(x_cols)
+    parts = []
+    for source in dict.fromkeys(sources.values()):
+        tickers = [t for t, s in sources.items() if s == source]
+        missing = [t for t in tickers if t not in returns.columns]
+        if missing:
+            raise ValueError(f"Missing returns for: {missing}")
+        if source not in factors:
+            raise ValueError(f"No factor table for source {source!r}; have {sorted(factors)}")
+        df = pd.concat([returns[tickers], factors[source][[*x_cols, "RF"]]], axis=1, join="inner")
+        df = df.dropna(subset=[*x_cols, "RF"]).dropna(how="all", subset=tickers)
+        y = df[tickers].to_numpy(dtype=float) - df[["RF"]].to_numpy(dtype=float)
+        present = ~np.isnan(y)
+        fit = rolling_ols_batch(np.where(present, y, 0.0), df[list(x_cols)].to_numpy(dtype=float), window)
+        # (M, k, N) coef/stderr + (M, N) r2 -> (M, N, fields)
+        block = np.concatenate(
+            [fit["coef"].transpose(0, 2, 1), fit["r2"][:, :, None], fit["stderr"].transpose(0, 2, 1)], axis=2
+        )
+        # a ticker's window is fitted only if it has every row (the zero-filled gaps never count)
+        full = window_sums(present.astype(float), window) == window
+        block[~(full & (window >= min_nobs))] = np.nan
+        keep = ~np.isnan(block).all(axis=(1, 2))
+        block, dates = block[keep], df.index[window - 1 :][keep]
+        columns = pd.MultiIndex.from_product([tickers, fields], names=["ticker", "field"])
+        parts.append(pd.DataFrame(block.reshape(len(dates), len(tickers) * len(fields)), index=pd.DatetimeIndex(dates, name="date"), columns=columns))
+
+    panel = pd.concat(parts, axis=1).sort_index() if len(parts) > 1 else parts[0]
+    return panel.reindex(columns=pd.MultiIndex.from_product([list(sources), fields], names=["ticker", "field"]))
+
+
+@dataclass
+class ExposureCube:
+    """
+    Per-asset exposures as a dates x tickers x fields array (C-contiguous, so
+    a ticker or a date is a view). Build it once from the stage's panel;
+    every `aggregate` after that is a single contraction.
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: List[str]
+    fields: List[str]
+    values: np.ndarray
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame) -> "ExposureCube":
+        tickers = list(dict.fromkeys(panel.columns.get_level_values("ticker")))
+        fields = list(dict.fromkeys(panel.columns.get_level_values("field")))
+        values = np.ascontiguousarray(panel.to_numpy(dtype=float).reshape(len(panel), len(tickers), len(fields)))
+        return cls(pd.DatetimeIndex(panel.index, name="date"), tickers, fields, values)
+
+    def to_panel(self) -> pd.DataFrame:
+        columns = pd.MultiIndex.from_product([self.tickers, self.fields], names=["ticker", "field"])
+        return pd.DataFrame(self.values.reshape(len(self.dates), -1), index=self.dates, columns=columns)
+
+    def asset(self, ticker: str) -> pd.DataFrame:
+        """One holding's exposures (the drill-down view)."""
+        return pd.DataFrame(self.values[:, self.tickers.index(ticker), :], index=self.dates, columns=self.fields).dropna()
+
+    def weight_vector(self, weights: Mapping[str, float]) -> np.ndarray:
+        unknown = [t for t in weights if t not in self.tickers]
+        if unknown:
+            raise ValueError(f"No per-asset exposures for: {unknown}")
+        w = pd.Series(weights, dtype=float).reindex(self.tickers).fillna(0.0).to_numpy()
+        total = float(w.sum())
+        if total <= 0:
+            raise ValueError("Weights must sum to a positive value.")
+        return w / total
+
+    def aggregate(self, weights: Mapping[str, float]) -> pd.DataFrame:
+        """
+        Portfolio alpha and betas for `weights` (normalized to sum to 1) as a
+        tensor contraction over the ticker axis: no regression is re-run.
+        Dates where a weighted ticker has no exposures are dropped.
+        """
+        w = self.weight_vector(weights)
+        held = np.flatnonzero(w)
+        # unheld tickers are left out rather than weighted by 0 (0 * NaN is NaN)
+        block = self.values if len(held) == len(self.tickers) else self.values[:, held]
+        lin = [i for i, f in enumerate(self.fields) if f == "alpha" or f.startswith("beta_")]
+        values = np.matmul(w[held], block)[:, lin]  # one (tickers,) x (tickers, fields) product per date
+        out = pd.DataFrame(values, index=self.dates, columns=[self.fields[i] for i in lin])
+        return out.dropna()
+
+
+def aggregate_exposures(panel: pd.DataFrame, weights: Mapping[str, float]) -> pd.DataFrame:
+    """`ExposureCube.aggregate` straight from a `run_asset_rolling_ols` panel."""
+    return ExposureCube.from_panel(panel).aggregate(weights)
+
+
+def sleeve_exposures(cube: ExposureCube, sleeve: Sleeve, weights: Mapping[str, float]) -> pd.DataFrame:
+    """Portfolio exposures of a sleeve's holdings (weights restricted to `sleeve.tickers`)."""
+    if sleeve.factors == "proxies":
+        raise ValueError(f"Sleeve {sleeve.name}: proxy sleeves are not regressed on the per-asset factors")
+    return cube.aggregate({t: weights[t] for t in sleeve.tickers})
@@ -19,13 +19,8 @@ def compute_attribution(
     frame: columns [Y, X1, X2, ...] indexed by date
     exposures: columns [alpha, beta_X1, beta_X2, ...] indexed by date
     """
-    frame = frame.copy()
-    frame.index = pd.to_datetime(frame.index)
-    frame = frame.sort_index()
-
-    exposures = exposures.copy()
-    exposures.index = pd.to_datetime(exposures.index)
-    exposures = exposures.sort_index()
+    frame = frame.set_axis(pd.to_datetime(frame.index)).sort_index()
+    exposures = exposures.set_axis(pd.to_datetime(exposures.index)).sort_index()
 
     x_cols: List[str] = [c for c in frame.columns if c != y_col]
     exp_lag = exposures.shift(1)
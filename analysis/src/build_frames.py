@@ -1,117 +1,171 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Sequence, Tuple
 import json
 
 import pandas as pd
 
+from analysis.src.config import Sleeve
+from analysis.src.data_quality import coverage
 from analysis.src.portfolio import compute_portfolio_returns
-
-
-def _load_parquet(p: Path) -> pd.DataFrame:
-    df = pd.read_parquet(p)
-    df.index = pd.to_datetime(df.index)
-    return df.sort_index()
+from analysis.src.profiling import span
+from analysis.src.store import read_panel
 
 
 def _make_equal_weight_portfolio(returns: pd.DataFrame, tickers: Tuple[str, ...], weights: Dict[str, float]) -> pd.Series:
-    r = returns[list(tickers)].copy()
+    r = returns[list(tickers)]
     port = compute_portfolio_returns(r, weights={t: weights[t] for t in tickers}, missing_price_policy="drop_any")
     port.name = "PORT_RET"
     return port
 
 
+class FrameBuilder:
+    """
+    Builds sleeve frames on demand.
+
+    Only the tickers used by `sleeves` are read, and shared intermediates
+    (portfolio returns per ticker set, factor tables per source, aligned
+    portfolio/factor joins) are computed once and reused across sleeves.
+
+    `returns` and the values of `factors` (keyed by factor source, "us" /
+    "dev_ex_us") may be parquet/store paths or DataFrames already in memory.
+    """
+
+    def __init__(
+        self,
+        returns: Path | pd.DataFrame,
+        factors: Dict[str, Path | pd.DataFrame],
+        weights: Dict[str, float],
+        sleeves: Sequence[Sleeve],
+        dtype: str = "float64",
+        factor_set: str = "FF3",
+    ):
+        self.returns_source = returns
+        self.factor_sources = factors
+        self.weights = weights
+        self.sleeves = {s.name: s for s in sleeves}
+        self.dtype = dtype
+        self.factor_set = factor_set
+        self._returns: pd.DataFrame | None = None
+        self._portfolios: Dict[Tuple[str, ...], pd.Series] = {}
+        self._factors: Dict[str, pd.DataFrame] = {}
+        self._aligned: Dict[Tuple[Tuple[str, ...], str], pd.DataFrame] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def returns(self) -> pd.DataFrame:
+        if self._returns is None:
+            needed = list(dict.fromkeys(t for s in self.sleeves.values() for t in (*s.tickers, *s.proxies)))
+            self._returns = read_panel(self.returns_source, tickers=needed).astype(self.dtype)
+        return self._returns
+
+    def portfolio(self, tickers: Tuple[str, ...]) -> pd.Series:
+        key = tuple(tickers)
+        if key not in self._portfolios:
+            self._portfolios[key] = _make_equal_weight_portfolio(self.returns(), key, self.weights)
+        return self._portfolios[key]
+
+    def factors(self, source: str) -> pd.DataFrame:
+        if source not in self._factors:
+            if source not in self.factor_sources:
+                raise ValueError(f"No factor file for source {source!r}; have {sorted(self.factor_sources)}")
+            self._factors[source] = read_panel(self.factor_sources[source]).astype(self.dtype)
+        return self._factors[source]
+
+    def _aligned_with_factors(self, tickers: Tuple[str, ...], source: str) -> pd.DataFrame:
+        key = (tuple(tickers), source)
+        if key not in self._aligned:
+            # Align with factors by intersection of dates
+            self._aligned[key] = pd.concat([self.portfolio(tickers), self.factors(source)], axis=1, join="inner").dropna()
+        return self._aligned[key]
+
+    def frame(self, name: str) -> pd.DataFrame:
+        if name in self._frames:
+            return self._frames[name]
+        if name not in self.sleeves:
+            raise KeyError(f"Sleeve {name!r} was not requested; have {sorted(self.sleeves)}")
+        with span(f"frame:{name}") as sp:
+            frame = self._build(self.sleeves[name])
+            sp.set(rows_out=len(frame))
+        self._frames[name] = frame
+        return frame
+
+    def _build(self, sleeve: Sleeve) -> pd.DataFrame:
+        x_cols = sleeve.x_cols(self.factor_set)
+
+        if sleeve.factors == "proxies":
+            # y = portfolio return, X = macro proxies (ETF returns) on the same dates
+            rets = self.returns()
+            missing = [p for p in sleeve.proxies if p not in rets.columns]
+            if missing:
+                raise ValueError(f"Missing macro proxy returns for: {missing}")
+            df = pd.concat([self.portfolio(sleeve.tickers), rets[list(sleeve.proxies)]], axis=1, join="inner").dropna()
+        else:
+            df = self._aligned_with_factors(sleeve.tickers, sleeve.factors)
+
+        if sleeve.target == "excess":
+            y = df["PORT_RET"] - df["RF"]
+        else:
+            y = df["PORT_RET"]
+        return pd.concat([y.rename("Y"), df[x_cols]], axis=1).astype(self.dtype)
+
+
 def build_frames(
     returns_path: Path,
-    ff3_us_path: Path,
-    ff3_devx_path: Path,
+    factor_paths: Dict[str, Path],
     out_dir: Path,
     weights: Dict[str, float],
-    equity_us: Tuple[str, ...],
-    equity_intl: Tuple[str, ...],
-    total_universe: Tuple[str, ...],
+    sleeves: Sequence[Sleeve],
+    dtype: str = "float64",
+    factor_set: str = "FF3",
 ) -> Dict[str, Path]:
+    """
+    Build and write frame_<sleeve>.parquet (Y + regressors) for the requested sleeves only.
+    Equity frames regress on the `factor_set` columns; frames are stored as
+    `dtype` ("float32" halves their footprint).
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rets = _load_parquet(returns_path)
-
-    ff_us = _load_parquet(ff3_us_path)
-    ff_dx = _load_parquet(ff3_devx_path)
-
-    # Portfolio returns
-    port_total = _make_equal_weight_portfolio(rets, total_universe, weights)
-    port_us = _make_equal_weight_portfolio(rets, equity_us, weights)
-    port_intl = _make_equal_weight_portfolio(rets, equity_intl, weights)
-
-    # Align with factors by intersection of dates
-    # Equity US frame: y = (port_us - RF_us), X = US factors (MKT_RF, SMB, HML)
-    df_us = pd.concat([port_us, ff_us], axis=1, join="inner").dropna()
-    df_us["Y"] = df_us["PORT_RET"] - df_us["RF"]
-    frame_us = df_us[["Y", "MKT_RF", "SMB", "HML"]].copy()
-
-    # Equity Intl frame: y = (port_intl - RF_devx), X = Dev ex US factors
-    df_dx = pd.concat([port_intl, ff_dx], axis=1, join="inner").dropna()
-    df_dx["Y"] = df_dx["PORT_RET"] - df_dx["RF"]
-    frame_dx = df_dx[["Y", "MKT_RF", "SMB", "HML"]].copy()
-
-    # Total macro driver frame: y = total portfolio return, X = macro proxies (ETF returns)
-    # Macro proxies chosen from within universe; keep it transparent.
-    proxies = ["SPY", "TLT", "DBC", "GLD", "VNQ"]
-    missing = [p for p in proxies if p not in rets.columns]
-    if missing:
-        raise ValueError(f"Missing macro proxy returns for: {missing}")
-
-    # Align y and X on same dates
-    df_macro = pd.concat([port_total, rets[proxies]], axis=1, join="inner").dropna()
-    df_macro = df_macro.rename(columns={"PORT_RET": "Y"})
-    # regressors are proxy returns
-    frame_macro = df_macro[["Y"] + proxies].copy()
-
-    # Write frames
-    p_us = out_dir / "frame_equity_us.parquet"
-    p_dx = out_dir / "frame_equity_intl.parquet"
-    p_macro = out_dir / "frame_total_macro.parquet"
-    p_model = out_dir / "model_frame.parquet"
-    frame_us.to_parquet(p_us)
-    frame_dx.to_parquet(p_dx)
-    frame_macro.to_parquet(p_macro)
-    frame_us.to_parquet(p_model)
-
-    report_dir = out_dir.parent.parent / "reports"
-    report_dir.mkdir(parents=True, exist_ok=True)
-    report_path = report_dir / "quality_report.json"
+    builder = FrameBuilder(
+        returns=returns_path,
+        factors=factor_paths,
+        weights=weights,
+        sleeves=sleeves,
+        dtype=dtype,
+        factor_set=factor_set,
+    )
+
+    paths: Dict[str, Path] = {}
+    sizes: Dict[str, int] = {}
+    for sleeve in sleeves:
+        frame = builder.frame(sleeve.name)
+        p = out_dir / f"frame_{sleeve.name}.parquet"
+        frame.to_parquet(p)
+        paths[f"frame_{sleeve.name}"] = p
+        sizes[sleeve.name] = int(frame.shape[0])
+
+    report_path = write_quality_report(builder.returns(), sizes, out_dir.parent.parent / "reports" / "quality_report.json")
+    paths["quality_report"] = report_path
+    return paths
+
+
+def quality_report(rets: pd.DataFrame, aligned_sample_sizes: Dict[str, int]) -> dict:
     missing_pct = (rets.isna().mean() * 100).round(2).to_dict()
-    coverage = {}
-    for t in rets.columns:
-        s = rets[t].dropna()
-        coverage[t] = {
-            "start": str(s.index.min().date()) if not s.empty else None,
-            "end": str(s.index.max().date()) if not s.empty else None,
-            "rows_non_missing": int(s.shape[0]),
-        }
-
     report = {
         "missing_pct_weekly_returns": missing_pct,
-        "coverage": coverage,
-        "aligned_sample_sizes": {
-            "equity_us": int(frame_us.shape[0]),
-            "equity_intl": int(frame_dx.shape[0]),
-            "total_macro": int(frame_macro.shape[0]),
-            "model_frame": int(frame_us.shape[0]),
-        },
+        "coverage": coverage(rets),
+        "aligned_sample_sizes": aligned_sample_sizes,
         "notes": {
-            "returns": "Weekly simple returns from weekly prices.",
-            "factors": "Fama-French factors in decimals, weekly compounded.",
+            "returns": "Simple returns from period-end prices.",
+            "factors": "Fama-French daily factors in decimals, compounded to the pipeline frequency.",
             "alignment": "Frames use inner-join on dates and drop NaNs.",
         },
     }
-    report_path.write_text(json.dumps(report, indent=2))
+    return report
 
-    return {
-        "frame_equity_us": p_us,
-        "frame_equity_intl": p_dx,
-        "frame_total_macro": p_macro,
-        "model_frame": p_model,
-        "quality_report": report_path,
-    }
+
+def write_quality_report(rets: pd.DataFrame, aligned_sample_sizes: Dict[str, int], report_path: Path) -> Path:
+    report = quality_report(rets, aligned_sample_sizes)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2))
+    return report_path
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.rolling_model import window_sums
+
+# On-disk layout of a pairwise store directory: `pairwise.json` is the header
+# with the dates, tickers, window and the data file of each kind,
+# `cov.<generation>.f32` and `corr.<generation>.f32`: raw C-order float32
+# arrays of shape (dates, N * (N + 1) / 2), each row the upper triangle
+# (diagonal included) of one date's N x N matrix, row-major. A rewrite goes
+# to the next generation's files and swaps the header last.
+PAIRWISE_VERSION = 1
+KINDS = ("cov", "corr")
+
+
+def _data_files(out_dir: Path, header: dict) -> Dict[str, Path]:
+    # stores written before the header named its data files used `<kind>.f32`
+    names = header.get("files") or {}
+    return {kind: out_dir / names.get(kind, f"{kind}.f32") for kind in KINDS}
+
+
+def store_files(out_dir: Path) -> List[Path]:
+    """The header and data files a pairwise store under `out_dir` consists of."""
+    out_dir = Path(out_dir)
+    header_path = out_dir / "pairwise.json"
+    if not header_path.exists():
+        return [header_path]
+    return [header_path, *_data_files(out_dir, json.loads(header_path.read_text())).values()]
+
+
+def triangle_index(n: int) -> np.ndarray:
+    """(n, n) positions into a packed upper triangle (symmetric: [i, j] == [j, i])."""
+    i, j = np.triu_indices(n)
+    out = np.empty((n, n), dtype=np.int64)
+    out[i, j] = np.arange(len(i))
+    out[j, i] = out[i, j]
+    return out
+
+
+def unpack_triangle(packed: np.ndarray, n: int) -> np.ndarray:
+    return np.asarray(packed)[triangle_index(n)]
+
+
+def rolling_comoments(a: np.ndarray, b: np.ndarray, window: int, min_periods: int) -> Dict[str, np.ndarray]:
+    """
+    Rolling pairwise-complete moments of every column of `a` (T, ka) with
+    every column of `b` (T, kb), for windows ending at rows window-1 .. T-1:
+    observation counts, covariance and each side's variance over the rows
+    where both are present (ddof=1), as pandas' rolling cov/corr compute
+    them. Windows with fewer than `min_periods` shared rows are NaN.
+
+    The windowed cross-product sums come from prefix sums, so the cost is
+    one pass over T x ka x kb, and memory is a few (T, ka, kb) arrays:
+    callers bound it by passing column blocks. Columns are centred on their
+    full-sample means first, which leaves the moments unchanged and keeps
+    the prefix sums small.
+    """
+    a = a - np.nanmean(a, axis=0)
+    b = b - np.nanmean(b, axis=0)
+    ma, mb = ~np.isnan(a), ~np.isnan(b)
+    a, b = np.where(ma, a, 0.0), np.where(mb, b, 0.0)
+    sab = window_sums(a[:, :, None] * b[:, None, :], window)
+    if ma.all() and mb.all():
+        # no gaps: every per-side sum is shared by all pairs
+        n = np.full(sab.shape, float(window))
+        sa, saa = (window_sums(v, window)[:, :, None] for v in (a, a * a))
+        sb, sbb = (window_sums(v, window)[:, None, :] for v in (b, b * b))
+    else:
+        fa, fb = ma.astype(float), mb.astype(float)
+        n = window_sums(fa[:, :, None] * fb[:, None, :], window)
+        sa = window_sums(a[:, :, None] * fb[:, None, :], window)
+        saa = window_sums((a * a)[:, :, None] * fb[:, None, :], window)
+        sb = window_sums(fa[:, :, None] * b[:, None, :], window)
+        sbb = window_sums(fa[:, :, None] * (b * b)[:, None, :], window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sab - sa * sb / n) / (n - 1)
+        var_a = np.clip((saa - sa * sa / n) / (n - 1), 0.0, None)
+        var_b = np.clip((sbb - sb * sb / n) / (n - 1), 0.0, None)
+    short = n < max(min_periods, 2)
+    for arr in (cov, var_a, var_b):
+        arr[short] = np.nan
+    return {"n": n, "cov": cov, "var_a": var_a, "var_b": var_b}
+
+
+def _corr(m: Dict[str, np.ndarray]) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return m["cov"] / np.sqrt(m["var_a"] * m["var_b"])
+
+
+def iter_pairwise_blocks(
+    values: np.ndarray, window: int, min_periods: int, block: int
+) -> Iterator[Tuple[slice, slice, np.ndarray, np.ndarray]]:
+    """
+    (rows, cols, cov, corr) per pair of ticker blocks on or above the block
+    diagonal; cov and corr are (windows, len(rows), len(cols)). Peak memory
+    is set by `block`, not by the number of tickers.
+    """
+    n = values.shape[1]
+    starts = range(0, n, block)
+    for i in starts:
+        rows = slice(i, min(i + block, n))
+        for j in (s for s in starts if s >= i):
+            cols = slice(j, min(j + block, n))
+            m = rolling_comoments(values[:, rows], values[:, cols], window, min_periods)
+            yield rows, cols, m["cov"], _corr(m)
+
+
+def write_pairwise_store(
+    out_dir: Path,
+    returns: pd.DataFrame,
+    window: int,
+    min_periods: int,
+    block: int = 32,
+    regimes: pd.Series | None = None,
+) -> dict:
+    """
+    Rolling covariance and correlation of every pair of `returns` columns,
+    written block by block to a pairwise store under `out_dir` (replacing
+    any previous one). With `regimes` (a label per date), also averages the
+    correlation matrices over the dates in each regime.
+
+    Returns the header plus `regime_corr` ({label: {"dates": n, "corr":
+    packed triangle}}) when `regimes` is given.
+    """
+    if window < 2:
+        raise ValueError(f"Rolling window ({window}) must be at least 2.")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tickers = [str(c) for c in returns.columns]
+    n, T = len(tickers), len(returns)
+    dates = returns.index[window - 1 :] if T >= window else returns.index[:0]
+    size = n * (n + 1) // 2
+    index = triangle_index(n)
+
+    labels = None
+    if regimes is not None:
+        labels = regimes.reindex(dates).astype(object).to_numpy()
+        groups = {str(r): labels == r for r in pd.unique(labels[pd.notna(labels)])}
+        sums = {r: np.zeros(size) for r in groups}
+        counts = {r: np.zeros(size) for r in groups}
+
+    # written to the next generation's files; the header swap at the end publishes them
+    header_path = out_dir / "pairwise.json"
+    try:
+        previous = json.loads(header_path.read_text())
+    except (OSError, ValueError):
+        previous = None
+    generation = previous.get("generation", 0) + 1 if previous else 1
+    targets = {kind: out_dir / f"{kind}.{generation}.f32" for kind in KINDS}
+    files = {}
+    if len(dates) and size:
+        files = {kind: np.memmap(targets[kind], dtype=np.float32, mode="w+", shape=(len(dates), size)) for kind in KINDS}
+        values = returns.to_numpy(dtype=float)
+        for rows, cols, cov, corr in iter_pairwise_blocks(values, window, min_periods, block):
+            pos = index[rows, cols]
+            keep = np.arange(rows.start, rows.stop)[:, None] <= np.arange(cols.start, cols.stop)[None, :]
+            pos = pos[keep]
+            files["cov"][:, pos] = cov[:, keep]
+            files["corr"][:, pos] = corr[:, keep]
+            if labels is not None:
+                for r, mask in groups.items():
+                    part = corr[mask][:, keep]
+                    sums[r][pos] += np.nansum(part, axis=0)
+                    counts[r][pos] += np.sum(~np.isnan(part), axis=0)
+
+    for kind in KINDS:
+        if kind in files:
+            files.pop(kind).flush()
+        else:
+            targets[kind].write_bytes(b"")
+
+    header = {
+        "version": PAIRWISE_VERSION,
+        "dtype": "float32",
+        "layout": "upper-triangle-row-major",
+        "window": int(window),
+        "min_periods": int(min_periods),
+        "dates": [str(pd.Timestamp(d).date()) for d in dates],
+        "tickers": tickers,
+        "generation": generation,
+        "files": {kind: target.name for kind, target in targets.items()},
+    }
+    tmp = header_path.with_name(header_path.name + ".tmp")
+    tmp.write_text(json.dumps(header, indent=2))
+    tmp.replace(header_path)
+    if previous:
+        # readers that mapped the old files keep their mappings; new readers follow the header
+        for stale in _data_files(out_dir, previous).values():
+            if stale not in targets.values():
+                stale.unlink(missing_ok=True)
+    if labels is None:
+        return header
+    with np.errstate(invalid="ignore"):
+        regime_corr = {r: {"dates": int(groups[r].sum()), "corr": sums[r] / np.where(counts[r] > 0, counts[r], np.nan)} for r in groups}
+    return {**header, "regime_corr": regime_corr}
+
+
+class PairwiseStore:
+    """
+    A pairwise store mapped read-only: `matrix(date)` unpacks one date's
+    N x N matrix, `pair(a, b)` is a strided view down the date axis.
+    """
+
+    def __init__(self, path: Path, header: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.dates = pd.DatetimeIndex(header["dates"], name="date")
+        self.tickers: List[str] = header["tickers"]
+        self.index = triangle_index(len(self.tickers))
+
+    @classmethod
+    def open(cls, path: Path) -> "PairwiseStore":
+        path = Path(path)
+        header = json.loads((path / "pairwise.json").read_text())
+        if header.get("version") != PAIRWISE_VERSION:
+            raise ValueError(f"{path}: unsupported pairwise store version {header.get('version')!r}")
+        n = len(header["tickers"])
+        shape = (len(header["dates"]), n * (n + 1) // 2)
+        arrays = {
+            kind: np.memmap(data, dtype=header["dtype"], mode="r", shape=shape)
+            if shape[0] and shape[1]
+            else np.empty(shape, dtype=header["dtype"])
+            for kind, data in _data_files(path, header).items()
+        }
+        return cls(path, header, arrays)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _row(self, date) -> int:
+        i = int(self.dates.searchsorted(pd.Timestamp(date), "right")) - 1
+        if i < 0:
+            raise KeyError(f"No rows on or before {date}")
+        return i
+
+    def matrix(self, date=None, kind: str = "corr") -> pd.DataFrame:
+        """The N x N matrix at the last date on or before `date` (default: the latest)."""
+        i = len(self) - 1 if date is None else self._row(date)
+        values = np.asarray(self.arrays[kind][i], dtype=float)[self.index]
+        return pd.DataFrame(values, index=self.tickers, columns=self.tickers)
+
+    def pair(self, a: str, b: str, kind: str = "corr") -> pd.Series:
+        col = self.index[self.tickers.index(a), self.tickers.index(b)]
+        return pd.Series(self.arrays[kind][:, col], index=self.dates, name=f"{a}|{b}")
+
+
+def rolling_betas(
+    returns: pd.DataFrame, benchmarks: pd.DataFrame, window: int, min_periods: int, block: int = 32
+) -> pd.DataFrame:
+    """
+    Rolling univariate beta of every `returns` column on every `benchmarks`
+    column (cov / benchmark variance over the pairwise-complete rows), as a
+    date-indexed frame with (ticker, "beta_<benchmark>") columns.
+    """
+    index = returns.index
+    x = returns.to_numpy(dtype=float)
+    y = benchmarks.reindex(index).to_numpy(dtype=float)
+    dates = index[window - 1 :] if len(index) >= window else index[:0]
+    out = np.full((len(dates), x.shape[1], y.shape[1]), np.nan)
+    if len(dates):
+        for i in range(0, x.shape[1], block):
+            m = rolling_comoments(x[:, i : i + block], y, window, min_periods)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[:, i : i + block] = m["cov"] / np.where(m["var_b"] > 0, m["var_b"], np.nan)
+    fields = [f"beta_{c}" for c in benchmarks.columns]
+    columns = pd.MultiIndex.from_product([[str(c) for c in returns.columns], fields], names=["ticker", "field"])
+    return pd.DataFrame(out.reshape(len(dates), -1), index=pd.DatetimeIndex(dates, name="date"), columns=columns)
+
+
+def comovement_payload(
+    store: PairwiseStore, betas: pd.DataFrame, regime_corr: Mapping[str, dict] | None = None, decimals: int = 6
+) -> dict:
+    """
+    The dashboard's view: the latest covariance and correlation matrices
+    and each regime's average correlation (packed upper triangles), and the
+    rolling betas per ticker.
+    """
+
+    def packed(values) -> list:
+        v = np.round(np.asarray(values, dtype=float), decimals)
+        return [None if np.isnan(x) else float(x) for x in v]
+
+    latest = len(store) - 1
+    payload = {
+        "tickers": store.tickers,
+        "window": store.header["window"],
+        "min_periods": store.header["min_periods"],
+        "layout": store.header["layout"],
+        "date": store.header["dates"][latest] if latest >= 0 else None,
+        "latest": {kind: packed(store.arrays[kind][latest]) if latest >= 0 else [] for kind in KINDS},
+        "regimes": {r: {"dates": v["dates"], "corr": packed(v["corr"])} for r, v in (regime_corr or {}).items()},
+        "betas": {
+            "dates": [str(d.date()) for d in betas.index],
+            "fields": list(dict.fromkeys(betas.columns.get_level_values("field"))),
+            "tickers": {
+                t: {f: packed(betas[(t, f)]) for f in betas[t].columns}
+                for t in dict.fromkeys(betas.columns.get_level_values("ticker"))
+            },
+        },
+    }
+    return payload
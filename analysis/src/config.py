@@ -1,6 +1,37 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 
+
+@dataclass(frozen=True)
+class Sleeve:
+    """
+    A regression sleeve: a weighted portfolio of `tickers` (weights from Config.weights)
+    regressed on a factor source.
+
+    target:  "excess" -> Y = portfolio return - RF, "total" -> Y = portfolio return
+    factors: "us" / "dev_ex_us" (Fama-French factor_set) or "proxies" (ETF returns in `proxies`)
+    """
+    name: str
+    tickers: tuple
+    target: str = "excess"
+    factors: str = "us"
+    proxies: tuple = ()
+
+    def __post_init__(self):
+        if self.target not in ("excess", "total"):
+            raise ValueError(f"Sleeve {self.name}: unknown target {self.target!r}")
+        if self.factors == "proxies":
+            if not self.proxies:
+                raise ValueError(f"Sleeve {self.name}: factors='proxies' needs a proxies tuple")
+            if self.target == "excess":
+                raise ValueError(f"Sleeve {self.name}: excess target needs a Fama-French factor source (for RF)")
+
+    def x_cols(self, factor_set: str) -> list[str]:
+        if self.factors == "proxies":
+            return list(self.proxies)
+        return factor_columns(factor_set)
+
+
 @dataclass(frozen=True)
 class Config:
     # Universe (10 ETFs)
@@ -12,17 +43,42 @@ class Config:
     equity_intl: tuple = ("EFA",)
     equity_all: tuple = ("SPY","QQQ","IWM","VTV","VUG","EFA")
 
+    # Regression sleeves; frames are only built for the sleeves a run asks for.
+    sleeves: tuple = (
+        Sleeve("equity_us", equity_us, target="excess", factors="us"),
+        Sleeve("equity_intl", equity_intl, target="excess", factors="dev_ex_us"),
+        Sleeve("total_macro", tickers, target="total", factors="proxies", proxies=("SPY","TLT","DBC","GLD","VNQ")),
+    )
+
     # Time + frequency
     start: str = "2015-01-01"
     end: str | None = None
-    freq: str = "W-FRI"  # weekly Friday
+    freq: str = "W-FRI"  # weekly Friday; "B" for business-daily (see FREQ_PRESETS)
+
+    # Numeric storage for return panels and model frames ("float32" halves memory)
+    dtype: str = "float64"
 
-    # Rolling regression
+    # Rolling regression (window lengths are in periods of `freq`)
     rolling_window_weeks: int = 52
     rolling_windows_weeks: tuple[int, ...] = (26, 52)
     min_nobs: int = 45
+    # Also store exposures for every sleeve x window (rolling_windows_weeks + rolling_window_weeks)
+    # in a memory-mapped cube under out_data/cube (see analysis/src/cube.py)
+    exposures_cube: bool = False
+    # Rolling pairwise cov/corr of every ticker pair plus each ticker's rolling beta to
+    # `comovement_benchmark` and the factors (see analysis/src/comovement.py). Pairs are
+    # computed in blocks of `comovement_block` tickers: peak memory ~ 6 x periods x block^2 floats.
+    comovement: bool = False
+    comovement_benchmark: str = "SPY"
+    comovement_block: int = 32
 
-    # Factor set
+    # Data-quality checks (see analysis/src/data_quality.py); windows are in periods of `freq`
+    quality_mad_window: int = 52  # trailing window for the median / MAD outlier test
+    quality_mad_threshold: float = 6.0  # flag returns this many scaled MADs from the median
+    quality_stale_run: int = 3  # consecutive zero returns that count as a stale price
+    quality_jump_ratio: float = 1.8  # price ratio (either way) that counts as a jump
+
+    # Factor set (see FACTOR_SETS)
     factor_set: str = "FF3"
 
     # Regimes (portfolio realized vol)
@@ -30,6 +86,13 @@ class Config:
     vol_percentile: float = 0.75
     vol_lookback_weeks: int = 104  # trailing 2 years
 
+    # Site JSON layout: "rows" (list of row objects) or "columnar" (compact dates + column arrays)
+    export_layout: str = "rows"
+    export_decimals: int | None = None  # round exported floats; None = full precision
+    export_arrow: bool = True  # also write Arrow IPC copies of the site tables
+    export_shard_by: str | int | None = None  # "year" or rows per shard; None = no shards
+    export_hashed_names: bool = False  # content-hashed file names for long-lived caching
+
     # Paths
     root: Path = Path(__file__).resolve().parents[2]
     out_data: Path = root / "analysis" / "outputs" / "data"
@@ -37,6 +100,66 @@ class Config:
     out_reports: Path = root / "analysis" / "outputs" / "reports"
     site_public_data: Path = root / "site" / "public" / "data"
 
-def get_config() -> Config:
+
+# Per-frequency defaults for the period-denominated settings above.
+FREQ_PRESETS = {
+    "W-FRI": {},
+    "B": {
+        "rolling_window_weeks": 252,
+        "rolling_windows_weeks": (126, 252),
+        "min_nobs": 220,
+        "vol_window_weeks": 21,
+        "vol_lookback_weeks": 504,
+        "quality_mad_window": 63,
+        "quality_stale_run": 5,
+    },
+}
+
+
+# Regressor columns per factor set. All sets exist for US and Developed ex US.
+FACTOR_SETS = {
+    "FF3": ("MKT_RF", "SMB", "HML"),
+    "FF5": ("MKT_RF", "SMB", "HML", "RMW", "CMA"),
+    "FF3_MOM": ("MKT_RF", "SMB", "HML", "MOM"),
+    "FF5_MOM": ("MKT_RF", "SMB", "HML", "RMW", "CMA", "MOM"),
+}
+
+
+def factor_columns(factor_set: str) -> list[str]:
+    if factor_set not in FACTOR_SETS:
+        raise ValueError(f"Unknown factor_set {factor_set!r}; expected one of {sorted(FACTOR_SETS)}")
+    return list(FACTOR_SETS[factor_set])
+
+
+def freq_label(freq: str) -> str:
+    f = freq.upper()
+    if f.startswith("W"):
+        return "weekly"
+    if f.startswith(("B", "D")):
+        return "daily"
+    raise ValueError(f"Unsupported frequency: {freq}")
+
+
+def get_sleeves(cfg: "Config", names=None) -> list[Sleeve]:
+    """Return the configured sleeves, optionally restricted to `names` (in config order)."""
+    if names is None:
+        return list(cfg.sleeves)
+    known = {s.name for s in cfg.sleeves}
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        raise ValueError(f"Unknown sleeves {unknown}; configured: {sorted(known)}")
+    return [s for s in cfg.sleeves if s.name in set(names)]
+
+
+def get_config(freq: str | None = None, dtype: str | None = None, factor_set: str | None = None) -> Config:
     cfg = Config(weights={t: 0.10 for t in Config().tickers})
+    if freq is not None:
+        if freq not in FREQ_PRESETS:
+            raise ValueError(f"Unknown frequency {freq!r}; expected one of {sorted(FREQ_PRESETS)}")
+        cfg = replace(cfg, freq=freq, **FREQ_PRESETS[freq])
+    if dtype is not None:
+        cfg = replace(cfg, dtype=dtype)
+    if factor_set is not None:
+        factor_columns(factor_set)  # validates
+        cfg = replace(cfg, factor_set=factor_set)
     return cfg
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+# On-disk layout: `<name>.cube.json` is the header with the axis labels, how
+# many leading date rows are valid and the name of the data file,
+# `<name>.cube.<generation>`: a raw C-order float64 array of shape (capacity,
+# sleeves, windows, coefficients). Dates are the leading axis, so appending
+# dates only writes past the end of the file. A rewrite goes to the next
+# generation's file and swaps the header last, so readers see the old cube
+# or the new one, never new bytes under an old header.
+CUBE_VERSION = 1
+GROW_ROWS = 256  # capacity is extended in blocks so appends rarely resize the file
+
+
+def _header_path(path: Path) -> Path:
+    return path.with_name(path.name + ".json")
+
+
+def _data_path(path: Path, header: dict) -> Path:
+    # cubes written before the header named its data file kept it at `path`
+    return path.with_name(header.get("data", path.name))
+
+
+def _read_header(path: Path) -> dict:
+    return json.loads(_header_path(path).read_text())
+
+
+def cube_files(path: Path) -> List[Path]:
+    """The header and data file a cube at `path` consists of."""
+    path = Path(path)
+    if not _header_path(path).exists():
+        return [_header_path(path)]
+    return [_header_path(path), _data_path(path, _read_header(path))]
+
+
+def _write_header(path: Path, header: dict) -> None:
+    # the header is what readers trust, so it is replaced only after the rows it counts are on disk
+    target = _header_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(header, indent=2))
+    tmp.replace(target)
+
+
+def _axes(tables: Mapping[Tuple[str, int], pd.DataFrame]) -> Tuple[List[str], List[int], List[str]]:
+    sleeves = list(dict.fromkeys(s for s, _ in tables))
+    windows = sorted({int(w) for _, w in tables})
+    coefs = list(dict.fromkeys(c for df in tables.values() for c in df.columns))
+    return sleeves, windows, coefs
+
+
+def _block(tables: Mapping[Tuple[str, int], pd.DataFrame], dates: pd.DatetimeIndex, sleeves, windows, coefs) -> np.ndarray:
+    out = np.full((len(dates), len(sleeves), len(windows), len(coefs)), np.nan)
+    for (sleeve, window), df in tables.items():
+        aligned = df.reindex(index=dates, columns=coefs).to_numpy(dtype=float)
+        out[:, sleeves.index(sleeve), windows.index(int(window)), :] = aligned
+    return out
+
+
+class MemmapCube:
+    """
+    Rolling-model outputs as one memory-mapped dates x sleeves x windows x
+    coefficients array. Slices (`values[...]`, `cross_section`, `series`)
+    are NumPy views of the mapped file: a query touches only the pages it
+    reads, however many sleeves and windows are stored.
+    """
+
+    def __init__(self, path: Path, header: dict, values: np.ndarray):
+        self.path = path
+        self.header = header
+        self.values = values
+        self.dates = pd.DatetimeIndex(header["dates"], name="date")
+        self.days = self.dates.values.astype("datetime64[D]")
+        self.sleeves: List[str] = header["sleeves"]
+        self.windows: List[int] = header["windows"]
+        self.coefficients: List[str] = header["coefficients"]
+
+    @classmethod
+    def open(cls, path: Path, mode: str = "r") -> "MemmapCube":
+        """Map the cube read-only (`mode="r"`) or for in-place updates (`"r+"`)."""
+        path = Path(path)
+        header = _read_header(path)
+        if header.get("version") != CUBE_VERSION:
+            raise ValueError(f"{path}: unsupported cube version {header.get('version')!r}")
+        rows = len(header["dates"])
+        shape = (header["capacity"], len(header["sleeves"]), len(header["windows"]), len(header["coefficients"]))
+        if header["capacity"] == 0:
+            return cls(path, header, np.empty((0, *shape[1:]), dtype=header["dtype"]))
+        mm = np.memmap(_data_path(path, header), dtype=header["dtype"], mode=mode, shape=shape)
+        return cls(path, header, mm[:rows])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def rows(self, start=None, end=None) -> slice:
+        """Row slice for dates in [start, end] (binary search on the date axis)."""
+        lo = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(start).date(), "D"), "left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(end).date(), "D"), "right"))
+        return slice(lo, max(lo, hi))
+
+    def _sel(self, sleeve=None, window=None, coef=None):
+        s = slice(None) if sleeve is None else self.sleeves.index(sleeve)
+        w = slice(None) if window is None else self.windows.index(int(window))
+        c = slice(None) if coef is None else self.coefficients.index(coef)
+        return s, w, c
+
+    def cross_section(self, date, coef: str | None = None) -> np.ndarray:
+        """(sleeves, windows[, coefficients]) view at the last row on or before `date`."""
+        i = int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(date).date(), "D"), "right")) - 1
+        if i < 0:
+            raise KeyError(f"No rows on or before {date}")
+        return self.values[i][(slice(None), slice(None), self._sel(coef=coef)[2])]
+
+    def series(self, sleeve: str, window: int, coef: str | None = None, start=None, end=None) -> np.ndarray:
+        """(dates[, coefficients]) view for one sleeve and window."""
+        s, w, c = self._sel(sleeve, window, coef)
+        return self.values[self.rows(start, end), s, w, c]
+
+    def frame(self, sleeve: str, window: int, start=None, end=None) -> pd.DataFrame:
+        """One sleeve/window as an exposures table (coefficients it doesn't have are dropped)."""
+        rows = self.rows(start, end)
+        df = pd.DataFrame(self.series(sleeve, window, start=start, end=end), index=self.dates[rows], columns=self.coefficients)
+        return df.dropna(how="all").dropna(axis=1, how="all")
+
+
+def write_cube(path: Path, tables: Mapping[Tuple[str, int], pd.DataFrame]) -> MemmapCube:
+    """Write `tables` ({(sleeve, window): exposures}) as a new cube at `path`, replacing any old one."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sleeves, windows, coefs = _axes(tables)
+    dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in tables.values()))), name="date")
+    block = _block(tables, dates, sleeves, windows, coefs)
+    capacity = len(dates) + GROW_ROWS
+    try:
+        previous = _read_header(path)
+    except (OSError, ValueError):
+        previous = None
+    generation = previous.get("generation", 0) + 1 if previous else 1
+    data = path.with_name(f"{path.name}.{generation}")
+    with open(data, "wb") as fh:
+        fh.write(np.ascontiguousarray(block).tobytes())
+        fh.truncate(capacity * block.itemsize * len(sleeves) * len(windows) * len(coefs))
+        fh.flush()
+        os.fsync(fh.fileno())
+    header = {
+        "version": CUBE_VERSION,
+        "dtype": "float64",
+        "order": "C",
+        "axes": ["date", "sleeve", "window", "coefficient"],
+        "capacity": capacity,
+        "dates": [str(d.date()) for d in dates],
+        "sleeves": sleeves,
+        "windows": windows,
+        "coefficients": coefs,
+        "generation": generation,
+        "data": data.name,
+    }
+    _write_header(path, header)
+    if previous:
+        # readers that mapped the old file keep their mapping; new readers follow the header
+        _data_path(path, previous).unlink(missing_ok=True)
+    return MemmapCube.open(path)
+
+
+def append_cube(path: Path, tables: Mapping[Tuple[str, int], pd.DataFrame]) -> int:
+    """
+    Append the rows of `tables` dated after the cube's last date, in place:
+    existing rows are not rewritten, the file only grows (in GROW_ROWS
+    blocks) past its capacity, and the header is replaced last. Returns the
+    number of rows appended. Raises ValueError if the sleeves, windows or
+    coefficients differ from the cube's (rewrite it with `write_cube`).
+    """
+    path = Path(path)
+    cube = MemmapCube.open(path)
+    header = cube.header
+    sleeves, windows, coefs = _axes(tables)
+    if set(sleeves) != set(cube.sleeves) or set(windows) != set(cube.windows) or not set(coefs) <= set(cube.coefficients):
+        raise ValueError(f"{path}: axes changed; rewrite the cube instead of appending")
+    last = cube.dates[-1] if len(cube) else None
+    new = sorted({d for df in tables.values() for d in df.index if last is None or d > last})
+    if not new:
+        return 0
+    dates = pd.DatetimeIndex(new, name="date")
+    block = _block(tables, dates, cube.sleeves, cube.windows, cube.coefficients)
+    rows, row_bytes = len(cube), block[0].nbytes
+    del cube
+
+    capacity = header["capacity"]
+    if rows + len(dates) > capacity:
+        capacity = rows + len(dates) + GROW_ROWS
+    with open(_data_path(path, header), "r+b") as fh:
+        if capacity != header["capacity"]:
+            fh.truncate(capacity * row_bytes)
+        fh.seek(rows * row_bytes)
+        fh.write(np.ascontiguousarray(block).tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+    _write_header(path, {**header, "capacity": capacity, "dates": header["dates"] + [str(d.date()) for d in dates]})
+    return len(dates)
+
+
+def sync_cube(path: Path, tables: Mapping[Tuple[str, int], pd.DataFrame]) -> dict:
+    """
+    Bring the cube at `path` up to date with `tables`: append when only new
+    dates were added (every stored row unchanged), rewrite otherwise.
+    Returns {"mode": "created" | "appended" | "rewritten" | "unchanged", "rows": ...}.
+    """
+    path = Path(path)
+    if not _header_path(path).exists():
+        return {"mode": "created", "rows": len(write_cube(path, tables))}
+    try:
+        cube = MemmapCube.open(path)
+    except (ValueError, OSError, KeyError):
+        return {"mode": "rewritten", "rows": len(write_cube(path, tables))}
+    sleeves, windows, coefs = _axes(tables)
+    same_axes = sleeves == cube.sleeves and windows == cube.windows and coefs == cube.coefficients
+    if same_axes and len(cube):
+        old = _block(tables, cube.dates, sleeves, windows, coefs)
+        same_axes = np.array_equal(old, np.asarray(cube.values), equal_nan=True)
+    del cube
+    if not same_axes:
+        return {"mode": "rewritten", "rows": len(write_cube(path, tables))}
+    added = append_cube(path, tables)
+    return {"mode": "appended" if added else "unchanged", "rows": len(MemmapCube.open(path)), "appended": added}
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import hashlib
+import importlib.util
+import inspect
+import io
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence, Tuple
+
+from analysis.src import profiling
+
+if TYPE_CHECKING:
+    from analysis.src.artifacts import ArtifactStore
+
+# pandas/pyarrow (via analysis.src.artifacts) are imported when stages execute,
+# so building a graph or printing config stays cheap.
+
+STATE_VERSION = 1
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline graph.
+
+    `fn(cfg, inputs, **params)` receives the named input artifacts and returns a
+    dict with exactly the keys of `outputs` (artifact name -> persisted path, or
+    None for outputs that only live in memory).
+
+    A stage's fingerprint covers its own source and the sources of the
+    `code` modules, the `config_fields` it reads, `params`, and the content
+    hashes of its inputs. `always_run` stages (data sources backed by their own
+    caches) run every time; the stages below them still skip when the data
+    they produce hashes the same as last time.
+
+    `files(cfg)`, when given, lists the files the stage writes itself rather
+    than through the ArtifactStore (a site bundle, a memory-mapped store);
+    the stage re-runs if any of them is missing.
+    """
+
+    name: str
+    fn: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Dict[str, Path | None] = field(default_factory=dict)
+    config_fields: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    code: Tuple[str, ...] = ()
+    always_run: bool = False
+    files: Callable[[Any], Sequence[Path]] | None = None
+
+
+@dataclass
+class StageDecision:
+    stage: str
+    run: bool
+    reason: str
+
+
+def _canonical(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _canonical(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(_canonical(value), sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _module_source(module: str) -> bytes:
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        raise ValueError(f"Cannot locate source for module {module!r}")
+    return Path(spec.origin).read_bytes()
+
+
+def code_hash(stage: Stage) -> str:
+    h = hashlib.sha256(inspect.getsource(stage.fn).encode())
+    for module in stage.code:
+        h.update(_module_source(module))
+    return h.hexdigest()
+
+
+def _stage_config(stage: Stage, cfg: Any) -> Dict[str, str]:
+    values = {f: _digest(getattr(cfg, f)) for f in stage.config_fields}
+    values.update({f"param:{k}": _digest(v) for k, v in stage.params.items()})
+    return values
+
+
+def load_state(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    state = json.loads(path.read_text())
+    if state.get("version") != STATE_VERSION:
+        return {}
+    return state.get("stages", {})
+
+
+def save_state(path: Path, stages: Dict[str, dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"version": STATE_VERSION, "stages": stages}, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+class StageError(RuntimeError):
+    """A stage raised; the original exception (with its worker traceback) is the cause."""
+
+
+def run_stage(stage: Stage, cfg: Any, inputs: Dict[str, Any], capture: bool = False, profile: bool = False):
+    """
+    Run one stage and hash its outputs; returns (outputs, output hashes,
+    captured text, profiling events).
+
+    Module-level so it can run in a worker process. With `capture`, anything
+    the stage prints is returned instead, for the parent to log in order; with
+    `profile`, the stage and its sub-steps are timed in whichever process runs it.
+    """
+    from analysis.src.artifacts import content_hash
+
+    profiling.enable(profile)
+    buf = io.StringIO()
+    with contextlib.ExitStack() as stack:
+        if capture:
+            stack.enter_context(contextlib.redirect_stdout(buf))
+            stack.enter_context(contextlib.redirect_stderr(buf))
+        with profiling.span(stage.name, cat="stage", rows_in=sum(profiling.rows(v) for v in inputs.values())) as sp:
+            produced = stage.fn(cfg, inputs, **stage.params)
+            sp.set(rows_out=sum(profiling.rows(v) for v in produced.values()))
+    if set(produced) != set(stage.outputs):
+        raise ValueError(f"Stage {stage.name!r} returned {sorted(produced)}, declared {sorted(stage.outputs)}")
+    hashes = {name: content_hash(value) for name, value in produced.items()}
+    return produced, hashes, buf.getvalue(), profiling.collect() if profile else []
+
+
+class Pipeline:
+    """
+    Executes stages in dependency order and skips the ones whose fingerprint
+    matches the previous run recorded in `state_path`.
+
+    Skipped stages don't load anything: their outputs are registered with the
+    ArtifactStore by path and only read if a stage that does run asks for them.
+
+    `external` names artifacts that no stage produces because the caller puts
+    them in the store before `execute` (e.g. data loaded once for a sweep);
+    they are hashed like any other input.
+    """
+
+    def __init__(self, stages: List[Stage], external: Sequence[str] = ()):
+        self.external = tuple(external)
+        self.stages = self._toposort(stages, self.external)
+        self.producers = {out: s.name for s in self.stages for out in s.outputs}
+
+    @staticmethod
+    def _toposort(stages: List[Stage], external: Sequence[str] = ()) -> List[Stage]:
+        producers: Dict[str, str] = {}
+        for s in stages:
+            for out in s.outputs:
+                if out in producers:
+                    raise ValueError(f"Artifact {out!r} is produced by both {producers[out]!r} and {s.name!r}")
+                producers[out] = s.name
+        names = [s.name for s in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate stage names in {names}")
+        for s in stages:
+            missing = [i for i in s.inputs if i not in producers and i not in external]
+            if missing:
+                raise ValueError(f"Stage {s.name!r} needs {missing}, which no stage produces")
+
+        # Kahn's algorithm; ties keep declaration order so runs are reproducible.
+        deps = {s.name: {producers[i] for i in s.inputs if i in producers} for s in stages}
+        done: set = set()
+        ordered: List[Stage] = []
+        pending = list(stages)
+        while pending:
+            ready = [s for s in pending if deps[s.name] <= done]
+            if not ready:
+                raise ValueError(f"Cycle among stages {[s.name for s in pending]}")
+            for s in ready:
+                ordered.append(s)
+                done.add(s.name)
+            pending = [s for s in pending if s.name not in done]
+        return ordered
+
+    def _decide(
+        self,
+        stage: Stage,
+        record: dict | None,
+        config: Dict[str, str],
+        code: str,
+        inputs: Dict[str, str | None],
+        force: bool,
+        files: Sequence[Path] = (),
+    ) -> str | None:
+        """Return why `stage` has to run, or None when it can be skipped."""
+        if force:
+            return "forced"
+        if stage.always_run:
+            return "source stage"
+        if record is None:
+            return "no previous run"
+        if record.get("code") != code:
+            return "code changed"
+        changed = sorted(k for k in config.keys() | record.get("config", {}).keys() if config.get(k) != record["config"].get(k))
+        if changed:
+            return "config changed: " + ", ".join(changed)
+        for name, h in inputs.items():
+            if h is None:
+                return f"input {name} is rebuilt by {self.producers[name]}"
+            if record.get("inputs", {}).get(name) != h:
+                return f"input changed: {name}"
+        for name, path in stage.outputs.items():
+            if path is None or not Path(path).exists():
+                return f"output missing: {name}"
+        for path in files:
+            if not Path(path).exists():
+                return f"output missing: {Path(path).name}"
+        return None
+
+    def execute(
+        self,
+        cfg: Any,
+        store: ArtifactStore,
+        state_path: Path,
+        force: bool = False,
+        plan_only: bool = False,
+        jobs: int = 1,
+        profile: bool = False,
+        log: Callable[[str], None] = print,
+    ) -> List[StageDecision]:
+        """
+        Run (or with `plan_only`, just decide) every stage.
+
+        In plan mode only `always_run` stages are executed, since their output
+        hashes decide what happens downstream; stages that would re-run report
+        their outputs as unknown and everything depending on them re-runs too.
+
+        With `jobs > 1`, stages whose inputs are ready run concurrently on a
+        process pool. Stages are still decided and submitted in graph order,
+        each stage's output is captured and logged as one block in graph
+        order, and the first failure cancels whatever hasn't started and is
+        raised as StageError once the running stages finish.
+
+        With `profile`, per-stage and sub-step timings from every process are
+        gathered into `profiling` (read them back with `profiling.collect()`).
+        """
+        from analysis.src.artifacts import content_hash
+
+        previous = load_state(state_path)
+        state: Dict[str, dict] = {}
+        hashes: Dict[str, str | None] = {name: content_hash(store.get(name)) for name in self.external}
+        decisions: Dict[str, StageDecision] = {}
+        position = {s.name: k for k, s in enumerate(self.stages)}
+        pending = list(self.stages)
+        finished: set = set()
+        running: Dict[Future, Tuple[Stage, dict]] = {}
+        logs: Dict[str, List[str]] = {s.name: [] for s in self.stages}
+        cursor = 0
+
+        def emit() -> None:
+            # Print buffered lines in graph order, up to the first stage still in flight.
+            nonlocal cursor
+            while cursor < len(self.stages):
+                name = self.stages[cursor].name
+                for line in logs[name]:
+                    log(line)
+                logs[name] = []
+                if name not in finished:
+                    return
+                cursor += 1
+
+        def complete(stage: Stage, record: dict, produced: Dict[str, Any], out_hashes: Dict[str, str]) -> None:
+            for name, value in produced.items():
+                store.put(name, value, stage.outputs[name])
+            hashes.update(out_hashes)
+            state[stage.name] = {**record, "outputs": out_hashes}
+            finished.add(stage.name)
+
+        def next_ready() -> Stage | None:
+            for stage in pending:
+                if all(i in self.external or self.producers[i] in finished for i in stage.inputs):
+                    pending.remove(stage)
+                    return stage
+            return None
+
+        pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and not plan_only else None
+        try:
+            while pending or running:
+                stage = next_ready()
+                while stage is not None:
+                    config = _stage_config(stage, cfg)
+                    code = code_hash(stage)
+                    inputs = {name: hashes[name] for name in stage.inputs}
+                    record = previous.get(stage.name)
+                    files = stage.files(cfg) if stage.files is not None else ()
+                    reason = self._decide(stage, record, config, code, inputs, force, files)
+                    decisions[stage.name] = StageDecision(stage.name, reason is not None, reason or "up to date")
+
+                    if reason is None:
+                        logs[stage.name].append(f"[skip] {stage.name}")
+                        for name, path in stage.outputs.items():
+                            store.register(name, path)
+                        hashes.update(record["outputs"])
+                        state[stage.name] = record
+                        finished.add(stage.name)
+                    else:
+                        logs[stage.name].append(f"[run]  {stage.name} ({reason})")
+                        if plan_only and not stage.always_run:
+                            hashes.update({name: None for name in stage.outputs})
+                            finished.add(stage.name)
+                        else:
+                            record = {"code": code, "config": config, "inputs": inputs}
+                            stage_inputs = {name: store.get(name) for name in stage.inputs}
+                            if pool is None:
+                                emit()
+                                try:
+                                    produced, out_hashes, _, events = run_stage(stage, cfg, stage_inputs, False, profile)
+                                except Exception as exc:
+                                    raise StageError(f"Stage {stage.name!r} failed: {exc}") from exc
+                                profiling.extend(events)
+                                complete(stage, record, produced, out_hashes)
+                            else:
+                                running[pool.submit(run_stage, stage, cfg, stage_inputs, True, profile)] = (stage, record)
+                    emit()
+                    stage = next_ready()
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in sorted(done, key=lambda f: position[running[f][0].name]):
+                    stage, record = running.pop(fut)
+                    try:
+                        produced, out_hashes, output, events = fut.result()
+                    except Exception as exc:
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise StageError(f"Stage {stage.name!r} failed: {exc}") from exc
+                    logs[stage.name].extend(line for line in output.splitlines())
+                    profiling.extend(events)
+                    complete(stage, record, produced, out_hashes)
+                emit()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if not plan_only:
+                store.flush()
+                # Record whatever completed, so a failed run resumes after the last good stage.
+                # Without persistence nothing new reached disk, so the previous records still hold.
+                if store.persist:
+                    save_state(state_path, {**previous, **state})
+        return [decisions[s.name] for s in self.stages if s.name in decisions]
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Sequence
 
 import pandas as pd
-from pandas_datareader.famafrench import FamaFrenchReader
 
+from analysis.src.config import factor_columns, freq_label
+from analysis.src.ken_french import load_tables
+
+# Daily Ken French datasets per (region, component).
+DAILY_DATASETS = {
+    ("us", "ff3"): "F-F_Research_Data_Factors_daily",
+    ("us", "ff5"): "F-F_Research_Data_5_Factors_2x3_daily",
+    ("us", "mom"): "F-F_Momentum_Factor_daily",
+    ("dev_ex_us", "ff3"): "Developed_ex_US_3_Factors_Daily",
+    ("dev_ex_us", "ff5"): "Developed_ex_US_5_Factors_Daily",
+    ("dev_ex_us", "mom"): "Developed_ex_US_Mom_Factor_Daily",
+}
 
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
@@ -17,6 +28,8 @@ def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
         "MKT-RF": "MKT_RF",
         "Mkt_RF": "MKT_RF",
         "RF": "RF",
+        "Mom": "MOM",
+        "WML": "MOM",
     })
 
 
@@ -24,86 +37,87 @@ def _percent_to_decimal(df: pd.DataFrame) -> pd.DataFrame:
     return df / 100.0
 
 
-def _as_datetime_index(df: pd.DataFrame) -> pd.DataFrame:
-    if isinstance(df.index, pd.PeriodIndex):
-        df.index = df.index.to_timestamp()
-    else:
-        df.index = pd.to_datetime(df.index)
-    return df.sort_index()
-
-
-def _to_weekly_compound(df: pd.DataFrame, freq: str = "W-FRI") -> pd.DataFrame:
+def _compound_to_freq(df: pd.DataFrame, freq: str = "W-FRI") -> pd.DataFrame:
     """
-    Convert factor returns to weekly by compounding.
-    Works for daily or monthly too (it just compounds within each weekly bucket).
+    Compound daily factor returns into `freq` buckets (W-FRI weeks, or B days).
+    Buckets without any source observation come out as NaN rather than 0.
     """
-    return (1 + df).resample(freq).prod() - 1
+    return (1 + df).resample(freq).prod(min_count=1) - 1
+
+
+def factor_filename(region: str, factor_set: str, freq: str) -> str:
+    # Caches built from the monthly archives used other names (e.g.
+    # F-F_Research_Data_Factors_weekly.parquet); they are never picked up.
+    return f"{region}_{factor_set}_{freq_label(freq)}.parquet"
 
 
-def fetch_ff_factors_weekly(
-    dataset_key: str,
+def fetch_factor_set(
+    region: str,
+    factor_set: str,
     start: str,
     end: str | None,
     cache_dir: Path,
-    out_filename: str,
     force: bool = False,
     freq: str = "W-FRI",
 ) -> Path:
     """
-    Fetch Ken French factor dataset (any native freq), normalize columns, convert to decimals,
-    resample to weekly by compounding, and cache as parquet with your chosen filename.
+    Build `factor_set` (+ RF) for `region` from the daily Ken French archives,
+    convert to decimals, compound to `freq` (weekly W-FRI or business-daily B),
+    and cache as parquet. Raw archives and their parsed tables are cached under
+    `cache_dir/raw`.
     """
     _ensure_dir(cache_dir)
-    out_path = cache_dir / out_filename
+    out_path = cache_dir / factor_filename(region, factor_set, freq)
 
     if out_path.exists() and (not force):
         return out_path
 
-    rdr = FamaFrenchReader(dataset_key, start=start, end=end)
-    data = rdr.read()
-    df = data[0].copy()
+    cols = factor_columns(factor_set)
+    components = ["ff5" if {"RMW", "CMA"} & set(cols) else "ff3"]
+    if "MOM" in cols:
+        components.append("mom")
 
-    df = _as_datetime_index(df)
-    df = _normalize_cols(df)
+    parts = []
+    for comp in components:
+        dataset_key = DAILY_DATASETS[(region, comp)]
+        parts.append(_normalize_cols(load_tables(dataset_key, cache_dir / "raw", force=force)[0]))
+    df = pd.concat(parts, axis=1, join="inner")
 
-    needed = {"MKT_RF", "SMB", "HML", "RF"}
-    missing = needed - set(df.columns)
+    needed = cols + ["RF"]
+    missing = set(needed) - set(df.columns)
     if missing:
-        raise ValueError(f"Missing columns {missing} in dataset {dataset_key}. Columns found: {list(df.columns)}")
+        raise ValueError(f"Missing columns {missing} for {region} {factor_set}. Columns found: {list(df.columns)}")
 
-    df = df[["MKT_RF", "SMB", "HML", "RF"]]
-    df = _percent_to_decimal(df)
+    df = _percent_to_decimal(df[needed].sort_index().loc[start:end])
 
-    # Always output weekly W-FRI
-    df_weekly = _to_weekly_compound(df, freq=freq).dropna(how="all")
+    df_out = _compound_to_freq(df, freq=freq).dropna(how="all")
 
-    df_weekly.to_parquet(out_path)
+    df_out.to_parquet(out_path)
     return out_path
 
 
-def fetch_all_factors(start: str, end: str | None, cache_dir: Path, force: bool = False) -> Dict[str, Path]:
+def fetch_all_factors(
+    start: str,
+    end: str | None,
+    cache_dir: Path,
+    force: bool = False,
+    freq: str = "W-FRI",
+    factor_set: str = "FF3",
+    regions: Sequence[str] = ("us", "dev_ex_us"),
+) -> Dict[str, Path]:
     """
-    US + Developed ex US FF3, standardized to weekly W-FRI, decimals.
-    You can name the output files however you want.
+    `factor_set` for each region (US, Developed ex US) from the daily Ken French
+    files, compounded to `freq`, decimals. Keys are "factors_<region>".
     """
-    us_path = fetch_ff_factors_weekly(
-        dataset_key="F-F_Research_Data_Factors",
-        start=start,
-        end=end,
-        cache_dir=cache_dir,
-        out_filename="F-F_Research_Data_Factors_weekly.parquet",
-        force=force,
-        freq="W-FRI",
-    )
-
-    devx_path = fetch_ff_factors_weekly(
-        dataset_key="Developed_ex_US_3_Factors",
-        start=start,
-        end=end,
-        cache_dir=cache_dir,
-        out_filename="Developed_ex_US_3_Factors.parquet",
-        force=force,
-        freq="W-FRI",
-    )
-
-    return {"ff3_us": us_path, "ff3_dev_ex_us": devx_path}
+    return {
+        f"factors_{region}": fetch_factor_set(
+            region=region,
+            factor_set=factor_set,
+            start=start,
+            end=end,
+            cache_dir=cache_dir,
+            force=force,
+            freq=freq,
+        )
+        for region in regions
+    }
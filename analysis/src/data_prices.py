@@ -5,18 +5,21 @@ from pathlib import Path
 from typing import Dict, Tuple
 
 import pandas as pd
-import yfinance as yf
+
+from analysis.src.config import freq_label
+from analysis.src.data_quality import coverage
+from analysis.src.store import write_panel
 
 
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
-def _to_weekly_prices(adj_close: pd.DataFrame, freq: str) -> pd.DataFrame:
-    # Use last available trading close in each weekly bucket (W-FRI)
-    weekly = adj_close.resample(freq).last()
-    weekly = weekly.dropna(how="all")
-    return weekly
+def _to_freq_prices(adj_close: pd.DataFrame, freq: str) -> pd.DataFrame:
+    # Use last available trading close in each bucket (W-FRI weeks, or business days)
+    resampled = adj_close.resample(freq).last()
+    resampled = resampled.dropna(how="all")
+    return resampled
 
 
 def _simple_returns(prices: pd.DataFrame) -> pd.DataFrame:
@@ -25,35 +28,57 @@ def _simple_returns(prices: pd.DataFrame) -> pd.DataFrame:
     return rets
 
 
-def fetch_prices_weekly(
+def fetch_prices(
     tickers: Tuple[str, ...],
     start: str,
     end: str | None,
     freq: str,
     cache_dir: Path,
     force: bool = False,
+    dtype: str = "float64",
 ) -> Dict[str, Path]:
     """
-    Downloads adjusted close prices via yfinance, converts to weekly prices and returns,
-    and caches parquet outputs.
+    Downloads adjusted close prices via yfinance, converts to `freq` prices and returns
+    (weekly W-FRI or business-daily B), and caches parquet outputs named by frequency,
+    e.g. returns_weekly.parquet / returns_daily.parquet.
+
+    Each panel is also written to a hive-partitioned store under `cache_dir/store`
+    (see analysis.src.store) so consumers can read ticker/date slices. Resampled
+    prices and returns are stored as `dtype` (float32 halves their footprint).
 
     Returns paths to cached files.
     """
     _ensure_dir(cache_dir)
+    label = freq_label(freq)
 
     raw_path = cache_dir / "prices_raw.parquet"
-    weekly_path = cache_dir / "prices_weekly.parquet"
-    rets_path = cache_dir / "returns_weekly.parquet"
+    prices_path = cache_dir / f"prices_{label}.parquet"
+    rets_path = cache_dir / f"returns_{label}.parquet"
     report_path = cache_dir.parent / "reports" / "prices_quality_report.json"
     _ensure_dir(report_path.parent)
 
-    if (not force) and raw_path.exists() and weekly_path.exists() and rets_path.exists():
-        return {
-            "raw": raw_path,
-            "weekly_prices": weekly_path,
-            "weekly_returns": rets_path,
-            "report": report_path,
-        }
+    store_dir = cache_dir / "store"
+    stores = {
+        "raw_store": store_dir / "prices_raw",
+        "prices_store": store_dir / f"prices_{label}",
+        "returns_store": store_dir / f"returns_{label}",
+    }
+    out = {
+        "raw": raw_path,
+        "prices": prices_path,
+        "returns": rets_path,
+        "report": report_path,
+        **stores,
+    }
+
+    if (not force) and raw_path.exists() and prices_path.exists() and rets_path.exists():
+        # Caches written before the store existed are migrated once.
+        for store, src in zip(stores.values(), (raw_path, prices_path, rets_path)):
+            if not store.exists():
+                write_panel(pd.read_parquet(src), store)
+        return out
+
+    import yfinance as yf  # only needed on a cache miss
 
     raw = yf.download(
         tickers=list(tickers),
@@ -83,41 +108,31 @@ def fetch_prices_weekly(
 
     # Cache raw adjusted close daily
     adj.to_parquet(raw_path)
+    write_panel(adj, stores["raw_store"])
 
-    weekly_prices = _to_weekly_prices(adj, freq=freq)
-    weekly_prices.to_parquet(weekly_path)
+    prices = _to_freq_prices(adj, freq=freq).astype(dtype)
+    prices.to_parquet(prices_path)
+    write_panel(prices, stores["prices_store"])
 
-    weekly_returns = _simple_returns(weekly_prices)
-    weekly_returns.to_parquet(rets_path)
+    returns = _simple_returns(prices)
+    returns.to_parquet(rets_path)
+    write_panel(returns, stores["returns_store"])
 
     # Quality report
-    missing_pct = (weekly_prices.isna().mean() * 100).round(2).to_dict()
-    coverage = {}
-    for t in tickers:
-        s = weekly_prices[t].dropna()
-        coverage[t] = {
-            "start": str(s.index.min().date()) if not s.empty else None,
-            "end": str(s.index.max().date()) if not s.empty else None,
-            "rows_non_missing": int(s.shape[0]),
-        }
+    missing_pct = (prices.isna().mean() * 100).round(2).to_dict()
 
     report = {
         "tickers": list(tickers),
         "freq": freq,
         "start": start,
         "end": end,
-        "rows_weekly_prices": int(weekly_prices.shape[0]),
-        "rows_weekly_returns": int(weekly_returns.shape[0]),
-        "missing_pct_weekly_prices": missing_pct,
-        "coverage": coverage,
-        "note": "Weekly prices use last available trading day in each W-FRI bucket. Returns are simple pct_change.",
+        f"rows_{label}_prices": int(prices.shape[0]),
+        f"rows_{label}_returns": int(returns.shape[0]),
+        f"missing_pct_{label}_prices": missing_pct,
+        "coverage": coverage(prices[list(tickers)]),
+        "note": f"Prices use last available trading day in each {freq} bucket. Returns are simple pct_change.",
     }
 
     pd.Series(report).to_json(report_path, indent=2)
 
-    return {
-        "raw": raw_path,
-        "weekly_prices": weekly_path,
-        "weekly_returns": rets_path,
-        "report": report_path,
-    }
+    return out
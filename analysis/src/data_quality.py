@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed returns
+SPLIT_RATIOS = (1.5, 2.0, 3.0, 4.0, 5.0, 8.0, 10.0, 20.0)  # forward and reverse splits are both checked
+RATIO_TOL = 0.02  # a price ratio within 2% (in log terms) of a split ratio, or of undoing the last move
+WEEKDAY_ANCHORS = {"W-FRI": 4}
+JUMP_LABELS = ("split", "reversal", "jump")
+BLOCK_BYTES = 64 * 2**20  # sliding-window working set per column block
+
+
+def coverage(panel: pd.DataFrame) -> Dict[str, dict]:
+    """First/last date with data and non-missing row count per column, in one pass."""
+    present = panel.notna().to_numpy()
+    rows = present.sum(axis=0)
+    first = present.argmax(axis=0)
+    last = len(panel) - 1 - present[::-1].argmax(axis=0)
+    days = [str(d.date()) for d in panel.index]
+    return {
+        str(t): {
+            "start": days[first[i]] if rows[i] else None,
+            "end": days[last[i]] if rows[i] else None,
+            "rows_non_missing": int(rows[i]),
+        }
+        for i, t in enumerate(panel.columns)
+    }
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per (row, column): length of the True run ending there (0 if False), and whether a run ends there."""
+    idx = np.arange(len(mask))[:, None]
+    last_false = np.maximum.accumulate(np.where(mask, -1, idx), axis=0)
+    length = np.where(mask, idx - last_false, 0)
+    ends = mask & ~np.vstack([mask[1:], np.zeros((1, mask.shape[1]), dtype=bool)])
+    return length, ends
+
+
+def rolling_median_mad(x: np.ndarray, window: int, min_periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Median and median absolute deviation of the trailing `window` rows of
+    every column, for windows ending at rows window-1 .. T-1 (NaN where
+    fewer than `min_periods` values are present). Exact: each window is
+    sorted as a strided view, column block by column block, so memory
+    stays near BLOCK_BYTES however many columns there are.
+    """
+    T, N = x.shape
+    M = max(T - window + 1, 0)
+    med, mad = np.full((M, N), np.nan), np.full((M, N), np.nan)
+    if M == 0:
+        return med, mad
+    views = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)  # (M, N, window), no copy
+    block = max(1, BLOCK_BYTES // (M * window * 8))
+    for j in range(0, N, block):
+        win = np.sort(views[:, j : j + block], axis=-1)  # NaNs sort last
+        count = window - np.isnan(win).sum(axis=-1)
+        m = _sorted_median(win, count)
+        dev = np.sort(np.abs(win - m[..., None]), axis=-1)
+        d = _sorted_median(dev, count)
+        ok = count >= min_periods
+        med[:, j : j + block] = np.where(ok, m, np.nan)
+        mad[:, j : j + block] = np.where(ok, d, np.nan)
+    return med, mad
+
+
+def _sorted_median(win: np.ndarray, count: np.ndarray) -> np.ndarray:
+    lo = np.clip((count - 1) // 2, 0, None)[..., None]
+    hi = np.clip(count // 2, 0, None)[..., None]
+    out = 0.5 * (np.take_along_axis(win, lo, -1) + np.take_along_axis(win, hi, -1))[..., 0]
+    return np.where(count > 0, out, np.nan)
+
+
+def scan_returns(
+    returns: pd.DataFrame,
+    factors: Mapping[str, pd.DataFrame] | None = None,
+    sources: Mapping[str, str] | None = None,
+    freq: str = "W-FRI",
+    mad_window: int = 52,
+    mad_threshold: float = 6.0,
+    stale_run: int = 3,
+    jump_ratio: float = 1.8,
+    max_issues: int = 500,
+) -> dict:
+    """
+    Data-quality checks over a whole return panel, column-wise:
+
+    - gaps: missing returns between a ticker's first and last observation;
+    - stale prices: `stale_run` or more consecutive exact-zero returns
+      (a repeated price);
+    - outliers: returns more than `mad_threshold` scaled MADs from the
+      median of the preceding `mad_window` returns;
+    - jumps: price ratios 1 + r beyond `jump_ratio` (either way), or at a
+      common split ratio whatever its size, labelled "split" for the
+      latter, "reversal" when the next return undoes it (a bad print or a
+      late adjustment) and "jump" otherwise;
+    - calendar: return dates missing from each factor table (and the
+      reverse), dates off the frequency's anchor weekday, and per ticker the
+      observations with no factor row (against the ticker's own factor
+      source when `sources` maps it, else against every table).
+
+    Returns the extra sections of the quality report (see
+    `QualityReportModel`): `checks`, `summary`, `ticker_checks`, `calendar`,
+    `issues` (the first `max_issues` events by date) and `issues_truncated`.
+    """
+    factors = dict(factors or {})
+    tickers = [str(t) for t in returns.columns]
+    dates = returns.index
+    T = len(dates)
+    x = returns.to_numpy(dtype=float)
+    present = ~np.isnan(x)
+    idx = np.arange(T)[:, None]
+    rows = present.sum(axis=0)
+    first = np.where(rows, present.argmax(axis=0), T)
+    last = np.where(rows, T - 1 - present[::-1].argmax(axis=0), -1)
+
+    gap_mask = ~present & (idx > first) & (idx < last)
+    gap_len, gap_ends = _runs(gap_mask)
+    stale_len, stale_ends = _runs(x == 0.0)
+    stale_ends &= stale_len >= stale_run
+
+    outlier = np.zeros_like(present)
+    if T > mad_window:
+        med, mad = rolling_median_mad(x, mad_window, min_periods=max(mad_window // 2, 2))
+        # row t is judged against the window that ends at t - 1
+        med, mad = med[:-1], mad[:-1]
+        with np.errstate(invalid="ignore"):
+            outlier[mad_window:] = (np.abs(x[mad_window:] - med) > mad_threshold * MAD_SCALE * mad) & (mad > 0)
+
+    # price jumps, coded 0 = none, then one code per label in JUMP_LABELS
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logp = np.log1p(x)
+    jump = np.zeros(x.shape, dtype=np.int8)
+    # split ratios below `jump_ratio` (3:2) are candidates too, so the cut is the lower of the two
+    cut = min(np.log(jump_ratio), np.log(min(SPLIT_RATIOS)) - RATIO_TOL)
+    r, c = np.nonzero(np.abs(np.nan_to_num(logp)) >= cut)
+    lp = logp[r, c]
+    split_like = np.min(np.abs(np.abs(lp)[:, None] - np.log(SPLIT_RATIOS)[None, :]), axis=1, initial=np.inf) < RATIO_TOL
+    keep = split_like | (np.abs(lp) >= np.log(jump_ratio))
+    r, c, lp, split_like = r[keep], c[keep], lp[keep], split_like[keep]
+    if len(r):
+        nxt = np.where(r + 1 < T, logp[np.minimum(r + 1, T - 1), c], np.nan)
+        reversal = np.abs(lp + nxt) < RATIO_TOL
+        jump[r, c] = np.where(reversal, 2, np.where(split_like, 1, 3))
+        jump[r[reversal] + 1, c[reversal]] = 0  # the move that undoes a reversal is part of it
+
+    # calendar alignment
+    valid_rows = present.any(axis=1)
+    calendar: Dict[str, dict] = {"returns": {"rows": int(valid_rows.sum())}}
+    anchor = WEEKDAY_ANCHORS.get(freq)
+    weekday = dates.dayofweek.to_numpy()
+    off = (weekday != anchor) if anchor is not None else (weekday >= 5)
+    calendar["returns"]["off_anchor"] = int((off & valid_rows).sum())
+    calendar["returns"]["off_anchor_examples"] = [str(d.date()) for d in dates[off & valid_rows][:5]]
+    in_factors: Dict[str, np.ndarray] = {}
+    calendar["factors"] = {}
+    for source, df in factors.items():
+        fidx = df.dropna(how="all").index
+        hit = dates.isin(fidx)
+        in_factors[source] = hit
+        span = valid_rows & (dates >= fidx.min()) & (dates <= fidx.max()) if len(fidx) else valid_rows
+        theirs = fidx[(fidx >= dates[valid_rows].min()) & (fidx <= dates[valid_rows].max())] if valid_rows.any() else fidx[:0]
+        missing_in_returns = theirs.difference(dates[valid_rows])
+        calendar["factors"][source] = {
+            "rows": int(len(fidx)),
+            "missing_in_factors": int((span & ~hit).sum()),
+            "missing_in_returns": int(len(missing_in_returns)),
+            "examples": sorted({str(d.date()) for d in [*dates[span & ~hit][:5], *missing_in_returns[:5]]}),
+        }
+    unaligned = np.zeros(x.shape[1], dtype=int)
+    if in_factors:
+        every = np.logical_and.reduce(list(in_factors.values()))
+        own = [sources.get(t) if sources else None for t in tickers]
+        for source in set(own):
+            cols = [j for j, s in enumerate(own) if s == source]
+            hit = in_factors.get(source, every)
+            unaligned[cols] = (present[:, cols] & ~hit[:, None]).sum(axis=0)
+
+    stale_rows = np.where(stale_ends, stale_len, 0)
+    columns = {
+        "missing_pct": np.round(100 * (1 - rows / max(T, 1)), 2),
+        "gap_rows": gap_mask.sum(axis=0),
+        "longest_gap": gap_len.max(axis=0, initial=0),
+        "stale_rows": stale_rows.sum(axis=0),
+        "longest_stale_run": stale_rows.max(axis=0, initial=0),
+        "outliers": outlier.sum(axis=0),
+        **{f"{label}s": (jump == code).sum(axis=0) for code, label in enumerate(JUMP_LABELS, start=1)},
+        "unaligned_rows": unaligned,
+    }
+    ticker_checks = {t: {k: v[j].item() for k, v in columns.items()} for j, t in enumerate(tickers)}
+
+    # one event per flagged cell; runs (gaps, stale prices) are reported once, at their first date
+    kinds = {
+        "gap": (gap_ends, gap_len),
+        "stale": (stale_ends, stale_len),
+        "outlier": (outlier, x),
+        **{label: (jump == code, x) for code, label in enumerate(JUMP_LABELS, start=1)},
+    }
+    parts = []
+    for code, (kind, (mask, values)) in enumerate(kinds.items()):
+        r, c = np.nonzero(mask)
+        v = values[r, c].astype(float)
+        start = r - v.astype(int) + 1 if kind in ("gap", "stale") else r
+        parts.append((start, c, np.full(len(r), code), v))
+    start, col, code, value = (np.concatenate(p) for p in zip(*parts))
+    order = np.lexsort((code, col, start))
+    labels = list(kinds)
+    issues = [
+        {"ticker": tickers[col[k]], "date": str(dates[start[k]].date()), "kind": labels[code[k]], "value": float(value[k])}
+        for k in order[:max_issues]
+    ]
+
+    summary = {
+        "tickers": len(tickers),
+        "rows": T,
+        "gaps": int(gap_ends.sum()),
+        "stale_runs": int(stale_ends.sum()),
+        "outliers": int(outlier.sum()),
+        **{f"{label}s": int(columns[f"{label}s"].sum()) for label in JUMP_LABELS},
+        "unaligned_rows": int(unaligned.sum()),
+        "off_anchor_rows": calendar["returns"]["off_anchor"],
+    }
+    return {
+        "checks": {
+            "freq": freq,
+            "mad_window": mad_window,
+            "mad_threshold": mad_threshold,
+            "stale_run": stale_run,
+            "jump_ratio": jump_ratio,
+        },
+        "summary": summary,
+        "ticker_checks": ticker_checks,
+        "calendar": calendar,
+        "issues": issues,
+        "issues_truncated": len(order) > max_issues,
+    }
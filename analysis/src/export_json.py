@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import re
+import shutil
 from datetime import datetime, timezone
 from pathlib import Path
+import math
 import subprocess
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+try:  # optional: faster serializer for the compact columnar layout
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
+from analysis.src.align import align_on_dates
+from analysis.src.artifacts import normalize_index
 from analysis.src.schemas import (
-    AttributionRow,
-    ExposureRow,
+    ComovementModel,
     ManifestModel,
     MetaModel,
     QualityReportModel,
     RegimesPayload,
 )
+from analysis.src.shards import parse_shard_by, write_shards
+from analysis.src.validation import ATTRIBUTION_COLUMNS, EXPOSURE_COLUMNS, REGIME_COLUMNS, validate_frame
 
 
 def _df_to_records(df: pd.DataFrame, date_col: str = "date") -> list[dict]:
@@ -22,9 +37,156 @@ def _df_to_records(df: pd.DataFrame, date_col: str = "date") -> list[dict]:
     df = df.sort_index()
     df[date_col] = df.index.strftime("%Y-%m-%d")
     df = df.reset_index(drop=True)
+    # NaN is not valid JSON; write missing values as null (as the columnar layout does)
+    nullable = [c for c in df.columns if df[c].hasnans]
+    if nullable:
+        df[nullable] = df[nullable].astype(object).where(df[nullable].notna(), None)
     return df.to_dict(orient="records")
 
 
+def _read_table(src: Path | pd.DataFrame) -> pd.DataFrame:
+    # Stage outputs may be handed over in memory (ArtifactStore) or as parquet paths.
+    return normalize_index(src if isinstance(src, pd.DataFrame) else pd.read_parquet(src))
+
+
+LAYOUTS = ("rows", "columnar")
+
+_ATTRIBUTION_KEEP = {
+    "y",
+    "alpha_contrib",
+    "explained_return",
+    "residual_return",
+    "explained_share",
+    "cum_explained_return",
+    "cum_residual_return",
+}
+
+
+def _attribution_view(df: pd.DataFrame) -> pd.DataFrame:
+    keep = [c for c in df.columns if c in _ATTRIBUTION_KEEP or c.startswith(("contrib_", "cum_contrib_"))]
+    return df[keep]
+
+
+def _columnar(df: pd.DataFrame) -> dict:
+    """{"dates": [...], "columns": {name: [...]}}; numeric columns stay NumPy arrays (NaN -> null on write)."""
+    columns = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            columns[str(c)] = s.to_numpy()
+        else:
+            columns[str(c)] = s.astype("object").where(s.notna(), None).tolist()
+    return {"dates": pd.DatetimeIndex(df.index).strftime("%Y-%m-%d").tolist(), "columns": columns}
+
+
+def _table_payload(df: pd.DataFrame, layout: str, constants: dict | None = None):
+    if layout == "columnar":
+        payload = _columnar(df)
+        if constants:
+            payload["constants"] = constants
+        return payload
+    return _df_to_records(df.assign(**constants) if constants else df)
+
+
+def _plain(value):
+    # json fallback for NumPy arrays inside columnar payloads
+    if isinstance(value, np.ndarray):
+        return [None if isinstance(v, float) and math.isnan(v) else v for v in value.tolist()]
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_bytes(payload, compact: bool) -> bytes:
+    """
+    `payload` as UTF-8 JSON, NumPy arrays included (NaN -> null): indented,
+    or compact (orjson when installed) as the bundle and the query service
+    send it.
+    """
+    if not compact:
+        return json.dumps(payload, indent=2, default=_plain).encode()
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), default=_plain).encode()
+
+
+def _arrow_table(df: pd.DataFrame, constants: dict | None = None) -> pa.Table:
+    """
+    Arrow table with the JSON row keys as columns: `date` (date32) then the
+    frame's columns. Numeric columns wrap the frame's NumPy buffers (NaN
+    becomes null via a validity bitmap); strings are dictionary-encoded.
+    Constants go in the schema metadata, as in the columnar JSON layout.
+    """
+    arrays = {"date": pa.array(pd.DatetimeIndex(df.index).values.astype("datetime64[D]"))}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            arrays[str(c)] = pa.array(s.to_numpy(), from_pandas=True)
+        else:
+            arrays[str(c)] = pa.array(s.astype("object").where(s.notna(), None).tolist()).dictionary_encode()
+    metadata = {"constants": json.dumps(constants)} if constants else None
+    return pa.table(arrays, metadata=metadata)
+
+
+def _arrow_bytes(table: pa.Table) -> bytes:
+    # Uncompressed IPC file format: apache-arrow (JS) reads it without codecs
+    # and can map the buffers straight into typed arrays.
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+_HASHED = re.compile(r"\.[0-9a-f]{12}$")
+
+
+class _BundleWriter:
+    """
+    Writes bundle files only when their bytes change, and records sha256,
+    size and row count per logical file name for the manifest. With
+    `hashed_names`, files are written as `<stem>.<sha12><suffix>` so the site
+    can cache them indefinitely; `prune` removes superseded copies.
+    """
+
+    def __init__(self, out_dir: Path, previous: dict, hashed_names: bool = False):
+        self.out_dir = out_dir
+        self.previous = previous
+        self.hashed_names = hashed_names
+        self.files: dict[str, dict] = {}
+        self.written: list[str] = []
+
+    def write(self, name: str, body: bytes, rows: int | None = None) -> Path:
+        digest = hashlib.sha256(body).hexdigest()
+        stem, suffix = name.rsplit(".", 1)
+        filename = f"{stem}.{digest[:12]}.{suffix}" if self.hashed_names else name
+        path = self.out_dir / filename
+        before = self.previous.get(name) or {}
+        unchanged = before.get("sha256") == digest and before.get("file") == filename
+        if not (unchanged and path.exists() and path.stat().st_size == len(body)):
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(body)
+            tmp.replace(path)
+            self.written.append(filename)
+        self.files[name] = {"file": filename, "sha256": digest, "bytes": len(body), "rows": rows}
+        return path
+
+    def prune(self) -> None:
+        current = {entry["file"] for entry in self.files.values()}
+        # files the previous manifest listed that this run no longer produces (e.g. comovement switched off)
+        for name, entry in self.previous.items():
+            if name not in self.files and entry.get("file") and entry["file"] not in current:
+                (self.out_dir / entry["file"]).unlink(missing_ok=True)
+        for name in self.files:
+            stem, suffix = name.rsplit(".", 1)
+            for path in self.out_dir.glob(f"{stem}*.{suffix}"):
+                old = path.name[: -len(suffix) - 1]
+                if path.name not in current and (old == stem or _HASHED.sub("", old) == stem):
+                    path.unlink()
+
+
+def _stable(manifest: dict) -> dict:
+    # run-specific sections: the timestamp, the --profile rows and the validator's report
+    return {k: v for k, v in manifest.items() if k not in ("build_timestamp", "profile", "validation")}
+
+
 def _validate(model, data):
     if hasattr(model, "model_validate"):
         return model.model_validate(data)
@@ -68,128 +230,173 @@ def _git_commit_hash(start: Path) -> str | None:
 def export_json_bundle(
     out_json_dir: Path,
     meta: dict,
-    exposures_us_path: Path,
-    exposures_intl_path: Path,
-    attrib_us_path: Path,
-    attrib_intl_path: Path,
-    regimes_path: Path,
-    regime_summary_path: Path,
-    quality_report_path: Path | None = None,
+    exposures_us_path: Path | pd.DataFrame,
+    exposures_intl_path: Path | pd.DataFrame,
+    attrib_us_path: Path | pd.DataFrame,
+    attrib_intl_path: Path | pd.DataFrame,
+    regimes_path: Path | pd.DataFrame,
+    regime_summary_path: Path | dict,
+    quality_report_path: Path | dict | None = None,
+    layout: str = "rows",
+    decimals: int | None = None,
+    arrow: bool = True,
+    shard_by: str | int | None = None,
+    hashed_names: bool = False,
+    comovement: Path | dict | None = None,
+    data_quality: Path | dict | None = None,
 ) -> dict[str, Path]:
+    """
+    Validate and write the site JSON bundle. Tables may be parquet paths or
+    in-memory DataFrames; the regime summary and quality report may be paths
+    or their payloads.
+
+    `layout="rows"` writes each table as a list of row objects (indented);
+    `layout="columnar"` writes `{"dates": [...], "columns": {...}}` without
+    indentation, which is several times smaller and faster to write and parse.
+    Tables are validated column-wise (dtype, nulls, ranges, sorted unique
+    dates) rather than one pydantic model per row. `decimals` rounds the
+    exported floats (shorter payloads); None keeps full precision.
+
+    With `arrow=True` the same tables are also written as Arrow IPC files
+    (`<name>.arrow`, same column names as the JSON keys) and listed in the
+    manifest under "binary".
+
+    `shard_by` ("year" or a row count) additionally splits each table into
+    shards under `shards/<name>/` with an `index.json` listing them most
+    recent first (see `analysis.src.shards.write_shards`), so the site can
+    fetch the latest shard before the full history.
+
+    Files whose bytes are unchanged since the last export are not rewritten
+    (compared against the sha256 recorded in the previous manifest), and the
+    manifest lists sha256, size and rows per file under "files". With
+    `hashed_names=True` the files carry their hash in the name
+    (`exposures_equity_us.<sha12>.json`); the site resolves them through
+    the manifest.
+
+    Per sleeve, `aligned_<sleeve>.json` holds exposures, attribution and
+    regimes restricted to their common dates under one `dates` axis, with
+    the rows each table lost recorded under `dropped`; consumers load it
+    as is instead of intersecting dates themselves.
+
+    `comovement` (the payload of the comovement stage, or a path to it) is
+    written as `comovement.json`: packed correlation/covariance triangles
+    and rolling betas for the dashboard's heatmaps.
+
+    `data_quality` (the data-quality stage's scan, or a path to it) is
+    merged into `quality_report.json` before validation.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown export layout {layout!r}; expected one of {LAYOUTS}")
+    shard_by = parse_shard_by(shard_by)
+    compact = layout == "columnar"
     out_json_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_json_dir / "manifest.json"
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    bundle = _BundleWriter(out_json_dir, previous.get("files") or {}, hashed_names)
 
     # meta (validated)
     meta_model = _validate(MetaModel, meta)
-    meta_path = out_json_dir / "meta.json"
-    meta_path.write_text(_model_dump_json(meta_model, indent=2))
-
-    # exposures
-    exp_us = pd.read_parquet(exposures_us_path)
-    exp_intl = pd.read_parquet(exposures_intl_path)
-    for df in (exp_us, exp_intl):
-        df["rolling_window_weeks"] = meta.get("rolling_window_weeks")
-        df["min_nobs"] = meta.get("min_nobs")
-
-    exp_us_rows = _df_to_records(exp_us)
-    exp_intl_rows = _df_to_records(exp_intl)
-    for row in exp_us_rows:
-        _validate(ExposureRow, row)
-    for row in exp_intl_rows:
-        _validate(ExposureRow, row)
-
-    (out_json_dir / "exposures_equity_us.json").write_text(json.dumps(exp_us_rows, indent=2))
-    (out_json_dir / "exposures_equity_intl.json").write_text(json.dumps(exp_intl_rows, indent=2))
-
-    (out_json_dir / "exposures_equity_us.json").write_text(json.dumps(exp_us_rows, indent=2))
-    (out_json_dir / "exposures_equity_intl.json").write_text(json.dumps(exp_intl_rows, indent=2))
-
-    exp_us_rows = _df_to_records(exp_us)
-    exp_intl_rows = _df_to_records(exp_intl)
-    for row in exp_us_rows:
-        _validate(ExposureRow, row)
-    for row in exp_intl_rows:
-        _validate(ExposureRow, row)
-
-    (out_json_dir / "exposures_equity_us.json").write_text(json.dumps(exp_us_rows, indent=2))
-    (out_json_dir / "exposures_equity_intl.json").write_text(json.dumps(exp_intl_rows, indent=2))
-
-    # attribution
-    a_us = pd.read_parquet(attrib_us_path)
-    a_intl = pd.read_parquet(attrib_intl_path)
-
-    keep_cols = [
-        c
-        for c in a_us.columns
-        if c
-        in {
-            "y",
-            "alpha_contrib",
-            "explained_return",
-            "residual_return",
-            "explained_share",
-            "cum_explained_return",
-            "cum_residual_return",
-        }
-        or c.startswith("contrib_")
-        or c.startswith("cum_contrib_")
-    ]
-    attrib_us_rows = _df_to_records(a_us[keep_cols])
-    attrib_intl_rows = _df_to_records(a_intl[keep_cols_i])
-    for row in attrib_us_rows:
-        if not any(k.startswith("contrib_") for k in row.keys()):
-            raise ValueError("Attribution row missing factor contributions.")
-        _validate(AttributionRow, row)
-    for row in attrib_intl_rows:
-        if not any(k.startswith("contrib_") for k in row.keys()):
-            raise ValueError("Attribution row missing factor contributions.")
-        _validate(AttributionRow, row)
-
-    (out_json_dir / "attribution_equity_us.json").write_text(json.dumps(attrib_us_rows, indent=2))
-
-    keep_cols_i = [
-        c
-        for c in a_intl.columns
-        if c
-        in {
-            "y",
-            "alpha_contrib",
-            "explained_return",
-            "residual_return",
-            "explained_share",
-            "cum_explained_return",
-            "cum_residual_return",
-        }
-        or c.startswith("contrib_")
-        or c.startswith("cum_contrib_")
-    ]
-    (out_json_dir / "attribution_equity_intl.json").write_text(json.dumps(attrib_intl_rows, indent=2))
+    meta_path = bundle.write("meta.json", _model_dump_json(meta_model, indent=2).encode())
 
-    # regimes
-    reg = pd.read_parquet(regimes_path)
-    reg = reg[["regime", "vol", "vol_thresh"]].copy()
-    reg_rows = _df_to_records(reg)
+    tables = {
+        "exposures_equity_us": (_read_table(exposures_us_path), EXPOSURE_COLUMNS, ("beta_",)),
+        "exposures_equity_intl": (_read_table(exposures_intl_path), EXPOSURE_COLUMNS, ("beta_",)),
+        "attribution_equity_us": (_attribution_view(_read_table(attrib_us_path)), ATTRIBUTION_COLUMNS, ("contrib_",)),
+        "attribution_equity_intl": (_attribution_view(_read_table(attrib_intl_path)), ATTRIBUTION_COLUMNS, ("contrib_",)),
+    }
+    constants = {"rolling_window_weeks": meta.get("rolling_window_weeks"), "min_nobs": meta.get("min_nobs")}
+    table_paths, arrow_files, shard_indexes, exported = {}, {}, {}, {}
+
+    def _shard(name: str, df: pd.DataFrame, table_constants: dict | None = None) -> None:
+        write_shards(
+            out_json_dir / "shards" / name,
+            name,
+            df,
+            shard_by,
+            encode=lambda part: json_bytes(_table_payload(part, layout, table_constants), compact),
+        )
+        shard_indexes[name] = f"shards/{name}/index.json"
+
+    for name, (df, specs, prefixed) in tables.items():
+        validate_frame(df, specs, name, prefixed=prefixed)
+        if decimals is not None:
+            df = df.round(decimals)
+        table_constants = constants if name.startswith("exposures_") else None
+        exported[name] = df
+        table_paths[name] = bundle.write(
+            f"{name}.json", json_bytes(_table_payload(df, layout, table_constants), compact), rows=len(df)
+        )
+        if shard_by is not None:
+            _shard(name, df, table_constants)
+        if arrow:
+            arrow_files[name] = bundle.write(f"{name}.arrow", _arrow_bytes(_arrow_table(df, table_constants)), rows=len(df)).name
 
-    summary_payload = json.loads(Path(regime_summary_path).read_text())
+    # regimes
+    reg = _read_table(regimes_path)[["regime", "vol", "vol_thresh"]]
+    validate_frame(reg, REGIME_COLUMNS, "regimes")
+    if decimals is not None:
+        reg = reg.round(decimals)
+
+    if isinstance(regime_summary_path, dict):
+        summary_payload = regime_summary_path
+    else:
+        summary_payload = json.loads(Path(regime_summary_path).read_text())
     regimes_payload = {
         "metadata": summary_payload.get("metadata", {}),
         "stress_fraction": summary_payload.get("stress_fraction"),
         "summary": summary_payload.get("summary", {}),
-        "data": reg_rows,
+        "data": [],
     }
-    _validate(RegimesPayload, regimes_payload)
-
-    (out_json_dir / "regimes.json").write_text(json.dumps(regimes_payload, indent=2))
+    _validate(RegimesPayload, regimes_payload)  # header only; rows were checked column-wise
+    regimes_payload["data"] = _table_payload(reg, layout)
+    table_paths["regimes"] = bundle.write("regimes.json", json_bytes(regimes_payload, compact), rows=len(reg))
+    if shard_by is not None:
+        _shard("regimes", reg)
+    if arrow:
+        arrow_files["regimes"] = bundle.write("regimes.arrow", _arrow_bytes(_arrow_table(reg)), rows=len(reg)).name
+
+    # aligned bundles: exposures, attribution and regimes on one shared date axis per sleeve
+    aligned_info = {}
+    for sleeve in ("equity_us", "equity_intl"):
+        dates, parts, dropped = align_on_dates(
+            {"exposures": exported[f"exposures_{sleeve}"], "attribution": exported[f"attribution_{sleeve}"], "regimes": reg}
+        )
+        labels = dates.strftime("%Y-%m-%d").tolist()
+        span_info = {"rows": len(labels), "start": labels[0] if labels else None, "end": labels[-1] if labels else None}
+        payload = {"sleeve": sleeve, "dates": labels, **span_info, "dropped": dropped}
+        for part, df in parts.items():
+            payload[part] = {"columns": _columnar(df)["columns"]}
+        payload["exposures"]["constants"] = constants
+        path = bundle.write(f"aligned_{sleeve}.json", json_bytes(payload, compact=True), rows=len(labels))
+        table_paths[f"aligned_{sleeve}"] = path
+        aligned_info[sleeve] = {"file": path.name, **span_info, "dropped": dropped}
 
     # regime summary (already json)
-    out_sum = out_json_dir / "regime_summary.json"
-    out_sum.write_text(json.dumps(summary_payload, indent=2))
+    out_sum = bundle.write("regime_summary.json", json.dumps(summary_payload, indent=2).encode())
 
     quality_path = None
-    if quality_report_path is not None and quality_report_path.exists():
+    quality_payload = None
+    if isinstance(quality_report_path, dict):
+        quality_payload = quality_report_path
+    elif quality_report_path is not None and Path(quality_report_path).exists():
         quality_payload = json.loads(Path(quality_report_path).read_text())
+    if quality_payload is not None and data_quality is not None:
+        scan = data_quality if isinstance(data_quality, dict) else json.loads(Path(data_quality).read_text())
+        quality_payload = {**quality_payload, **scan}
+    if quality_payload is not None:
         _validate(QualityReportModel, quality_payload)
-        quality_path = out_json_dir / "quality_report.json"
-        quality_path.write_text(json.dumps(quality_payload, indent=2))
+        quality_path = bundle.write("quality_report.json", json.dumps(quality_payload, indent=2).encode())
+
+    comovement_path = None
+    if comovement is not None:
+        comovement_payload = comovement if isinstance(comovement, dict) else json.loads(Path(comovement).read_text())
+        _validate(ComovementModel, comovement_payload)
+        comovement_path = bundle.write(
+            "comovement.json", json_bytes(comovement_payload, compact=True), rows=len(comovement_payload["betas"]["dates"])
+        )
+    bundle.prune()
+    for name in (previous.get("shards") or {}).keys() - shard_indexes.keys():
+        shutil.rmtree(out_json_dir / "shards" / name, ignore_errors=True)
 
     # manifest
     manifest = {
@@ -204,6 +411,11 @@ def export_json_bundle(
             "factor_set": meta_model.factor_set,
         },
         "regime_rule": meta_model.regime,
+        "export_layout": layout,
+        "files": bundle.files,
+        "binary": {"format": "arrow-ipc", "files": arrow_files} if arrow else None,
+        "shards": shard_indexes or None,
+        "aligned": aligned_info,
         "units": {
             "returns": "decimals (e.g., 0.01 = 1%)",
             "factors": "decimals (e.g., 0.01 = 1%)",
@@ -216,17 +428,50 @@ def export_json_bundle(
         ],
     }
     manifest_model = _validate(ManifestModel, manifest)
-    manifest_path = out_json_dir / "manifest.json"
-    manifest_path.write_text(_model_dump_json(manifest_model, indent=2))
+    # With nothing changed, the previous manifest (and its timestamp) stays as is.
+    text = _model_dump_json(manifest_model, indent=2)
+    if bundle.written or _stable(json.loads(text)) != _stable(previous):
+        manifest_path.write_text(text)
 
     return {
         "meta": meta_path,
-        "exposures_us": out_json_dir / "exposures_equity_us.json",
-        "exposures_intl": out_json_dir / "exposures_equity_intl.json",
-        "attrib_us": out_json_dir / "attribution_equity_us.json",
-        "attrib_intl": out_json_dir / "attribution_equity_intl.json",
-        "regimes": out_json_dir / "regimes.json",
+        "exposures_us": table_paths["exposures_equity_us"],
+        "exposures_intl": table_paths["exposures_equity_intl"],
+        "attrib_us": table_paths["attribution_equity_us"],
+        "attrib_intl": table_paths["attribution_equity_intl"],
+        "regimes": table_paths["regimes"],
         "regime_summary": out_sum,
         "manifest": manifest_path,
         "quality_report": quality_path,
+        "comovement": comovement_path,
+        "aligned_us": table_paths["aligned_equity_us"],
+        "aligned_intl": table_paths["aligned_equity_intl"],
+        **{f"arrow_{name}": out_json_dir / f for name, f in arrow_files.items()},
     }
+
+
+def attach_to_manifest(out_json_dir: Path, key: str, payload) -> Path | None:
+    """Add `key` to an exported manifest.json (e.g. the profile summary); no-op if there is none."""
+    manifest_path = out_json_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text())
+    manifest[key] = payload
+    manifest_model = _validate(ManifestModel, manifest)
+    manifest_path.write_text(_model_dump_json(manifest_model, indent=2))
+    return manifest_path
+
+
+def bundle_files(out_json_dir: Path) -> list[Path]:
+    """Every file of an exported bundle: manifest.json, the files it lists and the shards their indexes list."""
+    manifest_path = out_json_dir / "manifest.json"
+    if not manifest_path.exists():
+        return [manifest_path]
+    manifest = json.loads(manifest_path.read_text())
+    paths = [manifest_path, *(out_json_dir / entry["file"] for entry in (manifest.get("files") or {}).values())]
+    for index in (manifest.get("shards") or {}).values():
+        index_path = out_json_dir / index
+        paths.append(index_path)
+        if index_path.exists():
+            paths += [index_path.parent / e["file"] for e in json.loads(index_path.read_text())["shards"]]
+    return paths
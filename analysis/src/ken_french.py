@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.profiling import span
+
+FF_BASE_URL = "https://mba.tuck.dartmouth.edu/pages/faculty/ken.french/ftp/"
+
+# Ken French marks missing observations with these sentinels.
+_MISSING_SENTINELS = (-99.99, -999.0)
+
+
+@dataclass
+class KFTable:
+    """One table from a Ken French CSV: integer yyyymmdd/yyyymm/yyyy keys + float values."""
+
+    title: str
+    columns: List[str]
+    keys: np.ndarray  # int64
+    values: np.ndarray  # float64, shape (rows, len(columns))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=_keys_to_index(self.keys), columns=self.columns)
+
+
+def _keys_to_index(keys: np.ndarray) -> pd.DatetimeIndex:
+    if keys.size == 0:
+        return pd.DatetimeIndex([], name="date")
+    digits = len(str(int(keys[0])))
+    fmt = {8: "%Y%m%d", 6: "%Y%m", 4: "%Y"}.get(digits)
+    if fmt is None:
+        raise ValueError(f"Unrecognized Ken French date key: {keys[0]}")
+    return pd.DatetimeIndex(pd.to_datetime(keys.astype(str), format=fmt), name="date")
+
+
+def _is_data_line(line: str) -> bool:
+    head = line.split(",", 1)[0].strip()
+    return head.isdigit()
+
+
+def parse_csv_text(text: str) -> List[KFTable]:
+    """
+    Split a Ken French CSV into its tables.
+
+    A table is a header line starting with "," (the date column is unnamed)
+    followed by data lines whose first field is a numeric date key. The title
+    is the last non-blank text line before the header.
+    """
+    lines = text.splitlines()
+    tables: List[KFTable] = []
+    title = ""
+    i = 0
+    n = len(lines)
+    while i < n:
+        line = lines[i]
+        stripped = line.strip()
+        if stripped.startswith(",") and i + 1 < n and _is_data_line(lines[i + 1]):
+            columns = [c.strip() for c in stripped.split(",")[1:]]
+            j = i + 1
+            while j < n and _is_data_line(lines[j]):
+                j += 1
+            block = np.loadtxt(lines[i + 1 : j], delimiter=",", dtype=np.float64, ndmin=2)
+            values = block[:, 1 : 1 + len(columns)]
+            values[np.isin(values, _MISSING_SENTINELS)] = np.nan
+            tables.append(
+                KFTable(
+                    title=title or "main",
+                    columns=columns,
+                    keys=block[:, 0].astype(np.int64),
+                    values=np.ascontiguousarray(values),
+                )
+            )
+            title = ""
+            i = j
+            continue
+        if stripped and not _is_data_line(line):
+            title = stripped
+        i += 1
+    return tables
+
+
+def parse_archive(zip_path: Path) -> List[KFTable]:
+    with zipfile.ZipFile(zip_path) as zf:
+        member = next(m for m in zf.namelist() if m.lower().endswith(".csv"))
+        text = zf.read(member).decode("latin-1")
+    return parse_csv_text(text)
+
+
+def download_archive(dataset: str, raw_dir: Path, force: bool = False, timeout: float = 60.0) -> Path:
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = raw_dir / f"{dataset}_CSV.zip"
+    if zip_path.exists() and not force:
+        return zip_path
+
+    url = f"{FF_BASE_URL}{dataset}_CSV.zip"
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        payload = resp.read()
+    tmp = zip_path.with_suffix(".zip.tmp")
+    tmp.write_bytes(payload)
+    tmp.replace(zip_path)
+    return zip_path
+
+
+def load_tables(dataset: str, raw_dir: Path, force: bool = False) -> List[pd.DataFrame]:
+    """
+    Return every table of a Ken French dataset as DataFrames (values as published, in percent).
+
+    Parsed tables are cached as parquet under `raw_dir/<dataset>/` next to the
+    downloaded zip, so later calls never touch the network or the CSV parser.
+    """
+    table_dir = raw_dir / dataset
+    index_path = table_dir / "tables.json"
+    if index_path.exists() and not force:
+        index = json.loads(index_path.read_text())
+        return [pd.read_parquet(table_dir / entry["file"]) for entry in index]
+
+    with span("parse_archive", dataset=dataset):
+        tables = parse_archive(download_archive(dataset, raw_dir, force=force))
+    table_dir.mkdir(parents=True, exist_ok=True)
+    index = []
+    frames = []
+    for k, table in enumerate(tables):
+        df = table.to_frame()
+        name = f"table_{k}.parquet"
+        df.to_parquet(table_dir / name)
+        index.append({"file": name, "title": table.title, "columns": table.columns, "rows": int(len(df))})
+        frames.append(df)
+    index_path.write_text(json.dumps(index, indent=2))
+    return frames
@@ -8,6 +8,8 @@ from typing import Dict
 
 import pandas as pd
 
+from analysis.src.store import read_panel
+
 
 @dataclass(frozen=True)
 class PortfolioSummary:
@@ -26,7 +28,7 @@ class PortfolioSummary:
 def _freq_to_periods_per_year(freq: str) -> int:
     if freq.upper().startswith("W"):
         return 52
-    if freq.upper().startswith("D"):
+    if freq.upper().startswith(("D", "B")):
         return 252
     if freq.upper().startswith("M"):
         return 12
@@ -46,13 +48,12 @@ def compute_portfolio_returns(
     weights: Dict[str, float],
     missing_price_policy: str = "drop_any",
 ) -> pd.Series:
-    r = returns.copy()
-    w = _normalize_weights(weights, r.columns)
+    w = _normalize_weights(weights, returns.columns)
 
     if missing_price_policy == "drop_any":
-        r = r.dropna(how="any")
+        r = returns.dropna(how="any")
     elif missing_price_policy == "drop_all":
-        r = r.dropna(how="all")
+        r = returns.dropna(how="all")
     else:
         raise ValueError(f"Unknown missing_price_policy: {missing_price_policy}")
 
@@ -111,16 +112,15 @@ def summarize_portfolio(
 
 
 def write_portfolio_summary(
-    returns_path: Path,
+    returns_path: Path | pd.DataFrame,
     out_path: Path,
     weights: Dict[str, float],
     freq: str,
     missing_price_policy: str = "drop_any",
     compounding: str = "geometric",
 ) -> Path:
-    df = pd.read_parquet(returns_path)
-    df.index = pd.to_datetime(df.index)
-    df = df.sort_index()
+    """`returns_path` may be a parquet/store path or a returns panel already in memory."""
+    df = read_panel(returns_path, tickers=list(weights))
 
     summary = summarize_portfolio(
         returns=df,
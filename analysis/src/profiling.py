@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Profiling is off unless `enable()` is called. While off, `span()` returns a
+# shared no-op object, so instrumented code pays one global lookup per call.
+_ENABLED = False
+_EVENTS: List[dict] = []
+_PROC_IO = Path("/proc/self/io")
+_PROC_STATM = Path("/proc/self/statm")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def set(self, **args: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def enable(flag: bool = True) -> None:
+    global _ENABLED
+    _ENABLED = flag
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mb() -> float | None:
+    """Current resident set size of this process, where the OS reports it."""
+    try:
+        pages = int(_PROC_STATM.read_text().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def _io_bytes() -> tuple[int, int] | None:
+    """
+    (bytes read from, bytes written to) the storage layer by this process so
+    far, where the OS reports it: /proc read_bytes / write_bytes, so page-cache
+    hits, /proc reads and pipes don't count.
+    """
+    try:
+        fields = dict(line.split(": ") for line in _PROC_IO.read_text().splitlines())
+    except (OSError, ValueError):
+        return None
+    return int(fields["read_bytes"]), int(fields["write_bytes"])
+
+
+def rows(value: Any) -> int:
+    """Row count of a table artifact (0 for payloads that aren't tables)."""
+    shape = getattr(value, "shape", None)
+    return int(shape[0]) if shape else 0
+
+
+class Span:
+    """
+    Times one stage or sub-step: wall and CPU seconds, the change in resident
+    memory over the span, the process-wide peak RSS so far (a high-water mark,
+    not the span's own peak), net allocated blocks, the process's disk I/O
+    over the span, plus caller-supplied args such as rows_in / rows_out (add
+    them with `set` before the span closes).
+
+    The I/O columns are process-level, not the span's own: they count what
+    every thread of the process read from or wrote to disk while the span
+    was open (e.g. the ArtifactStore's background writes of earlier stages),
+    and a read served from the page cache counts nothing.
+    """
+
+    __slots__ = ("name", "cat", "args", "_start")
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self._start: tuple = ()
+
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        self._start = (time.perf_counter(), time.process_time(), sys.getallocatedblocks(), _io_bytes(), _rss_mb())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        wall0, cpu0, blocks0, io0, rss0 = self._start
+        wall1, cpu1, io1, rss1 = time.perf_counter(), time.process_time(), _io_bytes(), _rss_mb()
+        args = {
+            "cpu_s": round(cpu1 - cpu0, 6),
+            "rss_delta_mb": round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None,
+            "process_peak_rss_mb": round(_peak_rss_mb(), 1),
+            "alloc_blocks": sys.getallocatedblocks() - blocks0,
+            "process_read_bytes": io1[0] - io0[0] if io0 and io1 else None,
+            "process_write_bytes": io1[1] - io0[1] if io0 and io1 else None,
+            **self.args,
+        }
+        _EVENTS.append(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": wall0 * 1e6,
+                "dur": (wall1 - wall0) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+
+def span(name: str, cat: str = "step", **args: Any) -> Span | _NoopSpan:
+    if not _ENABLED:
+        return _NOOP
+    return Span(name, cat, args)
+
+
+def collect() -> List[dict]:
+    """Return and clear the events recorded in this process."""
+    events = list(_EVENTS)
+    del _EVENTS[: len(events)]
+    return events
+
+
+def extend(events: List[dict]) -> None:
+    """Add events recorded elsewhere (e.g. in a worker process)."""
+    _EVENTS.extend(events)
+
+
+def write_trace(events: List[dict], path: Path) -> Path:
+    """Write Chrome trace-event JSON (opens in chrome://tracing and ui.perfetto.dev)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    t0 = min((e["ts"] for e in events), default=0.0)
+    trace = [{**e, "ts": round(e["ts"] - t0, 1), "dur": round(e["dur"], 1)} for e in events]
+    path.write_text(json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}))
+    return path
+
+
+_SUMMARY_COLUMNS = (
+    "wall_s",
+    "cpu_s",
+    "rss_delta_mb",
+    "process_peak_rss_mb",
+    "alloc_blocks",
+    "rows_in",
+    "rows_out",
+    "process_read_bytes",
+    "process_write_bytes",
+)
+
+
+def summarize(events: List[dict]) -> List[dict]:
+    """One row per stage/step event, stages first in start order."""
+    ordered = sorted(events, key=lambda e: (e["cat"] != "stage", e["ts"]))
+    out = []
+    for e in ordered:
+        row = {"name": e["name"], "kind": e["cat"], "wall_s": round(e["dur"] / 1e6, 4)}
+        row.update({k: e["args"].get(k) for k in _SUMMARY_COLUMNS if k != "wall_s"})
+        out.append(row)
+    return out
+
+
+def format_table(summary: List[dict]) -> str:
+    headers = ("name", "kind", *_SUMMARY_COLUMNS)
+    cells = [[("" if r.get(h) is None else str(r.get(h))) for h in headers] for r in summary]
+    widths = [max([len(h)] + [len(c[k]) for c in cells]) for k, h in enumerate(headers)]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(c.ljust(w) for c, w in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
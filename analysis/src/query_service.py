@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.align import align_on_dates
+from analysis.src.artifacts import GENERATION_FILE, normalize_index
+from analysis.src.export_json import json_bytes
+from analysis.src.validation import validate_dates
+
+GZIP_MIN_BYTES = 1024
+CACHE_ENTRIES = 256
+
+
+class QueryError(ValueError):
+    """Bad request parameters (reported as HTTP 400)."""
+
+
+def _parse_date(value: str | None, name: str) -> np.datetime64 | None:
+    if not value:
+        return None
+    try:
+        return np.datetime64(pd.Timestamp(value).date(), "D")
+    except ValueError:
+        raise QueryError(f"{name}: expected YYYY-MM-DD, got {value!r}") from None
+
+
+class Table:
+    """
+    One date-indexed table held as a sorted day array plus per-column arrays.
+    Numeric columns stay NumPy (sliced as views); others are plain lists.
+    Range lookups are binary searches on the day array.
+    """
+
+    def __init__(self, name: str, df: pd.DataFrame):
+        df = normalize_index(df)
+        validate_dates(df.index, name)
+        self.name = name
+        self.days = df.index.values.astype("datetime64[D]")
+        self.labels: List[str] = np.datetime_as_string(self.days).tolist()
+        self.columns: Dict[str, Any] = {}
+        for c in df.columns:
+            s = df[c]
+            if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+                self.columns[str(c)] = s.to_numpy()
+            else:
+                self.columns[str(c)] = s.astype("object").where(s.notna(), None).tolist()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def bounds(self, start: np.datetime64 | None, end: np.datetime64 | None, last: int | None = None) -> Tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(self.days, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.days, end, side="right"))
+        if last is not None:
+            lo = max(lo, hi - last)
+        return lo, max(lo, hi)
+
+    def pick(self, columns: Sequence[str] | None) -> List[str]:
+        if not columns:
+            return list(self.columns)
+        unknown = [c for c in columns if c not in self.columns]
+        if unknown:
+            raise QueryError(f"{self.name}: unknown columns {unknown}")
+        return list(columns)
+
+    def columnar(self, lo: int, hi: int, columns: Sequence[str]) -> dict:
+        return {c: self.columns[c][lo:hi] for c in columns}
+
+    def rows(self, lo: int, hi: int, columns: Sequence[str]) -> List[dict]:
+        values = []
+        for c in columns:
+            part = self.columns[c][lo:hi]
+            if isinstance(part, np.ndarray):
+                part = [None if isinstance(v, float) and math.isnan(v) else v for v in part.tolist()]
+            values.append(part)
+        keys = ("date", *columns)
+        return [dict(zip(keys, row)) for row in zip(self.labels[lo:hi], *values)]
+
+    def describe(self) -> dict:
+        return {
+            "rows": len(self),
+            "start": self.labels[0] if self.labels else None,
+            "end": self.labels[-1] if self.labels else None,
+            "columns": list(self.columns),
+        }
+
+
+class Snapshot:
+    """
+    Everything one request needs: the tables, the per-sleeve aligned views,
+    the manifest and a version string. Built completely before it replaces
+    the previous snapshot, so a request never sees a half-loaded state.
+    """
+
+    def __init__(self, tables: Dict[str, Table], aligned: Dict[str, Dict[str, Table]], manifest: dict, version: str):
+        self.tables = tables
+        self.aligned = aligned
+        self.manifest = manifest
+        self.version = version
+        self.loaded_at = time.time()
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, key: tuple):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+            return hit
+
+    def remember(self, key: tuple, value) -> None:
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+
+
+def load_snapshot(out_data: Path, manifest_path: Path, version: str) -> Snapshot:
+    """Read the exposures, attribution and regimes parquet outputs under `out_data`."""
+    tables: Dict[str, Table] = {}
+    frames: Dict[str, pd.DataFrame] = {}
+    for kind, folder, prefix in (("exposures", "exposures", "exposures_"), ("attribution", "attribution", "attrib_")):
+        for path in sorted((out_data / folder).glob(f"{prefix}*.parquet")):
+            name = f"{kind}/{path.stem.removeprefix(prefix)}"
+            frames[name] = normalize_index(pd.read_parquet(path))
+    regimes_path = out_data / "regimes" / "regimes.parquet"
+    if regimes_path.exists():
+        frames["regimes"] = normalize_index(pd.read_parquet(regimes_path))
+    for name, df in frames.items():
+        tables[name] = Table(name, df)
+
+    aligned: Dict[str, Dict[str, Table]] = {}
+    if "regimes" in frames:
+        for name in frames:
+            if not name.startswith("exposures/"):
+                continue
+            sleeve = name.split("/", 1)[1]
+            if f"attribution/{sleeve}" not in frames:
+                continue
+            _, parts, _ = align_on_dates(
+                {"exposures": frames[name], "attribution": frames[f"attribution/{sleeve}"], "regimes": frames["regimes"]}
+            )
+            aligned[sleeve] = {part: Table(f"{sleeve}.{part}", df) for part, df in parts.items()}
+
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    return Snapshot(tables, aligned, manifest, version)
+
+
+class QueryService:
+    """
+    Serves slices of the pipeline outputs from memory. `reload_if_changed`
+    builds a new snapshot when the generation marker under `out_data`
+    changes and swaps it in with one assignment; a failed load keeps the
+    current snapshot. The pipeline and the watcher bump the marker only once
+    a run's outputs are all written (see `write_generation`), whether or not
+    the run exported a bundle, so a reload never sees half of a run.
+    """
+
+    def __init__(self, out_data: Path, manifest_path: Path, log=print):
+        self.out_data = out_data
+        self.manifest_path = manifest_path
+        self.generation_path = out_data / GENERATION_FILE
+        self.log = log
+        self._signature: tuple | None = None
+        self.snapshot: Snapshot | None = None
+        self.reload_if_changed()
+
+    def signature(self) -> tuple:
+        # the marker's content, not its mtime: a counter bump is seen even on coarse clocks
+        try:
+            return (str(self.generation_path), self.generation_path.read_bytes())
+        except FileNotFoundError:
+            return (str(self.generation_path), None)
+
+    def reload_if_changed(self) -> bool:
+        sig = self.signature()
+        if sig == self._signature:
+            return False
+        version = hashlib.sha256(repr(sig).encode()).hexdigest()[:16]
+        try:
+            snapshot = load_snapshot(self.out_data, self.manifest_path, version)
+        except Exception as exc:
+            self.log(f"[serve] reload failed, keeping version {self.snapshot.version if self.snapshot else None}: {exc}")
+            return False
+        self.snapshot = snapshot
+        self._signature = sig
+        self.log(f"[serve] loaded version {version}: {len(snapshot.tables)} tables")
+        return True
+
+    def watch(self, stop: threading.Event, poll_seconds: float = 5.0) -> None:
+        while not stop.wait(poll_seconds):
+            self.reload_if_changed()
+
+    def handle(self, snap: Snapshot | None, path: str, query: Dict[str, List[str]]) -> Tuple[int, Any]:
+        """(status, payload) for one GET against `snap`; raises QueryError for bad parameters."""
+        if snap is None:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "no data loaded"}
+        parts = [p for p in path.split("/") if p]
+        arg = {k: v[-1] for k, v in query.items()}
+        start, end = _parse_date(arg.get("start"), "start"), _parse_date(arg.get("end"), "end")
+        columns = [c for c in arg.get("columns", "").split(",") if c]
+        try:
+            last = int(arg["last"]) if "last" in arg else None
+        except ValueError:
+            raise QueryError(f"last: expected an integer, got {arg['last']!r}") from None
+        fmt = arg.get("format", "columnar")
+        if fmt not in ("columnar", "rows"):
+            raise QueryError(f"format: expected 'columnar' or 'rows', got {fmt!r}")
+
+        if parts in ([], ["health"]):
+            return HTTPStatus.OK, {"status": "ok", "version": snap.version, "loaded_at": snap.loaded_at}
+        if parts == ["manifest"]:
+            return HTTPStatus.OK, snap.manifest
+        if parts == ["tables"]:
+            return HTTPStatus.OK, {
+                "version": snap.version,
+                "tables": {name: t.describe() for name, t in snap.tables.items()},
+                "sleeves": sorted(snap.aligned),
+            }
+        if parts[0] == "tables" and "/".join(parts[1:]) in snap.tables:
+            table = snap.tables["/".join(parts[1:])]
+            cols = table.pick(columns)
+            lo, hi = table.bounds(start, end, last)
+            payload = {"table": table.name, "rows": hi - lo}
+            if fmt == "rows":
+                payload["data"] = table.rows(lo, hi, cols)
+            else:
+                payload.update(dates=table.labels[lo:hi], columns=table.columnar(lo, hi, cols))
+            return HTTPStatus.OK, payload
+        if len(parts) == 2 and parts[0] == "sleeves" and parts[1] in snap.aligned:
+            views = snap.aligned[parts[1]]
+            lo, hi = views["exposures"].bounds(start, end, last)  # all three share one date axis
+            payload = {"sleeve": parts[1], "rows": hi - lo, "dates": views["exposures"].labels[lo:hi]}
+            for part, table in views.items():
+                picked = [c for c in columns if c in table.columns] if columns else list(table.columns)
+                payload[part] = {"columns": table.columnar(lo, hi, picked)}
+            return HTTPStatus.OK, payload
+        return HTTPStatus.NOT_FOUND, {"error": f"no route for {path}"}
+
+    def respond(self, raw_path: str, accept_gzip: bool) -> Tuple[int, bytes, str, bool]:
+        """(status, body, etag, gzipped) for a request path, served from the snapshot's cache."""
+        snap = self.snapshot  # read once: the body and the ETag come from the same version
+        url = urlsplit(raw_path)
+        query = parse_qs(url.query)
+        key = (url.path.rstrip("/") or "/", tuple(sorted((k, tuple(v)) for k, v in query.items())), accept_gzip)
+        version = snap.version if snap is not None else "none"
+        if snap is not None:
+            hit = snap.cached(key)
+            if hit is not None:
+                return hit
+        try:
+            status, payload = self.handle(snap, url.path, query)
+        except QueryError as exc:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+        body = json_bytes(payload, compact=True)
+        etag = '"' + hashlib.sha1(f"{version}|{key[0]}|{key[1]}".encode()).hexdigest()[:24] + '"'
+        gzipped = accept_gzip and len(body) >= GZIP_MIN_BYTES
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+            etag = etag[:-1] + '-gz"'  # representations differ per encoding
+        result = (int(status), body, etag, gzipped)
+        if snap is not None and status == HTTPStatus.OK:
+            snap.remember(key, result)
+        return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "factor-attrib-query/1"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        service: QueryService = self.server.service  # type: ignore[attr-defined]
+        accept_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        status, body, etag, gzipped = service.respond(self.path, accept_gzip)
+        tags = {t.strip().removeprefix("W/") for t in self.headers.get("If-None-Match", "").split(",") if t.strip()}
+        if status == HTTPStatus.OK and (etag in tags or "*" in tags):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if status == HTTPStatus.OK:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+
+def make_server(service: QueryService, host: str = "127.0.0.1", port: int = 8765, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
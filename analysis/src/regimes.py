@@ -4,6 +4,12 @@ import json
 import numpy as np
 import pandas as pd
 
+from analysis.src.artifacts import normalize_index
+from analysis.src.store import read_panel
+
+
+REGIME_LABELS = ["calm", "stress"]
+
 
 def _max_drawdown(returns: pd.Series) -> float:
     wealth = (1 + returns).cumprod()
@@ -22,31 +28,34 @@ def compute_regimes(
     - vol_t = rolling std over vol_window
     - threshold_t computed from trailing lookback of vol (ending at t-1)
     - stress_t = vol_t >= threshold_t
+    - regime is categorical ("calm", "stress") to keep long daily histories compact
     """
-    r = returns.dropna().sort_index().copy()
+    r = returns.dropna().sort_index()
     vol = r.rolling(vol_window_weeks).std()
     thresh = vol.shift(1).rolling(lookback_weeks).quantile(percentile)
     df = pd.DataFrame({"ret": r, "vol": vol, "vol_thresh": thresh})
     df["is_stress"] = (df["vol"] >= df["vol_thresh"]).astype("Int64")
     df = df.dropna()
-    df["regime"] = df["is_stress"].map({0: "calm", 1: "stress"})
+    df["regime"] = pd.Categorical.from_codes(df["is_stress"].to_numpy(dtype="int8"), categories=REGIME_LABELS)
     return df
 
-def regimes_and_summary(
-    returns_path: Path,
-    exposures_path: Path,
-    attribution_path: Path,
-    out_regimes_path: Path,
-    out_summary_path: Path,
+
+def summarize_regimes(
+    returns: pd.DataFrame,
+    exposures: pd.DataFrame,
+    attribution: pd.DataFrame,
     vol_window_weeks: int,
     lookback_weeks: int,
     percentile: float,
     weights: dict[str, float] | None = None,
-) -> tuple[Path, Path]:
-    rets = pd.read_parquet(returns_path)
-    rets.index = pd.to_datetime(rets.index)
-    rets = rets.sort_index()
-
+) -> tuple[pd.DataFrame, dict]:
+    """
+    In-memory core of `regimes_and_summary`: label regimes on the weighted
+    portfolio and summarize exposures/attribution per regime.
+    Inputs must already have sorted DatetimeIndexes.
+    Returns (regimes frame, summary payload).
+    """
+    rets = returns
     # Use explicit weights (config weights if provided, else equal-weight)
     if weights is None:
         w = pd.Series(1.0 / rets.shape[1], index=rets.columns, dtype=float)
@@ -65,36 +74,26 @@ def regimes_and_summary(
         lookback_weeks=lookback_weeks,
         percentile=percentile,
     )
-    out_regimes_path.parent.mkdir(parents=True, exist_ok=True)
-    regimes.to_parquet(out_regimes_path)
-
-    exp = pd.read_parquet(exposures_path)
-    exp.index = pd.to_datetime(exp.index)
-    exp = exp.sort_index()
 
-    attrib = pd.read_parquet(attribution_path)
-    attrib.index = pd.to_datetime(attrib.index)
-    attrib = attrib.sort_index()
-
-    merged_exp = exp.join(regimes[["regime"]], how="inner").dropna()
-    merged_attr = attrib.join(regimes[["regime", "vol"]], how="inner").dropna()
+    merged_exp = exposures.join(regimes[["regime"]], how="inner").dropna()
+    merged_attr = attribution.join(regimes[["regime", "vol"]], how="inner").dropna()
 
     beta_cols = [c for c in merged_exp.columns if c.startswith("beta_")]
-    beta_means = merged_exp.groupby("regime")[beta_cols].mean(numeric_only=True)
+    beta_means = merged_exp.groupby("regime", observed=True)[beta_cols].mean(numeric_only=True)
 
     explained_means = (
-        merged_attr.groupby("regime")[["explained_share", "vol"]]
+        merged_attr.groupby("regime", observed=True)[["explained_share", "vol"]]
         .mean(numeric_only=True)
         .rename(columns={"vol": "mean_vol"})
     )
 
     drawdowns = {}
-    for regime in ["calm", "stress"]:
+    for regime in REGIME_LABELS:
         r = regimes.loc[regimes["regime"] == regime, "ret"]
         drawdowns[regime] = {"max_drawdown": _max_drawdown(r)}
 
     summary = {}
-    for regime in ["calm", "stress"]:
+    for regime in REGIME_LABELS:
         summary[regime] = {}
         if regime in beta_means.index:
             summary[regime].update({f"mean_{k}": float(v) for k, v in beta_means.loc[regime].items()})
@@ -116,6 +115,36 @@ def regimes_and_summary(
         "summary": summary,
     }
 
+    return regimes, payload
+
+
+def regimes_and_summary(
+    returns_path: Path,
+    exposures_path: Path,
+    attribution_path: Path,
+    out_regimes_path: Path,
+    out_summary_path: Path,
+    vol_window_weeks: int,
+    lookback_weeks: int,
+    percentile: float,
+    weights: dict[str, float] | None = None,
+) -> tuple[Path, Path]:
+    rets = read_panel(returns_path, tickers=list(weights) if weights is not None else None)
+    exp = normalize_index(pd.read_parquet(exposures_path))
+    attrib = normalize_index(pd.read_parquet(attribution_path))
+
+    regimes, payload = summarize_regimes(
+        returns=rets,
+        exposures=exp,
+        attribution=attrib,
+        vol_window_weeks=vol_window_weeks,
+        lookback_weeks=lookback_weeks,
+        percentile=percentile,
+        weights=weights,
+    )
+    out_regimes_path.parent.mkdir(parents=True, exist_ok=True)
+    regimes.to_parquet(out_regimes_path)
+
     out_summary_path.parent.mkdir(parents=True, exist_ok=True)
     out_summary_path.write_text(json.dumps(payload, indent=2))
 
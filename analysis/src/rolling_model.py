@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
@@ -26,8 +26,7 @@ def run_rolling_ols(
             f"Rolling window ({window}) must exceed regressors + intercept ({len(x_cols) + 1})."
         )
 
-    df = frame[[y_col] + x_cols].dropna().copy()
-    df = df.sort_index()
+    df = frame[[y_col] + x_cols].dropna().sort_index()
 
     y = df[y_col].values
     X = df[x_cols].values
@@ -70,18 +69,132 @@ def run_rolling_ols(
     return out
 
 
+def window_sums(a: np.ndarray, window: int) -> np.ndarray:
+    """Sums over each trailing `window` rows of `a` (axis 0), for windows ending at rows window-1 .. T-1."""
+    c = np.cumsum(a, axis=0)
+    out = c[window - 1 :].copy()
+    out[1:] -= c[:-window]
+    return out
+
+
+def ols_from_moments(xx: np.ndarray, xy: np.ndarray, yy: np.ndarray, ys: np.ndarray, nobs: int, inv: np.ndarray | None = None, rank: np.ndarray | None = None) -> dict:
+    """
+    OLS fits from windowed moments: X'X (M, p, p), X'y (M, p, N), y'y and
+    sum(y) (M, N) over `nobs` rows, X including the intercept column first.
+    Coefficients use the pseudo-inverse of X'X and residual dof its rank, as
+    statsmodels does; `inv` / `rank` may be passed in when already known.
+    Returns coef and stderr (M, p, N) and r2 (M, N).
+    """
+    if inv is None:
+        inv = np.linalg.pinv(xx, hermitian=True)
+    if rank is None:
+        rank = np.linalg.matrix_rank(xx, hermitian=True)
+    coef = inv @ xy
+    sse = np.clip(yy - np.einsum("mpn,mpn->mn", coef, xy), 0.0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = 1.0 - sse / (yy - ys * ys / nobs)
+    s2 = sse / (nobs - rank)[:, None]
+    stderr = np.sqrt(s2[:, None, :] * np.diagonal(inv, axis1=1, axis2=2)[:, :, None])
+    return {"coef": coef, "stderr": stderr, "r2": r2}
+
+
+def rolling_ols_batch(y: np.ndarray, X: np.ndarray, window: int) -> dict:
+    """
+    Rolling OLS of every column of `y` (T x N) on the same regressors `X`
+    (T x k) plus an intercept, for all full windows in one pass.
+
+    The windowed cross-products X'X (shared by all columns) and X'y come from
+    prefix sums, so the cost is O(T * k * N) regardless of `window`.
+    Returns arrays with one leading entry per window end (rows window-1 ..
+    T-1): coef (M, k+1, N; intercept first), stderr (same shape), r2 (M, N).
+    """
+    T, p = X.shape[0], X.shape[1] + 1
+    if T < window:
+        return {"coef": np.empty((0, p, y.shape[1])), "stderr": np.empty((0, p, y.shape[1])), "r2": np.empty((0, y.shape[1]))}
+    Xc = np.column_stack([np.ones(T), X])
+    return ols_from_moments(
+        xx=window_sums(Xc[:, :, None] * Xc[:, None, :], window),
+        xy=window_sums(Xc[:, :, None] * y[:, None, :], window),
+        yy=window_sums(y * y, window),
+        ys=window_sums(y, window),
+        nobs=window,
+    )
+
+
+def run_rolling_ols_batched(
+    frame: pd.DataFrame,
+    y_col: str,
+    x_cols: List[str],
+    window: int,
+    min_nobs: int,
+) -> pd.DataFrame:
+    """
+    `run_rolling_ols` computed with `rolling_ols_batch`: same rows, columns
+    and values (within floating-point tolerance; see the parity harness),
+    without a statsmodels fit per window.
+    """
+    if window <= len(x_cols) + 1:
+        raise ValueError(
+            f"Rolling window ({window}) must exceed regressors + intercept ({len(x_cols) + 1})."
+        )
+    df = frame[[y_col] + x_cols].dropna().sort_index()
+    dates = df.index[window - 1 :] if window >= min_nobs else df.index[:0]
+    fit = rolling_ols_batch(df[[y_col]].to_numpy(dtype=float), df[x_cols].to_numpy(dtype=float), window)
+    if not len(dates):
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+    coef, stderr = fit["coef"][:, :, 0], fit["stderr"][:, :, 0]
+    out = {"alpha": coef[:, 0], "r2": fit["r2"][:, 0], "nobs": np.full(len(dates), window), "stderr_alpha": stderr[:, 0]}
+    for j, c in enumerate(x_cols, start=1):
+        out[f"beta_{c}"] = coef[:, j]
+        out[f"stderr_beta_{c}"] = stderr[:, j]
+    return pd.DataFrame(out, index=pd.DatetimeIndex(dates, name="date"))
+
+
+def extend_rolling_ols(
+    frame: pd.DataFrame,
+    previous: pd.DataFrame,
+    y_col: str,
+    x_cols: List[str],
+    window: int,
+    min_nobs: int,
+) -> pd.DataFrame:
+    """
+    Exposures for `frame`, reusing the `previous` windows and fitting only the
+    windows that end after previous.index.max().
+
+    Only valid when the rows of `frame` up to that date are the ones `previous`
+    was fitted on (new bars appended, nothing restated); callers check that.
+    """
+    if previous.empty:
+        return run_rolling_ols(frame, y_col=y_col, x_cols=x_cols, window=window, min_nobs=min_nobs)
+
+    last = previous.index.max()
+    df = frame[[y_col] + x_cols].dropna().sort_index()
+    n_old = int((df.index <= last).sum())
+    # The first new window starts window-1 rows before the first new bar.
+    tail = df.iloc[max(0, n_old - window + 1) :]
+    new = run_rolling_ols(tail, y_col=y_col, x_cols=x_cols, window=window, min_nobs=min_nobs)
+    return pd.concat([previous, new.loc[new.index > last]])
+
+
 def run_rolling_from_parquet(
     frame_path: Path,
     out_path: Path,
     window: int,
     min_nobs: int,
     y_col: str = "Y",
+    x_cols: Optional[List[str]] = None,
 ) -> Path:
+    """
+    Run rolling OLS on a frame parquet. `x_cols` defaults to every non-y column
+    (macro frames); equity frames pass the configured factor_set columns.
+    """
     frame = pd.read_parquet(frame_path)
     frame.index = pd.to_datetime(frame.index)
     frame = frame.sort_index()
 
-    x_cols = [c for c in frame.columns if c != y_col]
+    if x_cols is None:
+        x_cols = [c for c in frame.columns if c != y_col]
     exposures = run_rolling_ols(frame, y_col=y_col, x_cols=x_cols, window=window, min_nobs=min_nobs)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -60,8 +60,35 @@ class ManifestModel(BaseModel):
     git_commit: Optional[str]
     config: Dict[str, Any]
     regime_rule: Dict[str, Any]
+    export_layout: Optional[str] = None
+    files: Optional[Dict[str, Dict[str, Any]]] = None
+    binary: Optional[Dict[str, Any]] = None
+    shards: Optional[Dict[str, str]] = None
+    aligned: Optional[Dict[str, Dict[str, Any]]] = None
     units: Dict[str, str]
     disclaimers: List[str]
+    profile: Optional[List[Dict[str, Any]]] = None
+    validation: Optional[Dict[str, Any]] = None
+
+
+class TickerQualityModel(BaseModel):
+    missing_pct: float
+    gap_rows: int
+    longest_gap: int
+    stale_rows: int
+    longest_stale_run: int
+    outliers: int
+    splits: int
+    reversals: int
+    jumps: int
+    unaligned_rows: int
+
+
+class QualityIssueModel(BaseModel):
+    ticker: str
+    date: str
+    kind: Literal["gap", "stale", "outlier", "split", "reversal", "jump"]
+    value: float
 
 
 class QualityReportModel(BaseModel):
@@ -69,3 +96,21 @@ class QualityReportModel(BaseModel):
     coverage: Dict[str, Dict[str, Any]]
     aligned_sample_sizes: Dict[str, int]
     notes: Dict[str, str]
+    # data-quality scan (analysis.src.data_quality.scan_returns)
+    checks: Optional[Dict[str, Any]] = None
+    summary: Optional[Dict[str, int]] = None
+    ticker_checks: Optional[Dict[str, TickerQualityModel]] = None
+    calendar: Optional[Dict[str, Any]] = None
+    issues: Optional[List[QualityIssueModel]] = None
+    issues_truncated: Optional[bool] = None
+
+
+class ComovementModel(BaseModel):
+    tickers: List[str]
+    window: int
+    min_periods: int
+    layout: str
+    date: Optional[str]
+    latest: Dict[str, List[Optional[float]]]
+    regimes: Dict[str, Dict[str, Any]]
+    betas: Dict[str, Any]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, List
+
+import pandas as pd
+
+
+def parse_shard_by(value: str | int | None) -> str | int | None:
+    """None (no shards), "year", or a positive row count (an int or its string form)."""
+    if value is None or value == "year":
+        return value
+    try:
+        rows = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"shard_by must be 'year' or a row count, got {value!r}") from None
+    if rows < 1:
+        raise ValueError(f"shard_by row count must be positive, got {rows}")
+    return rows
+
+
+def split_shards(df: pd.DataFrame, shard_by: str | int) -> List[tuple[str, pd.DataFrame, bool]]:
+    """
+    (key, rows, closed) per shard in date order. Year shards are closed
+    once a later year has data; row shards are fixed blocks counted from
+    the first date and closed once full, so appending new bars never moves
+    a boundary.
+    """
+    if df.empty:
+        return []
+    if shard_by == "year":
+        years = df.index.year
+        last = int(years[-1])
+        return [(str(y), part, int(y) < last) for y, part in df.groupby(years, sort=True)]
+    n = int(shard_by)
+    starts = range(0, len(df), n)
+    return [(f"{k // n:05d}", df.iloc[k : k + n], len(df) - k >= n) for k in starts]
+
+
+def write_shards(
+    out_dir: Path,
+    dataset: str,
+    df: pd.DataFrame,
+    shard_by: str | int,
+    encode: Callable[[pd.DataFrame], bytes],
+) -> dict:
+    """
+    Write `df` as shards under `out_dir` plus `out_dir/index.json`, listing
+    the shards most recent first with their date range, row count and sha256.
+
+    Closed shards are content-addressed (`<key>-<sha8>.json`) and never
+    rewritten: an unchanged closed shard is left alone, a restated one gets
+    a new file. Only the open (latest) shard, `<key>.json`, is rewritten when
+    its content changes. Shard files no longer referenced by the index are
+    removed. Returns the index.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries, written = [], []
+    for key, part, closed in split_shards(df, shard_by):
+        body = encode(part)
+        digest = hashlib.sha256(body).hexdigest()
+        path = out_dir / (f"{key}-{digest[:8]}.json" if closed else f"{key}.json")
+        if closed:
+            fresh = not path.exists()
+        else:
+            fresh = not path.exists() or hashlib.sha256(path.read_bytes()).hexdigest() != digest
+        if fresh:
+            tmp = path.with_suffix(".json.tmp")
+            tmp.write_bytes(body)
+            tmp.replace(path)
+            written.append(path.name)
+        entries.append(
+            {
+                "file": path.name,
+                "start": str(part.index[0].date()),
+                "end": str(part.index[-1].date()),
+                "rows": int(len(part)),
+                "sha256": digest,
+                "closed": closed,
+            }
+        )
+
+    index = {
+        "dataset": dataset,
+        "shard_by": shard_by,
+        "rows": int(len(df)),
+        "start": entries[0]["start"] if entries else None,
+        "end": entries[-1]["end"] if entries else None,
+        "shards": entries[::-1],
+    }
+    keep = {e["file"] for e in entries} | {"index.json"}
+    for stale in out_dir.glob("*.json"):
+        if stale.name not in keep:
+            stale.unlink()
+    index_path = out_dir / "index.json"
+    text = json.dumps(index, indent=2)
+    if not index_path.exists() or index_path.read_text() != text:
+        tmp = index_path.with_suffix(".json.tmp")
+        tmp.write_text(text)
+        tmp.replace(index_path)
+        written.append(index_path.name)
+    index["written"] = written
+    return index
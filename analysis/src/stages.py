@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from analysis.src.config import Config, Sleeve
+from analysis.src.dag import Stage
+
+# Stage functions take (cfg, inputs, **params) and return {artifact name: value}.
+# They live at module level so they can be pickled to worker processes, and
+# import their implementation modules on call: yfinance, statsmodels, pyarrow
+# and pydantic are only loaded when a stage that needs them actually runs.
+
+
+def load_returns(cfg: Config, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    from analysis.src.data_prices import fetch_prices
+    from analysis.src.store import read_panel
+
+    price_out = fetch_prices(
+        tickers=cfg.tickers,
+        start=cfg.start,
+        end=cfg.end,
+        freq=cfg.freq,
+        cache_dir=cfg.out_data,
+        force=False,
+        dtype=cfg.dtype,
+    )
+    return {"returns": read_panel(price_out["returns_store"], tickers=cfg.tickers)}
+
+
+def load_factors(cfg: Config, inputs: Dict[str, Any], regions: Sequence[str]) -> Dict[str, Any]:
+    from analysis.src.data_factors import fetch_all_factors
+    from analysis.src.store import read_panel
+
+    factors = fetch_all_factors(
+        start=cfg.start,
+        end=cfg.end,
+        cache_dir=cfg.out_data / "factors",
+        force=False,
+        freq=cfg.freq,
+        factor_set=cfg.factor_set,
+        regions=regions,
+    )
+    return {key: read_panel(path) for key, path in factors.items()}
+
+
+def build_sleeve_frames(cfg: Config, inputs: Dict[str, Any], sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    from analysis.src.build_frames import FrameBuilder, quality_report
+
+    builder = FrameBuilder(
+        returns=inputs["returns"],
+        factors={k.removeprefix("factors_"): v for k, v in inputs.items() if k.startswith("factors_")},
+        weights=cfg.weights,
+        sleeves=sleeves,
+        dtype=cfg.dtype,
+        factor_set=cfg.factor_set,
+    )
+    out: Dict[str, Any] = {f"frame_{s.name}": builder.frame(s.name) for s in sleeves}
+    sizes = {s.name: int(out[f"frame_{s.name}"].shape[0]) for s in sleeves}
+    out["quality_report"] = quality_report(builder.returns(), sizes)
+    return out
+
+
+def portfolio_summary(cfg: Config, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    from analysis.src.portfolio import summarize_portfolio
+    from analysis.src.store import read_panel
+
+    summary = summarize_portfolio(
+        returns=read_panel(inputs["returns"], tickers=list(cfg.weights)),
+        weights=cfg.weights,
+        freq=cfg.freq,
+        missing_price_policy="drop_any",
+        compounding="geometric",
+    )
+    return {"portfolio_summary": asdict(summary)}
+
+
+def data_quality(cfg: Config, inputs: Dict[str, Any], sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    from analysis.src.asset_exposures import asset_factor_sources
+    from analysis.src.data_quality import scan_returns
+    from analysis.src.store import read_panel
+
+    factors = {k.removeprefix("factors_"): v for k, v in inputs.items() if k.startswith("factors_")}
+    report = scan_returns(
+        read_panel(inputs["returns"], tickers=cfg.tickers),
+        factors=factors,
+        sources=asset_factor_sources(cfg.tickers, sleeves) if factors else None,
+        freq=cfg.freq,
+        mad_window=cfg.quality_mad_window,
+        mad_threshold=cfg.quality_mad_threshold,
+        stale_run=cfg.quality_stale_run,
+        jump_ratio=cfg.quality_jump_ratio,
+    )
+    return {"data_quality": report}
+
+
+def rolling_exposures(cfg: Config, inputs: Dict[str, Any], sleeve: Sleeve) -> Dict[str, Any]:
+    from analysis.src.rolling_model import run_rolling_ols
+
+    exposures = run_rolling_ols(
+        inputs[f"frame_{sleeve.name}"],
+        y_col="Y",
+        x_cols=sleeve.x_cols(cfg.factor_set),
+        window=cfg.rolling_window_weeks,
+        min_nobs=cfg.min_nobs,
+    )
+    return {f"exposures_{sleeve.name}": exposures}
+
+
+def asset_exposures(cfg: Config, inputs: Dict[str, Any], sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    from analysis.src.asset_exposures import asset_factor_sources, run_asset_rolling_ols
+    from analysis.src.config import factor_columns
+    from analysis.src.store import read_panel
+
+    panel = run_asset_rolling_ols(
+        read_panel(inputs["returns"], tickers=cfg.tickers),
+        factors={k.removeprefix("factors_"): v for k, v in inputs.items() if k.startswith("factors_")},
+        sources=asset_factor_sources(cfg.tickers, sleeves),
+        x_cols=factor_columns(cfg.factor_set),
+        window=cfg.rolling_window_weeks,
+        min_nobs=cfg.min_nobs,
+    )
+    return {"asset_exposures": panel}
+
+
+def sleeve_attribution(cfg: Config, inputs: Dict[str, Any], sleeve: Sleeve) -> Dict[str, Any]:
+    from analysis.src.attribution import compute_attribution
+
+    attrib = compute_attribution(
+        frame=inputs[f"frame_{sleeve.name}"],
+        exposures=inputs[f"exposures_{sleeve.name}"],
+        y_col="Y",
+    )
+    return {f"attrib_{sleeve.name}": attrib}
+
+
+def exposures_cube(cfg: Config, inputs: Dict[str, Any], sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    from analysis.src.cube import sync_cube
+    from analysis.src.rolling_model import run_rolling_ols_batched
+
+    # The configured window reuses the sleeve stage's exposures; the other
+    # windows use the batched kernel (parity-checked against run_rolling_ols).
+    # Every window keeps the min_nobs floor, so one shorter than it stays NaN.
+    windows = sorted({cfg.rolling_window_weeks, *cfg.rolling_windows_weeks})
+    tables = {}
+    for s in sleeves:
+        for window in windows:
+            if window == cfg.rolling_window_weeks:
+                tables[(s.name, window)] = inputs[f"exposures_{s.name}"]
+            else:
+                tables[(s.name, window)] = run_rolling_ols_batched(
+                    inputs[f"frame_{s.name}"],
+                    y_col="Y",
+                    x_cols=s.x_cols(cfg.factor_set),
+                    window=window,
+                    min_nobs=cfg.min_nobs,
+                )
+    path = cfg.out_data / "cube" / "exposures.cube"  # as in cube_files
+    result = sync_cube(path, tables)
+    return {"exposures_cube": {"path": str(path), "sleeves": [s.name for s in sleeves], "windows": windows, **result}}
+
+
+def comovement(cfg: Config, inputs: Dict[str, Any], sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    import pandas as pd
+
+    from analysis.src.asset_exposures import asset_factor_sources
+    from analysis.src.comovement import PairwiseStore, comovement_payload, rolling_betas, write_pairwise_store
+    from analysis.src.config import factor_columns
+    from analysis.src.store import read_panel
+
+    returns = read_panel(inputs["returns"], tickers=cfg.tickers)
+    window, min_periods, block = cfg.rolling_window_weeks, cfg.min_nobs, cfg.comovement_block
+    out_dir = cfg.out_data / "comovement"  # as in comovement_files
+    regimes = inputs["regimes"]["regime"] if "regimes" in inputs else None
+    header = write_pairwise_store(out_dir, returns, window, min_periods, block=block, regimes=regimes)
+
+    # betas to the benchmark and to the factors of each ticker's sleeve (as in asset_exposures)
+    factors = {k.removeprefix("factors_"): v for k, v in inputs.items() if k.startswith("factors_")}
+    sources = asset_factor_sources(cfg.tickers, sleeves) if factors else dict.fromkeys(cfg.tickers)
+    bench = returns[[cfg.comovement_benchmark]] if cfg.comovement_benchmark in returns.columns else returns.iloc[:, :0]
+    parts = []
+    for source in dict.fromkeys(sources.values()):
+        tickers = [t for t, s in sources.items() if s == source]
+        against = bench if source is None else bench.join(factors[source][factor_columns(cfg.factor_set)])
+        parts.append(rolling_betas(returns[tickers], against, window, min_periods, block=block))
+    betas = pd.concat(parts, axis=1) if len(parts) > 1 else parts[0]
+    fields = list(dict.fromkeys(betas.columns.get_level_values("field")))
+    betas = betas.reindex(columns=pd.MultiIndex.from_product([list(cfg.tickers), fields], names=["ticker", "field"]))
+
+    payload = comovement_payload(PairwiseStore.open(out_dir), betas, header.get("regime_corr"))
+    return {"asset_betas": betas, "comovement": payload}
+
+
+def label_regimes(cfg: Config, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    from analysis.src.regimes import summarize_regimes
+
+    regimes, summary = summarize_regimes(
+        returns=inputs["returns"],
+        exposures=inputs["exposures_equity_us"],
+        attribution=inputs["attrib_equity_us"],
+        vol_window_weeks=cfg.vol_window_weeks,
+        lookback_weeks=cfg.vol_lookback_weeks,
+        percentile=cfg.vol_percentile,
+        weights=cfg.weights,
+    )
+    return {"regimes": regimes, "regime_summary": summary}
+
+
+def site_meta(cfg: Config) -> dict:
+    return {
+        "tickers": list(cfg.tickers),
+        "weights": dict(cfg.weights),
+        "frequency": cfg.freq,
+        "rolling_window_weeks": cfg.rolling_window_weeks,
+        "min_nobs": cfg.min_nobs,
+        "factor_set": cfg.factor_set,
+        "regime": {
+            "vol_window_weeks": cfg.vol_window_weeks,
+            "percentile": cfg.vol_percentile,
+            "lookback_weeks": cfg.vol_lookback_weeks,
+        },
+    }
+
+
+def export_site(cfg: Config, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    from analysis.src.export_json import export_json_bundle
+
+    paths = export_json_bundle(
+        out_json_dir=cfg.site_public_data,
+        meta=site_meta(cfg),
+        exposures_us_path=inputs["exposures_equity_us"],
+        exposures_intl_path=inputs["exposures_equity_intl"],
+        attrib_us_path=inputs["attrib_equity_us"],
+        attrib_intl_path=inputs["attrib_equity_intl"],
+        regimes_path=inputs["regimes"],
+        regime_summary_path=inputs["regime_summary"],
+        quality_report_path=inputs["quality_report"],
+        layout=cfg.export_layout,
+        decimals=cfg.export_decimals,
+        arrow=cfg.export_arrow,
+        shard_by=cfg.export_shard_by,
+        hashed_names=cfg.export_hashed_names,
+        comovement=inputs.get("comovement"),
+        data_quality=inputs.get("data_quality"),
+    )
+    return {"site_bundle": {k: str(p) if p is not None else None for k, p in paths.items()}}
+
+
+def cube_files(cfg: Config) -> List[Path]:
+    from analysis.src.cube import cube_files
+
+    return cube_files(cfg.out_data / "cube" / "exposures.cube")
+
+
+def comovement_files(cfg: Config) -> List[Path]:
+    from analysis.src.comovement import store_files
+
+    return store_files(cfg.out_data / "comovement")
+
+
+def site_files(cfg: Config) -> List[Path]:
+    from analysis.src.export_json import bundle_files
+
+    return bundle_files(cfg.site_public_data)
+
+
+_SITE_FIELDS = (
+    "tickers",
+    "weights",
+    "freq",
+    "rolling_window_weeks",
+    "min_nobs",
+    "factor_set",
+    "vol_window_weeks",
+    "vol_percentile",
+    "vol_lookback_weeks",
+    "site_public_data",
+    "export_layout",
+    "export_decimals",
+    "export_arrow",
+    "export_shard_by",
+    "export_hashed_names",
+)
+
+
+def source_artifacts(sleeves: Sequence[Sleeve]) -> List[str]:
+    """Artifacts produced by the source stages (returns + one factor table per region)."""
+    return ["returns", *(f"factors_{r}" for r in factor_regions(sleeves))]
+
+
+def factor_regions(sleeves: Sequence[Sleeve]) -> List[str]:
+    return sorted({s.factors for s in sleeves if s.factors != "proxies"})
+
+
+def build_stages(cfg: Config, sleeves: Sequence[Sleeve], include_sources: bool = True) -> List[Stage]:
+    """
+    The pipeline graph for `sleeves`; regimes + export need equity_us and equity_intl.
+
+    With `include_sources=False` the price/factor loaders are left out and
+    their artifacts (`source_artifacts`) must be supplied to the Pipeline as
+    external inputs.
+    """
+    data, reports = cfg.out_data, cfg.out_reports
+    regions = factor_regions(sleeves)
+    factor_keys = tuple(f"factors_{r}" for r in regions)
+
+    sources = [
+        Stage(
+            "prices",
+            load_returns,
+            outputs={"returns": None},
+            config_fields=("tickers", "start", "end", "freq", "dtype", "out_data"),
+            code=("analysis.src.data_prices", "analysis.src.store"),
+            always_run=True,
+        ),
+        Stage(
+            "factors",
+            load_factors,
+            outputs={k: None for k in factor_keys},
+            config_fields=("start", "end", "freq", "factor_set", "out_data"),
+            params={"regions": regions},
+            code=("analysis.src.data_factors", "analysis.src.ken_french"),
+            always_run=True,
+        ),
+    ]
+    stages = sources if include_sources else []
+    stages += [
+        Stage(
+            "frames",
+            build_sleeve_frames,
+            inputs=("returns", *factor_keys),
+            outputs={
+                **{f"frame_{s.name}": data / "frames" / f"frame_{s.name}.parquet" for s in sleeves},
+                "quality_report": reports / "quality_report.json",
+            },
+            config_fields=("weights", "dtype", "factor_set"),
+            params={"sleeves": list(sleeves)},
+            code=("analysis.src.build_frames", "analysis.src.portfolio"),
+        ),
+        Stage(
+            "portfolio_summary",
+            portfolio_summary,
+            inputs=("returns",),
+            outputs={"portfolio_summary": reports / "portfolio_summary.json"},
+            config_fields=("weights", "freq"),
+            code=("analysis.src.portfolio",),
+        ),
+    ]
+    stages.append(
+        Stage(
+            "data_quality",
+            data_quality,
+            inputs=("returns", *factor_keys),
+            outputs={"data_quality": reports / "data_quality.json"},
+            config_fields=(
+                "tickers",
+                "freq",
+                "quality_mad_window",
+                "quality_mad_threshold",
+                "quality_stale_run",
+                "quality_jump_ratio",
+            ),
+            params={"sleeves": list(sleeves)},
+            code=("analysis.src.data_quality", "analysis.src.asset_exposures"),
+        )
+    )
+    for s in sleeves:
+        stages.append(
+            Stage(
+                f"exposures:{s.name}",
+                rolling_exposures,
+                inputs=(f"frame_{s.name}",),
+                outputs={f"exposures_{s.name}": data / "exposures" / f"exposures_{s.name}.parquet"},
+                config_fields=("rolling_window_weeks", "min_nobs", "factor_set"),
+                params={"sleeve": s},
+                code=("analysis.src.rolling_model",),
+            )
+        )
+        stages.append(
+            Stage(
+                f"attribution:{s.name}",
+                sleeve_attribution,
+                inputs=(f"frame_{s.name}", f"exposures_{s.name}"),
+                outputs={f"attrib_{s.name}": data / "attribution" / f"attrib_{s.name}.parquet"},
+                params={"sleeve": s},
+                code=("analysis.src.attribution",),
+            )
+        )
+
+    if cfg.exposures_cube:
+        stages.append(
+            Stage(
+                "exposures_cube",
+                exposures_cube,
+                inputs=(*(f"frame_{s.name}" for s in sleeves), *(f"exposures_{s.name}" for s in sleeves)),
+                outputs={"exposures_cube": reports / "exposures_cube.json"},
+                config_fields=("rolling_window_weeks", "rolling_windows_weeks", "min_nobs", "factor_set", "out_data"),
+                params={"sleeves": list(sleeves)},
+                code=("analysis.src.cube", "analysis.src.rolling_model"),
+                files=cube_files,
+            )
+        )
+
+    if regions:
+        stages.append(
+            Stage(
+                "asset_exposures",
+                asset_exposures,
+                inputs=("returns", *factor_keys),
+                outputs={"asset_exposures": data / "assets" / "asset_exposures.parquet"},
+                config_fields=("tickers", "rolling_window_weeks", "min_nobs", "factor_set"),
+                params={"sleeves": list(sleeves)},
+                code=("analysis.src.asset_exposures", "analysis.src.rolling_model"),
+            )
+        )
+
+    with_regimes = {"equity_us", "equity_intl"} <= {s.name for s in sleeves}
+    if cfg.comovement:
+        stages.append(
+            Stage(
+                "comovement",
+                comovement,
+                inputs=("returns", *factor_keys, *(("regimes",) if with_regimes else ())),
+                outputs={
+                    "asset_betas": data / "comovement" / "betas.parquet",
+                    "comovement": reports / "comovement.json",
+                },
+                config_fields=(
+                    "tickers",
+                    "rolling_window_weeks",
+                    "min_nobs",
+                    "factor_set",
+                    "comovement_benchmark",
+                    "comovement_block",
+                    "out_data",
+                ),
+                params={"sleeves": list(sleeves)},
+                code=("analysis.src.comovement", "analysis.src.rolling_model", "analysis.src.asset_exposures"),
+                files=comovement_files,
+            )
+        )
+
+    if with_regimes:
+        stages.append(
+            Stage(
+                "regimes",
+                label_regimes,
+                inputs=("returns", "exposures_equity_us", "attrib_equity_us"),
+                outputs={
+                    "regimes": data / "regimes" / "regimes.parquet",
+                    "regime_summary": reports / "regime_summary.json",
+                },
+                config_fields=("weights", "vol_window_weeks", "vol_lookback_weeks", "vol_percentile"),
+                code=("analysis.src.regimes",),
+            )
+        )
+        stages.append(
+            Stage(
+                "export",
+                export_site,
+                inputs=(
+                    "exposures_equity_us",
+                    "exposures_equity_intl",
+                    "attrib_equity_us",
+                    "attrib_equity_intl",
+                    "regimes",
+                    "regime_summary",
+                    "quality_report",
+                    "data_quality",
+                    *(("comovement",) if cfg.comovement else ()),
+                ),
+                outputs={"site_bundle": reports / "site_bundle.json"},
+                config_fields=_SITE_FIELDS,
+                code=(
+                    "analysis.src.align",
+                    "analysis.src.export_json",
+                    "analysis.src.schemas",
+                    "analysis.src.shards",
+                    "analysis.src.validation",
+                ),
+                files=site_files,
+            )
+        )
+    return stages
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import zlib
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from analysis.src.profiling import span
+
+# Tickers are spread over a fixed number of hash buckets so that a ticker filter
+# only touches the partitions that can contain it.
+N_GROUPS = 16
+_META_FILE = "_store.json"
+_PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("group", pa.int16())]),
+    flavor="hive",
+)
+
+
+def ticker_group(ticker: str, n_groups: int = N_GROUPS) -> int:
+    return zlib.crc32(ticker.encode("utf-8")) % n_groups
+
+
+def _read_meta(root: Path) -> dict:
+    p = root / _META_FILE
+    if not p.exists():
+        return {"n_groups": N_GROUPS, "tickers": None, "index_name": None}
+    return json.loads(p.read_text())
+
+
+def write_panel(panel: pd.DataFrame, root: Path, n_groups: int = N_GROUPS) -> Path:
+    """
+    Write a wide (date x ticker) panel as a hive-partitioned parquet dataset:
+
+      <root>/year=YYYY/group=NN/part-0.parquet   rows: (date, ticker, value)
+
+    Rows with missing values are not stored (the date axis is kept in the
+    store's meta, so all-NaN dates survive a round trip) and float32 panels
+    stay float32. Partitions present in `panel` are replaced; partitions
+    outside it are left untouched. The meta's ticker list is the panel's.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+
+    dates = pd.DatetimeIndex(pd.to_datetime(panel.index))
+    tickers = [str(c) for c in panel.columns]
+    values = panel.to_numpy()
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(float)
+
+    n_dates, n_tickers = values.shape
+    date_col = np.repeat(dates.values, n_tickers)
+    ticker_idx = np.tile(np.arange(n_tickers), n_dates)
+    flat = values.ravel()
+    keep = ~np.isnan(flat)
+
+    groups = np.array([ticker_group(t, n_groups) for t in tickers], dtype=np.int16)
+    ticker_arr = pa.DictionaryArray.from_arrays(
+        pa.array(ticker_idx[keep], type=pa.int32()), pa.array(tickers, type=pa.string())
+    )
+    table = pa.table(
+        {
+            "date": pa.array(date_col[keep], type=pa.timestamp("ns")),
+            "ticker": ticker_arr,
+            "value": pa.array(flat[keep]),
+            "year": pa.array(dates.year.values.repeat(n_tickers)[keep].astype(np.int16)),
+            "group": pa.array(np.tile(groups, n_dates)[keep]),
+        }
+    )
+
+    with span("write_panel", store=root.name, rows_out=table.num_rows):
+        ds.write_dataset(
+            table,
+            root,
+            format="parquet",
+            partitioning=_PARTITIONING,
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="delete_matching",
+        )
+
+    meta = _read_meta(root)
+    # dates in years this write didn't touch are still in their partitions
+    years = set(dates.year)
+    kept = [d for d in meta.get("dates") or [] if pd.Timestamp(d).year not in years]
+    axis = sorted(set(kept) | {d.isoformat() for d in dates})
+    meta.update({"n_groups": n_groups, "tickers": tickers, "index_name": panel.index.name, "dates": axis})
+    (root / _META_FILE).write_text(json.dumps(meta, indent=2))
+    return root
+
+
+def _ts_scalar(ts: pd.Timestamp) -> pa.Scalar:
+    return pa.scalar(ts.to_pydatetime(), type=pa.timestamp("ns"))
+
+
+def _date_filter(expr, start: pd.Timestamp | None, end: pd.Timestamp | None):
+    # The year predicate prunes whole partitions; the date predicate trims rows.
+    if start is not None:
+        expr = expr & (ds.field("year") >= start.year) & (ds.field("date") >= _ts_scalar(start))
+    if end is not None:
+        expr = expr & (ds.field("year") <= end.year) & (ds.field("date") <= _ts_scalar(end))
+    return expr
+
+
+def read_store(
+    root: Path,
+    tickers: Sequence[str] | None = None,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    Read a wide panel back from a store written by `write_panel`.
+
+    Requested tickers that the store doesn't hold are omitted from the result.
+    Ticker and date filters are pushed down to partition pruning (year, group)
+    and parquet row-group statistics, so only the matching files are opened.
+    """
+    meta = _read_meta(root)
+    start_ts = pd.Timestamp(start) if start is not None else None
+    end_ts = pd.Timestamp(end) if end is not None else None
+
+    expr = ds.scalar(True)
+    if tickers is not None:
+        tickers = [str(t) for t in tickers]
+        groups = sorted({ticker_group(t, meta["n_groups"]) for t in tickers})
+        expr = expr & ds.field("group").isin(groups) & ds.field("ticker").isin(tickers)
+    expr = _date_filter(expr, start_ts, end_ts)
+
+    with span("read_store", store=root.name) as sp:
+        dataset = ds.dataset(root, format="parquet", partitioning=_PARTITIONING)
+        table = dataset.to_table(columns=["date", "ticker", "value"], filter=expr)
+        sp.set(rows_out=table.num_rows)
+    long = table.to_pandas()
+
+    columns = list(tickers) if tickers is not None else list(meta.get("tickers") or [])
+    if long.empty:
+        out = pd.DataFrame(dtype=float, index=pd.DatetimeIndex([]))
+    else:
+        long["ticker"] = long["ticker"].astype(str)
+        out = long.pivot(index="date", columns="ticker", values="value").sort_index()
+        if not columns:
+            columns = sorted(out.columns)
+        out = out[[c for c in columns if c in out.columns]]
+    if meta.get("dates") is not None:
+        # dates whose values are all missing have no rows; the meta's axis restores them
+        axis = pd.DatetimeIndex(meta["dates"])
+        if start_ts is not None:
+            axis = axis[axis >= start_ts]
+        if end_ts is not None:
+            axis = axis[axis <= end_ts]
+        out = out.reindex(axis)
+    out.index = pd.DatetimeIndex(out.index, name=meta.get("index_name"))
+    out.columns.name = None
+    return out
+
+
+def read_panel(
+    path: Path | pd.DataFrame,
+    tickers: Iterable[str] | None = None,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    Load a date-indexed panel restricted to `tickers` and [start, end].
+
+    `path` may be a partitioned store directory, a single parquet file, or a
+    panel already in memory (sliced, not re-read). The result always has a
+    sorted DatetimeIndex, so callers don't re-normalize it.
+    """
+    tickers = list(tickers) if tickers is not None else None
+    if isinstance(path, pd.DataFrame):
+        df = path
+        if tickers is not None:
+            df = df[[t for t in tickers if t in df.columns]]
+        if start is not None or end is not None:
+            df = df.loc[start:end]
+        return df
+
+    path = Path(path)
+    if path.is_dir():
+        return read_store(path, tickers=tickers, start=start, end=end)
+
+    if tickers is not None:
+        available = set(pq.read_schema(path).names)
+        tickers = [t for t in tickers if t in available]
+    df = pd.read_parquet(path, columns=tickers)
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    return df
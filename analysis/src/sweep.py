@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import io
+import itertools
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from analysis.src.artifacts import ArtifactStore
+from analysis.src.config import Config, Sleeve
+from analysis.src.dag import Pipeline
+from analysis.src.stages import build_stages, factor_regions, load_factors, load_returns
+
+# Fields that decide what data is loaded. A sweep loads data once, so these
+# are fixed for the whole sweep (run one sweep per frequency / factor set).
+DATA_FIELDS = ("tickers", "start", "end", "freq", "dtype", "factor_set")
+PATH_FIELDS = ("root", "out_data", "out_json", "out_reports", "site_public_data")
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of `grid` as a list of override dicts (keys in grid order)."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def variant_name(overrides: Dict[str, Any]) -> str:
+    """Readable, filesystem-safe directory name for a set of overrides."""
+    if not overrides:
+        return "base"
+    parts = []
+    for key, value in overrides.items():
+        text = json.dumps(value, sort_keys=True, separators=(",", ":")) if isinstance(value, (dict, list)) else str(value)
+        parts.append(f"{key}-{text}")
+    return re.sub(r"[^A-Za-z0-9._=-]+", "_", "__".join(parts)).strip("_")
+
+
+def validate_overrides(overrides: Dict[str, Any]) -> None:
+    known = {f.name for f in dataclasses.fields(Config)}
+    unknown = sorted(set(overrides) - known)
+    if unknown:
+        raise ValueError(f"Unknown Config fields {unknown}")
+    fixed = sorted(set(overrides) & set(DATA_FIELDS + PATH_FIELDS + ("sleeves",)))
+    if fixed:
+        raise ValueError(f"Sweeps share one data load; {fixed} can't vary within a sweep")
+
+
+def variant_config(base: Config, overrides: Dict[str, Any], out_dir: Path) -> Config:
+    """`base` with `overrides` applied and every output path moved under `out_dir`."""
+    validate_overrides(overrides)
+    return dataclasses.replace(
+        base,
+        **overrides,
+        out_data=out_dir / "data",
+        out_json=out_dir / "json",
+        out_reports=out_dir / "reports",
+        site_public_data=out_dir / "json",
+    )
+
+
+def variant_metrics(store: ArtifactStore, sleeves: Sequence[Sleeve]) -> Dict[str, Any]:
+    """Headline numbers per variant for the comparison index."""
+    metrics: Dict[str, Any] = {}
+    if "portfolio_summary" in store:
+        summary = store.get("portfolio_summary")
+        for key in ("annualized_return", "annualized_vol", "max_drawdown"):
+            metrics[f"portfolio.{key}"] = summary[key]
+    for s in sleeves:
+        exposures = store.get(f"exposures_{s.name}")
+        attrib = store.get(f"attrib_{s.name}")
+        metrics[f"{s.name}.windows"] = int(len(exposures))
+        metrics[f"{s.name}.r2_mean"] = float(exposures["r2"].mean()) if len(exposures) else None
+        if len(exposures):
+            last = exposures.iloc[-1]
+            metrics.update({f"{s.name}.last_{c}": float(last[c]) for c in exposures.columns if c.startswith("beta_")})
+        if len(attrib):
+            metrics[f"{s.name}.cum_explained_return"] = float(attrib["cum_explained_return"].iloc[-1])
+            metrics[f"{s.name}.cum_residual_return"] = float(attrib["cum_residual_return"].iloc[-1])
+    if "regime_summary" in store:
+        metrics["regimes.stress_fraction"] = store.get("regime_summary").get("stress_fraction")
+    return metrics
+
+
+# Data shared with worker processes, set once per worker by the pool initializer.
+_SHARED: Dict[str, Any] = {}
+
+
+def _init_worker(shared: Dict[str, Any]) -> None:
+    _SHARED.clear()
+    _SHARED.update(shared)
+
+
+def run_variant(name: str, cfg: Config, sleeves: Sequence[Sleeve], force: bool = False) -> Dict[str, Any]:
+    """
+    Run the model stages for one variant against the shared data and return
+    its index entry. Stage state lives in the variant's own directory, so a
+    re-run sweep skips the variants (and stages) that haven't changed.
+    """
+    out = io.StringIO()
+    store = ArtifactStore()
+    try:
+        for key, value in _SHARED.items():
+            store.put(key, value)
+        pipeline = Pipeline(build_stages(cfg, sleeves, include_sources=False), external=list(_SHARED))
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            decisions = pipeline.execute(cfg, store, cfg.out_data / "pipeline_state.json", force=force)
+        metrics = variant_metrics(store, sleeves)
+    except Exception as exc:
+        return {"variant": name, "status": "failed", "error": f"{type(exc).__name__}: {exc}", "log": out.getvalue()}
+    finally:
+        store.close()
+    return {
+        "variant": name,
+        "status": "ok",
+        "stages_run": [d.stage for d in decisions if d.run],
+        "metrics": metrics,
+    }
+
+
+def run_sweep(
+    base: Config,
+    sleeves: Sequence[Sleeve],
+    variants: Sequence[Dict[str, Any]],
+    out_dir: Path,
+    jobs: int = 1,
+    force: bool = False,
+) -> Path:
+    """
+    Load returns/factors once, run every variant's model stages (on `jobs`
+    worker processes), and write `<out_dir>/index.json` comparing them.
+
+    Each variant writes under `<out_dir>/<variant name>/` (data, reports and
+    the site JSON bundle), so variants never overwrite each other or the
+    main pipeline outputs.
+    """
+    for overrides in variants:
+        validate_overrides(overrides)
+    names = [variant_name(v) for v in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate variants in sweep")
+
+    shared = load_returns(base, {})
+    shared.update(load_factors(base, {}, regions=factor_regions(sleeves)))
+
+    configs = [variant_config(base, v, out_dir / n) for v, n in zip(variants, names)]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared,)) as pool:
+            futures = [pool.submit(run_variant, n, c, sleeves, force) for n, c in zip(names, configs)]
+            results = [f.result() for f in futures]
+    else:
+        _init_worker(shared)
+        try:
+            results = [run_variant(n, c, sleeves, force) for n, c in zip(names, configs)]
+        finally:
+            _SHARED.clear()
+
+    index = {
+        "base": {f: getattr(base, f) for f in DATA_FIELDS},
+        "sleeves": [s.name for s in sleeves],
+        "variants": [{**r, "overrides": v} for r, v in zip(results, variants)],
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / "index.json"
+    index_path.write_text(json.dumps(index, indent=2, default=str))
+    return index_path
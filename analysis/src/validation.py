@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Whole-column check: numeric (or string) dtype, optional nulls, inclusive bounds."""
+
+    kind: str = "float"  # "float" | "int" | "str"
+    nullable: bool = False
+    lo: float | None = None
+    hi: float | None = None
+    allowed: tuple = ()
+
+
+# Mirrors ExposureRow / AttributionRow / RegimeRow in analysis.src.schemas.
+EXPOSURE_COLUMNS: Dict[str, ColumnSpec] = {
+    "alpha": ColumnSpec(),
+    "r2": ColumnSpec(lo=-1e-9, hi=1 + 1e-9),
+    "nobs": ColumnSpec(kind="int", lo=1),
+}
+ATTRIBUTION_COLUMNS: Dict[str, ColumnSpec] = {
+    "y": ColumnSpec(),
+    "alpha_contrib": ColumnSpec(),
+    "explained_return": ColumnSpec(),
+    "residual_return": ColumnSpec(),
+    "explained_share": ColumnSpec(nullable=True),
+    "cum_explained_return": ColumnSpec(),
+    "cum_residual_return": ColumnSpec(),
+}
+REGIME_COLUMNS: Dict[str, ColumnSpec] = {
+    "regime": ColumnSpec(kind="str", allowed=("calm", "stress")),
+    "vol": ColumnSpec(lo=0),
+    "vol_thresh": ColumnSpec(lo=0),
+}
+
+
+def validate_dates(index: pd.Index, label: str) -> None:
+    if not isinstance(index, pd.DatetimeIndex):
+        raise ValueError(f"{label}: index must be a DatetimeIndex, got {type(index).__name__}")
+    if index.hasnans:
+        raise ValueError(f"{label}: index contains missing dates")
+    if not index.is_monotonic_increasing:
+        raise ValueError(f"{label}: dates are not sorted ascending")
+    if not index.is_unique:
+        raise ValueError(f"{label}: dates contain duplicates")
+
+
+def validate_frame(
+    df: pd.DataFrame,
+    specs: Dict[str, ColumnSpec],
+    label: str,
+    prefixed: Iterable[str] = (),
+) -> None:
+    """
+    Validate a date-indexed table column by column (no per-row model objects).
+
+    Every column in `specs` must exist and satisfy its spec. Columns whose name
+    starts with one of `prefixed` (e.g. "beta_", "contrib_") must be non-null
+    floats, and at least one such column must exist for each prefix.
+    """
+    validate_dates(df.index, label)
+
+    missing = [c for c in specs if c not in df.columns]
+    if missing:
+        raise ValueError(f"{label}: missing columns {missing}")
+    for prefix in prefixed:
+        if not any(str(c).startswith(prefix) for c in df.columns):
+            raise ValueError(f"{label}: no {prefix}* columns")
+
+    checks = dict(specs)
+    for c in df.columns:
+        if c not in checks and any(str(c).startswith(p) for p in prefixed):
+            checks[c] = ColumnSpec()
+
+    for col, spec in checks.items():
+        s = df[col]
+        if spec.kind == "str":
+            values = s.astype("object")
+            nulls = values.isna()
+            if spec.allowed:
+                bad = ~values.isin(spec.allowed) & ~nulls
+                if bad.any():
+                    raise ValueError(f"{label}.{col}: unexpected values {sorted(set(values[bad]))[:5]}")
+        else:
+            if not (pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)):
+                raise ValueError(f"{label}.{col}: expected numeric dtype, got {s.dtype}")
+            arr = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            nulls = pd.Series(np.isnan(arr), index=s.index)
+            finite = arr[~nulls.to_numpy()]
+            if np.isinf(finite).any():
+                raise ValueError(f"{label}.{col}: contains infinite values")
+            if spec.kind == "int" and (finite != np.round(finite)).any():
+                raise ValueError(f"{label}.{col}: expected integer values")
+            if spec.lo is not None and (finite < spec.lo).any():
+                raise ValueError(f"{label}.{col}: values below {spec.lo} (min {finite.min()})")
+            if spec.hi is not None and (finite > spec.hi).any():
+                raise ValueError(f"{label}.{col}: values above {spec.hi} (max {finite.max()})")
+        if not spec.nullable and nulls.any():
+            first = df.index[nulls.to_numpy()][0]
+            raise ValueError(f"{label}.{col}: {int(nulls.sum())} missing values (first at {first.date()})")
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+import pandas as pd
+
+from analysis.src.artifacts import ArtifactStore, content_hash, write_generation
+from analysis.src.config import Config, Sleeve, freq_label
+from analysis.src.data_factors import factor_filename
+from analysis.src.dag import Pipeline
+from analysis.src.data_prices import fetch_prices
+from analysis.src.rolling_model import extend_rolling_ols
+from analysis.src.stages import (
+    build_sleeve_frames,
+    build_stages,
+    factor_regions,
+    load_factors,
+    load_returns,
+    rolling_exposures,
+    sleeve_attribution,
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Watcher:
+    """
+    Resident pipeline: keeps returns, frames and exposures in memory and
+    recomputes when the cached inputs change.
+
+    Each `update` reloads the (cheap, cached) returns and factors and does
+    nothing further if their content is unchanged. Otherwise frames are
+    rebuilt, and per sleeve the rolling exposures are only extended with the
+    windows ending on new bars when the earlier rows of the frame are
+    unchanged (a restatement falls back to a full refit), and attribution is
+    recomputed from them. Every other stage of the pipeline graph (data
+    quality, per-asset exposures, the exposures cube, comovement, regimes,
+    the site bundle, ...) then runs in dependency order on the in-memory
+    tables, with the same stage functions and inputs as the pipeline: all of
+    them are downstream of the returns and factors.
+
+    Outputs go to the same paths as run_pipeline. A status JSON (default
+    `out_reports/watch_status.json`) reports the last check/update time, the
+    latest bar and how far behind it is.
+    """
+
+    def __init__(
+        self,
+        cfg: Config,
+        sleeves: Sequence[Sleeve],
+        store: ArtifactStore,
+        status_path: Path | None = None,
+        refresh_seconds: float | None = None,
+    ):
+        self.cfg = cfg
+        self.sleeves = list(sleeves)
+        self.store = store
+        self.status_path = status_path or cfg.out_reports / "watch_status.json"
+        self.refresh_seconds = refresh_seconds
+        self.stages = {st.name: st for st in Pipeline(build_stages(cfg, sleeves)).stages}  # dependency order
+        self.paths = {name: path for st in self.stages.values() for name, path in st.outputs.items()}
+        self._inputs_hash: str | None = None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._last_refresh = 0.0
+        self.status: Dict[str, Any] = {
+            "pid": os.getpid(),
+            "state": "starting",
+            "started_at": _now(),
+            "last_check": None,
+            "last_update": None,
+            "last_bar": None,
+            "data_lag_days": None,
+            "updates": 0,
+            "last_cycle_seconds": None,
+            "exposure_updates": {},
+            "last_error": None,
+        }
+
+    def signature(self) -> tuple:
+        """Cheap fingerprint of the cache files an external fetch would rewrite."""
+        label = freq_label(self.cfg.freq)
+        files = [
+            self.cfg.out_data / f"returns_{label}.parquet",
+            self.cfg.out_data / "store" / f"returns_{label}" / "_store.json",
+            *(
+                self.cfg.out_data / "factors" / factor_filename(r, self.cfg.factor_set, self.cfg.freq)
+                for r in factor_regions(self.sleeves)
+            ),
+        ]
+        sig = []
+        for p in files:
+            try:
+                st = p.stat()
+                sig.append((str(p), st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append((str(p), None, None))
+        return tuple(sig)
+
+    def _put(self, produced: Dict[str, Any]) -> None:
+        for name, value in produced.items():
+            self.store.put(name, value, self.paths.get(name))
+
+    def _run(self, name: str) -> None:
+        """Run pipeline stage `name` on the in-memory artifacts, if the graph has it."""
+        stage = self.stages.get(name)
+        if stage is not None:
+            self._put(stage.fn(self.cfg, {k: self.store.get(k) for k in stage.inputs}, **stage.params))
+
+    def _refresh_provider(self) -> None:
+        if self.refresh_seconds is None or time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        cfg = self.cfg
+        fetch_prices(cfg.tickers, cfg.start, cfg.end, cfg.freq, cfg.out_data, force=True, dtype=cfg.dtype)
+        self._last_refresh = time.monotonic()
+
+    def update(self) -> bool:
+        """Run one check; returns True if outputs were recomputed."""
+        t0 = time.perf_counter()
+        cfg = self.cfg
+        self._refresh_provider()
+        inputs = load_returns(cfg, {})
+        inputs.update(load_factors(cfg, {}, regions=factor_regions(self.sleeves)))
+        inputs_hash = content_hash({k: content_hash(v) for k, v in inputs.items()})
+        self.status["last_check"] = _now()
+        last_bar = inputs["returns"].index.max()
+        self.status["last_bar"] = str(last_bar.date())
+        self.status["data_lag_days"] = (pd.Timestamp.now().normalize() - last_bar.normalize()).days
+        if inputs_hash == self._inputs_hash:
+            return False
+
+        self._put(inputs)
+        built = build_sleeve_frames(cfg, inputs, self.sleeves)
+        self._put(built)
+        updated = {*inputs, *built}
+
+        modes = {}
+        for sleeve in self.sleeves:
+            name = sleeve.name
+            frame = built[f"frame_{name}"]
+            previous_frame = self._frames.get(name)
+            exposures_key = f"exposures_{name}"
+            if (
+                previous_frame is not None
+                and exposures_key in self.store
+                and frame.loc[: previous_frame.index.max()].equals(previous_frame)
+            ):
+                exposures = extend_rolling_ols(
+                    frame,
+                    self.store.get(exposures_key),
+                    y_col="Y",
+                    x_cols=sleeve.x_cols(cfg.factor_set),
+                    window=cfg.rolling_window_weeks,
+                    min_nobs=cfg.min_nobs,
+                )
+                self._put({exposures_key: exposures})
+                modes[name] = "incremental"
+            else:
+                self._put(rolling_exposures(cfg, {f"frame_{name}": frame}, sleeve))
+                modes[name] = "full"
+            attribution = sleeve_attribution(
+                cfg, {f"frame_{name}": frame, exposures_key: self.store.get(exposures_key)}, sleeve
+            )
+            self._put(attribution)
+            updated.update([exposures_key, *attribution])
+            self._frames[name] = frame
+
+        # the remaining stages, in dependency order
+        for stage in self.stages.values():
+            if not set(stage.outputs) <= updated:
+                self._run(stage.name)
+        self.store.flush()
+        if self.store.persist:
+            write_generation(cfg.out_data, list(self.stages))
+
+        self._inputs_hash = inputs_hash
+        self.status.update(
+            last_update=_now(),
+            updates=self.status["updates"] + 1,
+            last_cycle_seconds=round(time.perf_counter() - t0, 3),
+            exposure_updates=modes,
+        )
+        return True
+
+    def write_status(self, state: str | None = None) -> None:
+        if state is not None:
+            self.status["state"] = state
+        self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.status_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.status, indent=2))
+        tmp.replace(self.status_path)
+
+    def run(self, stop: threading.Event, poll_seconds: float = 30.0, log=print) -> None:
+        """
+        Check for new data every `poll_seconds` until `stop` is set. The
+        inputs are reloaded when the cache files change (once their signature
+        is stable across two polls, so a half-written fetch is not picked up)
+        or when a provider refresh is due. A failing update is logged in the
+        status file and retried on the next change.
+        """
+        seen = None
+        processed = None
+        try:
+            while not stop.is_set():
+                sig = self.signature()
+                refresh_due = (
+                    self.refresh_seconds is not None and time.monotonic() - self._last_refresh >= self.refresh_seconds
+                )
+                if processed is None or refresh_due or (sig == seen and sig != processed):
+                    try:
+                        if self.update():
+                            log(f"[watch] updated through {self.status['last_bar']}: {self.status['exposure_updates']}")
+                        self.status["last_error"] = None
+                        processed = self.signature()
+                    except Exception as exc:
+                        self.status["last_error"] = f"{type(exc).__name__}: {exc}"
+                        log(f"[watch] update failed: {self.status['last_error']}")
+                        processed = sig
+                seen = sig
+                self.write_status("running")
+                stop.wait(poll_seconds)
+        finally:
+            self.store.close()
+            self.write_status("stopped")
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.attribution import compute_attribution
+from analysis.src.config import Config, Sleeve
+from analysis.src.regimes import summarize_regimes
+from analysis.src.rolling_model import ols_from_moments, window_sums
+
+
+class SleeveState:
+    """
+    Everything about one sleeve's rolling regression that does not depend on
+    the weights: the frame dates and regressors, one y column per holding
+    (excess or total return, so the sleeve's Y is y @ w for weights w summing
+    to 1), and the windowed moments X'X (with its pseudo-inverse and rank),
+    X'y_i, y_i'y_j and sum y_i.
+
+    OLS is linear in y, so a weight set's rolling fit (coefficients, r2 and
+    standard errors) follows from contracting these moments with w: no
+    regression is re-run and nothing is re-read.
+    """
+
+    def __init__(
+        self,
+        sleeve: Sleeve,
+        returns: pd.DataFrame,
+        factors: Mapping[str, pd.DataFrame],
+        factor_set: str,
+        window: int,
+        min_nobs: int,
+    ):
+        self.sleeve = sleeve
+        self.tickers: List[str] = list(sleeve.tickers)
+        self.x_cols: List[str] = sleeve.x_cols(factor_set)
+        self.window = window
+        if window <= len(self.x_cols) + 1:
+            raise ValueError(f"Rolling window ({window}) must exceed regressors + intercept ({len(self.x_cols) + 1}).")
+        missing = [t for t in (*self.tickers, *sleeve.proxies) if t not in returns.columns]
+        if missing:
+            raise ValueError(f"Sleeve {sleeve.name}: missing returns for {missing}")
+
+        # Same rows as FrameBuilder: holdings with no missing return (drop_any),
+        # joined with complete regressor rows.
+        held = returns[self.tickers].dropna(how="any")
+        if sleeve.factors == "proxies":
+            regressors = returns[list(sleeve.proxies)].dropna(how="any")
+        else:
+            if sleeve.factors not in factors:
+                raise ValueError(f"No factor table for source {sleeve.factors!r}; have {sorted(factors)}")
+            regressors = factors[sleeve.factors].dropna(how="any")
+        self.dates = held.index.intersection(regressors.index)
+        y = held.loc[self.dates].to_numpy(dtype=float)
+        if sleeve.target == "excess":
+            y = y - regressors.loc[self.dates, ["RF"]].to_numpy(dtype=float)
+        self.y = y
+        self.X = regressors.loc[self.dates, self.x_cols].to_numpy(dtype=float)
+
+        T = len(self.dates)
+        self.ends = self.dates[window - 1 :] if window >= min_nobs and T >= window else self.dates[:0]
+        if len(self.ends):
+            Xc = np.column_stack([np.ones(T), self.X])
+            self.xx = window_sums(Xc[:, :, None] * Xc[:, None, :], window)
+            self.inv = np.linalg.pinv(self.xx, hermitian=True)
+            self.rank = np.linalg.matrix_rank(self.xx, hermitian=True)
+            self.xy = window_sums(Xc[:, :, None] * y[:, None, :], window)
+            self.yy = window_sums(y[:, :, None] * y[:, None, :], window)
+            self.ys = window_sums(y, window)
+
+    def weight_vector(self, weights: Mapping[str, float]) -> np.ndarray:
+        w = np.array([float(weights.get(t, 0.0)) for t in self.tickers])
+        total = float(w.sum())
+        if total <= 0:
+            raise ValueError(f"Sleeve {self.sleeve.name}: weights must sum to a positive value.")
+        return w / total
+
+    def frame(self, w: np.ndarray) -> pd.DataFrame:
+        """The sleeve frame (Y + regressors) for normalized weights `w`."""
+        out = pd.DataFrame(self.X, index=self.dates, columns=self.x_cols)
+        out.insert(0, "Y", self.y @ w)
+        return out
+
+    def exposures(self, w: np.ndarray) -> pd.DataFrame:
+        """`run_rolling_ols` output for normalized weights `w`, from the cached moments."""
+        if not len(self.ends):
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+        fit = ols_from_moments(
+            xx=self.xx,
+            xy=(self.xy @ w)[:, :, None],
+            yy=np.einsum("mij,i,j->m", self.yy, w, w)[:, None],
+            ys=(self.ys @ w)[:, None],
+            nobs=self.window,
+            inv=self.inv,
+            rank=self.rank,
+        )
+        coef, stderr = fit["coef"][:, :, 0], fit["stderr"][:, :, 0]
+        out = {
+            "alpha": coef[:, 0],
+            "r2": fit["r2"][:, 0],
+            "nobs": np.full(len(self.ends), self.window),
+            "stderr_alpha": stderr[:, 0],
+        }
+        for j, c in enumerate(self.x_cols, start=1):
+            out[f"beta_{c}"] = coef[:, j]
+            out[f"stderr_beta_{c}"] = stderr[:, j]
+        return pd.DataFrame(out, index=pd.DatetimeIndex(self.ends, name="date"))
+
+
+@dataclass
+class WhatIfResult:
+    weights: Dict[str, float]
+    exposures: Dict[str, pd.DataFrame]
+    attribution: Dict[str, pd.DataFrame]
+    regimes: pd.DataFrame | None = None
+    regime_summary: dict | None = None
+    elapsed_ms: float = 0.0
+    frames: Dict[str, pd.DataFrame] = field(default_factory=dict, repr=False)
+
+
+def move_weight(weights: Mapping[str, float], source: str, target: str, amount: float) -> Dict[str, float]:
+    """Copy of `weights` with `amount` (e.g. 0.05 = 5 points) moved from `source` to `target`."""
+    for t in (source, target):
+        if t not in weights:
+            raise ValueError(f"Unknown ticker {t!r}; have {sorted(weights)}")
+    if amount > weights[source] + 1e-12:
+        raise ValueError(f"Cannot move {amount:g} from {source}: it only holds {weights[source]:g}")
+    out = dict(weights)
+    out[source] -= amount
+    out[target] += amount
+    return out
+
+
+class WhatIf:
+    """
+    Reweighting scenarios from cached state. Build once per data load (one
+    `SleeveState` per sleeve); `run(weights)` then returns the exposures,
+    attribution and regime summary a full pipeline rerun with those weights
+    would produce (to floating-point tolerance; see `reference_run`).
+    """
+
+    def __init__(self, cfg: Config, sleeves: Sequence[Sleeve], returns: pd.DataFrame, factors: Mapping[str, pd.DataFrame]):
+        self.cfg = cfg
+        self.sleeves = list(sleeves)
+        self.returns = returns[list(cfg.tickers)]
+        self.factors = dict(factors)
+        self.states = {
+            s.name: SleeveState(s, self.returns, factors, cfg.factor_set, cfg.rolling_window_weeks, cfg.min_nobs)
+            for s in self.sleeves
+        }
+
+    @classmethod
+    def load(cls, cfg: Config, sleeves: Sequence[Sleeve]) -> "WhatIf":
+        """Read returns and factors from the pipeline's caches (once)."""
+        from analysis.src.stages import factor_regions, load_factors, load_returns
+
+        returns = load_returns(cfg, {})["returns"]
+        factors = load_factors(cfg, {}, regions=factor_regions(sleeves))
+        return cls(cfg, sleeves, returns, {k.removeprefix("factors_"): v for k, v in factors.items()})
+
+    def _check(self, weights: Mapping[str, float]) -> Dict[str, float]:
+        unknown = [t for t in weights if t not in self.cfg.tickers]
+        if unknown:
+            raise ValueError(f"Unknown tickers {unknown}; universe is {list(self.cfg.tickers)}")
+        return {t: float(weights.get(t, 0.0)) for t in self.cfg.tickers}
+
+    def run(self, weights: Mapping[str, float]) -> WhatIfResult:
+        t0 = time.perf_counter()
+        weights = self._check(weights)
+        frames, exposures, attribution = {}, {}, {}
+        for name, state in self.states.items():
+            w = state.weight_vector(weights)
+            frames[name] = state.frame(w)
+            exposures[name] = state.exposures(w)
+            attribution[name] = compute_attribution(frames[name], exposures[name], y_col="Y")
+        result = WhatIfResult(weights=weights, exposures=exposures, attribution=attribution, frames=frames)
+        if "equity_us" in exposures:
+            result.regimes, result.regime_summary = summarize_regimes(
+                returns=self.returns,
+                exposures=exposures["equity_us"],
+                attribution=attribution["equity_us"],
+                vol_window_weeks=self.cfg.vol_window_weeks,
+                lookback_weeks=self.cfg.vol_lookback_weeks,
+                percentile=self.cfg.vol_percentile,
+                weights=weights,
+            )
+        result.elapsed_ms = (time.perf_counter() - t0) * 1000
+        return result
+
+
+def reference_run(
+    cfg: Config, sleeves: Sequence[Sleeve], returns: pd.DataFrame, factors: Mapping[str, pd.DataFrame], weights: Mapping[str, float]
+) -> WhatIfResult:
+    """The same outputs the slow way (FrameBuilder + statsmodels), as the pipeline stages compute them."""
+    from analysis.src.build_frames import FrameBuilder
+    from analysis.src.rolling_model import run_rolling_ols
+
+    t0 = time.perf_counter()
+    cfg = replace(cfg, weights=dict(weights))
+    builder = FrameBuilder(returns, dict(factors), cfg.weights, sleeves, dtype=cfg.dtype, factor_set=cfg.factor_set)
+    frames, exposures, attribution = {}, {}, {}
+    for s in sleeves:
+        frames[s.name] = builder.frame(s.name)
+        exposures[s.name] = run_rolling_ols(
+            frames[s.name], "Y", s.x_cols(cfg.factor_set), window=cfg.rolling_window_weeks, min_nobs=cfg.min_nobs
+        )
+        attribution[s.name] = compute_attribution(frames[s.name], exposures[s.name], y_col="Y")
+    result = WhatIfResult(weights=dict(weights), exposures=exposures, attribution=attribution, frames=frames)
+    if "equity_us" in exposures:
+        result.regimes, result.regime_summary = summarize_regimes(
+            returns=returns[list(cfg.tickers)],
+            exposures=exposures["equity_us"],
+            attribution=attribution["equity_us"],
+            vol_window_weeks=cfg.vol_window_weeks,
+            lookback_weeks=cfg.vol_lookback_weeks,
+            percentile=cfg.vol_percentile,
+            weights=cfg.weights,
+        )
+    result.elapsed_ms = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def max_deviation(a: WhatIfResult, b: WhatIfResult) -> Dict[str, Any]:
+    """Largest absolute difference per output between two results (NaN positions must agree)."""
+
+    def frame_diff(x: pd.DataFrame, y: pd.DataFrame) -> float:
+        if not x.index.equals(y.index) or list(x.columns) != list(y.columns):
+            return float("inf")
+        xv = x.apply(pd.to_numeric).to_numpy(dtype=float, na_value=np.nan)
+        yv = y.apply(pd.to_numeric).to_numpy(dtype=float, na_value=np.nan)
+        if not np.array_equal(np.isnan(xv), np.isnan(yv)):
+            return float("inf")
+        return float(np.nanmax(np.abs(xv - yv), initial=0.0))
+
+    out: Dict[str, Any] = {}
+    for name in a.exposures:
+        out[f"exposures:{name}"] = frame_diff(a.exposures[name], b.exposures[name])
+        out[f"attribution:{name}"] = frame_diff(a.attribution[name], b.attribution[name])
+    if a.regimes is not None and b.regimes is not None:
+        same_labels = a.regimes["regime"].astype(str).equals(b.regimes["regime"].astype(str))
+        out["regimes"] = frame_diff(a.regimes.drop(columns="regime"), b.regimes.drop(columns="regime")) if same_labels else float("inf")
+    return out
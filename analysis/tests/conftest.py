@@ -0,0 +1,19 @@
+import pytest
+
+from analysis.bench.synthetic import make_market
+from analysis.src.config import get_config
+
+
+def synthetic_sources(periods: int = 180, seed: int = 0) -> dict:
+    """A synthetic market under the configured tickers, shaped like the source stages' outputs."""
+    tickers = list(get_config().tickers)
+    m = make_market(len(tickers), periods, freq="W-FRI", seed=seed)
+    return {
+        "returns": m.returns.set_axis(tickers, axis=1),
+        **{f"factors_{region}": df for region, df in m.factors.items()},
+    }
+
+
+@pytest.fixture
+def sources():
+    return synthetic_sources
@@ -7,7 +7,7 @@ def test_outputs_exist():
     assert (ROOT/"analysis/outputs/data/returns_weekly.parquet").exists()
     assert (ROOT/"analysis/outputs/data/factors").exists()
     assert (ROOT/"analysis/outputs/data/frames").exists()
-    assert (ROOT/"analysis/outputs/data/frames/model_frame.parquet").exists()
+    assert (ROOT/"analysis/outputs/data/frames/frame_equity_us.parquet").exists()
     assert (ROOT/"analysis/outputs/reports/quality_report.json").exists()
 
 def test_frames_no_nans_and_monotonic():
@@ -16,7 +16,6 @@ def test_frames_no_nans_and_monotonic():
         "frame_equity_us.parquet",
         "frame_equity_intl.parquet",
         "frame_total_macro.parquet",
-        "model_frame.parquet",
     ]:
         df = pd.read_parquet(frames_dir / name)
         assert df.index.is_monotonic_increasing
@@ -28,8 +27,10 @@ def test_factor_index_is_datetime():
     import pandas as pd
     from pathlib import Path
 
+    from analysis.src.data_factors import factor_filename
+
     ROOT = Path(__file__).resolve().parents[2]
     factors_dir = ROOT / "analysis" / "outputs" / "data" / "factors"
-    us = pd.read_parquet(factors_dir / "F-F_Research_Data_Factors_weekly.parquet")
+    us = pd.read_parquet(factors_dir / factor_filename("us", "FF3", "W-FRI"))
     assert hasattr(us.index, "dtype")
     assert "datetime" in str(us.index.dtype).lower()
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from analysis.src.artifacts import ArtifactStore
+
+
+def test_artifact_store_keeps_one_copy_and_persists(tmp_path):
+    df = pd.DataFrame({"x": [3.0, 1.0, 2.0]}, index=["2020-01-17", "2020-01-03", "2020-01-10"])
+    store = ArtifactStore(persist=True)
+    try:
+        stored = store.put("x", df, tmp_path / "x.parquet")
+        assert isinstance(stored.index, pd.DatetimeIndex)
+        assert stored.index.is_monotonic_increasing
+        assert store.get("x") is stored
+    finally:
+        store.close()
+
+    on_disk = pd.read_parquet(tmp_path / "x.parquet")
+    assert list(on_disk["x"]) == [1.0, 2.0, 3.0]
+
+    lazy = ArtifactStore(persist=False)
+    lazy.register("x", tmp_path / "x.parquet")
+    assert "x" in lazy
+    assert list(lazy.get("x")["x"]) == [1.0, 2.0, 3.0]
+
+
+def test_artifact_store_without_persist_writes_nothing(tmp_path):
+    store = ArtifactStore(persist=False)
+    store.put("x", pd.DataFrame({"x": [1.0]}, index=pd.to_datetime(["2020-01-03"])), tmp_path / "x.parquet")
+    store.close()
+    assert not (tmp_path / "x.parquet").exists()
@@ -0,0 +1,89 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.bench.synthetic import make_market
+from analysis.src.asset_exposures import ExposureCube, asset_factor_sources, run_asset_rolling_ols, sleeve_exposures
+from analysis.src.build_frames import FrameBuilder
+from analysis.src.rolling_model import run_rolling_ols, run_rolling_ols_batched
+
+X_COLS = ["MKT_RF", "SMB", "HML"]
+
+
+def test_sleeve_exposures_are_a_contraction_of_per_asset_exposures():
+    m = make_market(12, 200, freq="W-FRI", seed=3)
+    tickers = list(m.returns.columns)
+    sources = asset_factor_sources(tickers, m.sleeves)
+    assert sources[tickers[0]] == "us" and sources[tickers[-1]] == "dev_ex_us"
+
+    cube = ExposureCube.from_panel(run_asset_rolling_ols(m.returns, m.factors, sources, X_COLS, window=52, min_nobs=45))
+    assert cube.values.shape == (200 - 51, 12, 2 * len(X_COLS) + 3)
+    assert cube.to_panel().columns.names == ["ticker", "field"]
+
+    weights = {t: float(w) for t, w in zip(tickers, np.linspace(1, 3, len(tickers)))}
+    frames = FrameBuilder(m.returns, m.factors, weights, m.sleeves)
+    for sleeve in m.sleeves:
+        ref = run_rolling_ols(frames.frame(sleeve.name), "Y", X_COLS, window=52, min_nobs=45)
+        agg = sleeve_exposures(cube, sleeve, weights)
+        assert list(agg.columns) == ["alpha", "beta_MKT_RF", "beta_SMB", "beta_HML"]
+        pd.testing.assert_frame_equal(agg, ref[agg.columns], check_exact=False, rtol=1e-9, atol=1e-12, check_freq=False)
+
+    # drill-down: one holding's exposures equal its own regression
+    one = tickers[0]
+    frame = pd.concat([(m.returns[one] - m.factors["us"]["RF"]).rename("Y"), m.factors["us"][X_COLS]], axis=1)
+    ref = run_rolling_ols(frame, "Y", X_COLS, window=52, min_nobs=45)
+    pd.testing.assert_frame_equal(cube.asset(one), ref[cube.fields], check_exact=False, rtol=1e-9, atol=1e-12, check_freq=False)
+
+    with pytest.raises(ValueError, match="No per-asset exposures"):
+        cube.aggregate({"NOPE": 1.0})
+
+    # a window shorter than min_nobs fits nothing, as in run_rolling_ols
+    empty = run_asset_rolling_ols(m.returns, m.factors, sources, X_COLS, window=26, min_nobs=45)
+    assert empty.shape == (0, 12 * (2 * len(X_COLS) + 3))
+
+
+def test_a_late_listing_only_costs_its_own_windows():
+    m = make_market(12, 200, freq="W-FRI", seed=3)
+    tickers = list(m.returns.columns)
+    sources = asset_factor_sources(tickers, m.sleeves)
+    late = m.sleeves[0].tickers[1]
+    returns = m.returns.copy()
+    returns.iloc[:60, tickers.index(late)] = np.nan
+
+    full = ExposureCube.from_panel(run_asset_rolling_ols(m.returns, m.factors, sources, X_COLS, window=52, min_nobs=45))
+    cube = ExposureCube.from_panel(run_asset_rolling_ols(returns, m.factors, sources, X_COLS, window=52, min_nobs=45))
+    # the other tickers keep every date and their fits
+    assert cube.dates.equals(full.dates)
+    others = [i for i, t in enumerate(tickers) if t != late]
+    np.testing.assert_allclose(cube.values[:, others], full.values[:, others], rtol=1e-9, atol=1e-12)
+    # the late ticker starts at its first full window and matches its own regression
+    assert cube.asset(late).index[0] == returns.index[60 + 51]
+    frame = pd.concat([(returns[late] - m.factors["us"]["RF"]).rename("Y"), m.factors["us"][X_COLS]], axis=1)
+    ref = run_rolling_ols(frame, "Y", X_COLS, window=52, min_nobs=45)
+    pd.testing.assert_frame_equal(cube.asset(late), ref[cube.fields], check_exact=False, rtol=1e-9, atol=1e-12, check_freq=False)
+
+    # on the dates all holdings share, the sleeve is still the weighted sum of its holdings
+    sleeve = m.sleeves[0]
+    weights = {t: 1.0 for t in tickers}
+    agg = sleeve_exposures(cube, sleeve, weights)
+    assert agg.index[0] == returns.index[60 + 51]
+    frames = FrameBuilder(returns.iloc[60:], m.factors, weights, m.sleeves)
+    ref = run_rolling_ols(frames.frame(sleeve.name), "Y", X_COLS, window=52, min_nobs=45)
+    pd.testing.assert_frame_equal(agg, ref[agg.columns], check_exact=False, rtol=1e-9, atol=1e-12, check_freq=False)
+
+
+def test_batched_rolling_matches_reference_with_nans_and_collinear_regressors():
+    m = make_market(6, 120, freq="W-FRI", seed=5)
+    frame = FrameBuilder(m.returns, m.factors, m.weights, m.sleeves).frame("equity_us")
+    frame.iloc[[3, 40, 77], 0] = np.nan
+    collinear = frame.assign(HML=2.0 * frame["SMB"])
+    for f in (frame, collinear):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # statsmodels flags the rank-deficient design
+            ref = run_rolling_ols(f, "Y", X_COLS, window=30, min_nobs=25)
+        fast = run_rolling_ols_batched(f, "Y", X_COLS, window=30, min_nobs=25)
+        assert list(fast.columns) == list(ref.columns)
+        pd.testing.assert_frame_equal(fast, ref, check_exact=False, rtol=1e-7, atol=1e-10, check_dtype=False)
+    assert run_rolling_ols_batched(frame.iloc[:20], "Y", X_COLS, window=30, min_nobs=25).empty
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.bench.parity import check_engine, make_cases
+from analysis.bench.suite import Scale, compare, run_benchmarks
+from analysis.bench.synthetic import make_market
+from analysis.src.attribution import compute_attribution
+from analysis.src.build_frames import FrameBuilder
+from analysis.src.regimes import compute_regimes
+from analysis.src.rolling_model import run_rolling_ols
+
+
+def test_synthetic_market_is_seeded_and_recovers_true_betas():
+    a = make_market(20, 520, freq="W-FRI", seed=7)
+    b = make_market(20, 520, freq="W-FRI", seed=7)
+    pd.testing.assert_frame_equal(a.returns, b.returns)
+    assert not a.returns.equals(make_market(20, 520, freq="W-FRI", seed=8).returns)
+    assert set(a.states.unique()) == {"calm", "stress"}
+
+    builder = FrameBuilder(returns=a.returns, factors=a.factors, weights=a.weights, sleeves=a.sleeves)
+    for sleeve in a.sleeves:
+        exposures = run_rolling_ols(builder.frame(sleeve.name), "Y", ["MKT_RF", "SMB", "HML"], window=104, min_nobs=100)
+        estimated = exposures[["beta_MKT_RF", "beta_SMB", "beta_HML"]].mean().to_numpy()
+        np.testing.assert_allclose(estimated, a.sleeve_betas(sleeve.name).to_numpy(), atol=0.1)
+
+
+def test_run_benchmarks_and_compare_flags_regressions():
+    results = run_benchmarks([Scale(4, "W-FRI", years=4)], cases=["compute_portfolio_returns", "compute_regimes"], repeat=2, log=lambda m: None)
+    assert set(results["results"]) == {"compute_portfolio_returns[4x208W-FRI]", "compute_regimes[4x208W-FRI]"}
+    entry = results["results"]["compute_regimes[4x208W-FRI]"]
+    assert entry["repeat"] == 2 and 0 < entry["min_s"] <= entry["median_s"] <= entry["max_s"]
+
+    def run(**times):
+        return {"results": {k: {"min_s": v} for k, v in times.items()}}
+
+    rows = compare(run(a=0.30, b=0.0012, c=0.1, d=1.0), run(a=0.10, b=0.0004, c=0.2, e=1.0), threshold=0.25)
+    status = {r["key"]: r["status"] for r in rows}
+    # b is 3x slower but under the absolute noise floor
+    assert status == {"a": "regression", "b": "ok", "c": "improved", "d": "new", "e": "missing"}
+
+
+def test_parity_harness_reports_deviations_and_edge_cases():
+    cases = make_cases(periods=120)
+    assert {c.name for c in cases if c.kind == "attribution"} >= {"nans", "collinear", "zero_returns", "short"}
+
+    same = check_engine("attribution", "copy", lambda **kw: compute_attribution(**kw).copy(), cases, repeat=1)
+    assert all(c["passed"] for c in same)
+    zero = next(c for c in same if c["case"] == "zero_returns")
+    assert zero["columns"]["explained_share"]["max_abs"] == 0.0 and zero["speedup"] > 0
+
+    def skewed(frame, exposures, y_col="Y"):
+        out = compute_attribution(frame, exposures, y_col)
+        out["contrib_SMB"] += 1e-6
+        out.iloc[0, out.columns.get_loc("residual_return")] = np.nan
+        return out
+
+    bad = next(c for c in check_engine("attribution", "skewed", skewed, cases, repeat=1) if c["case"] == "base")
+    assert not bad["passed"]
+    assert bad["columns"]["contrib_SMB"]["max_abs"] == pytest.approx(1e-6)
+    assert bad["columns"]["residual_return"]["nan_mismatch"] == 1
+    assert bad["columns"]["y"]["passed"]
+
+    regimes = check_engine("regimes", "flip", lambda **kw: compute_regimes(**kw).assign(regime="calm"), cases, repeat=1)
+    assert not next(c for c in regimes if c["case"] == "base")["columns"]["regime"]["passed"]
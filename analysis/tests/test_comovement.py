@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from analysis.src.comovement import PairwiseStore, comovement_payload, rolling_betas, unpack_triangle, write_pairwise_store
+
+
+def _returns(n=120, cols="ABCDE"):
+    rng = np.random.default_rng(1)
+    idx = pd.date_range("2020-01-03", periods=n, freq="W-FRI", name="date")
+    df = pd.DataFrame(rng.normal(0.001, 0.02, (n, len(cols))), index=idx, columns=list(cols))
+    df.iloc[3:9, 1] = np.nan
+    df.iloc[50, 3] = np.nan
+    return df
+
+
+def test_blocked_pairwise_store_matches_pandas_rolling(tmp_path):
+    df = _returns()
+    regimes = pd.Series(np.where(np.arange(len(df)) % 3 == 0, "stress", "calm"), index=df.index)
+    # block=2 splits five tickers into uneven blocks, including off-diagonal ones
+    header = write_pairwise_store(tmp_path, df, window=26, min_periods=20, block=2, regimes=regimes)
+    store = PairwiseStore.open(tmp_path)
+    assert len(store) == len(df) - 25 and store.tickers == list("ABCDE")
+
+    corr = df.rolling(26, min_periods=20).corr(pairwise=True)
+    cov = df.rolling(26, min_periods=20).cov(pairwise=True)
+    for date in store.dates[::5]:
+        np.testing.assert_allclose(store.matrix(date), corr.loc[date], atol=1e-6)
+        np.testing.assert_allclose(store.matrix(date, "cov"), cov.loc[date], rtol=1e-5, atol=1e-9)
+    np.testing.assert_allclose(store.pair("D", "B"), corr.xs("D", level=1)["B"].loc[store.dates], atol=1e-6)
+
+    calm = np.nanmean([corr.loc[d].to_numpy() for d in store.dates if regimes[d] == "calm"], axis=0)
+    np.testing.assert_allclose(unpack_triangle(header["regime_corr"]["calm"]["corr"], 5), calm, atol=1e-12)
+    assert header["regime_corr"]["stress"]["dates"] + header["regime_corr"]["calm"]["dates"] == len(store)
+
+
+def test_rolling_betas_and_payload(tmp_path):
+    df = _returns()
+    betas = rolling_betas(df[["B", "C", "D"]], df[["A", "E"]], window=26, min_periods=20, block=2)
+    assert list(betas.columns.get_level_values("field").unique()) == ["beta_A", "beta_E"]
+    ref = df["B"].rolling(26, min_periods=20).cov(df["A"]) / df["A"].where(df["B"].notna()).rolling(26, min_periods=20).var()
+    np.testing.assert_allclose(betas[("B", "beta_A")], ref.loc[betas.index], atol=1e-12)
+
+    write_pairwise_store(tmp_path, df, window=26, min_periods=20)
+    payload = comovement_payload(PairwiseStore.open(tmp_path), betas)
+    assert payload["date"] == str(df.index[-1].date()) and len(payload["latest"]["corr"]) == 15
+    assert payload["betas"]["tickers"]["C"]["beta_E"][-1] == round(float(betas[("C", "beta_E")].iloc[-1]), 6)
+
+
+def test_rewrite_keeps_open_stores_consistent(tmp_path):
+    df = _returns()
+    write_pairwise_store(tmp_path, df, window=26, min_periods=20)
+    old = PairwiseStore.open(tmp_path)
+    before = old.matrix()
+    write_pairwise_store(tmp_path, df.iloc[:-10, :3], window=26, min_periods=20)
+    new = PairwiseStore.open(tmp_path)
+    assert new.tickers == list("ABC") and len(new) == len(old) - 10
+    # the old mapping still reads its own rows under its own shape
+    np.testing.assert_array_equal(old.matrix(), before)
+    assert sorted(f.name for f in tmp_path.iterdir()) == ["corr.2.f32", "cov.2.f32", "pairwise.json"]
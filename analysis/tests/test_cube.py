@@ -0,0 +1,98 @@
+import json
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.src import cube as cube_mod
+from analysis.src.config import get_config, get_sleeves
+from analysis.src.cube import MemmapCube, append_cube, sync_cube, write_cube
+from analysis.src.stages import build_sleeve_frames, exposures_cube, rolling_exposures
+
+
+def _tables(n):
+    idx = pd.date_range("2020-01-03", periods=n, freq="W-FRI", name="date")
+    rng = np.random.default_rng(0)
+    out = {}
+    for sleeve, cols in (("us", ["alpha", "beta_MKT_RF"]), ("macro", ["alpha", "beta_TLT"])):
+        for window in (26, 52):
+            df = pd.DataFrame(rng.normal(size=(n, len(cols))), index=idx, columns=cols)
+            out[(sleeve, window)] = df.iloc[window - 26 :]  # the longer window starts later
+    return out
+
+
+def test_cube_slices_are_views_and_round_trip(tmp_path):
+    tables = _tables(80)
+    cube = write_cube(tmp_path / "x.cube", tables)
+    assert cube.values.shape == (80, 2, 2, 3)
+    assert json.loads((tmp_path / "x.cube.json").read_text())["coefficients"] == ["alpha", "beta_MKT_RF", "beta_TLT"]
+    assert isinstance(cube.values.base, np.memmap) or isinstance(cube.values, np.memmap)
+
+    pd.testing.assert_frame_equal(cube.frame("macro", 52), tables[("macro", 52)], check_freq=False)
+    series = cube.series("us", 26, "beta_MKT_RF", start="2020-03-01", end="2020-03-31")
+    assert np.shares_memory(series, cube.values) and len(series) == 4
+    section = cube.cross_section("2021-06-30", "alpha")  # sleeves x windows on one date
+    assert section.shape == (2, 2) and section[0, 1] == tables[("us", 52)]["alpha"].loc[:"2021-06-30"].iloc[-1]
+
+
+def test_append_grows_in_place_and_sync_rewrites_restatements(tmp_path, monkeypatch):
+    monkeypatch.setattr(cube_mod, "GROW_ROWS", 4)
+    path = tmp_path / "x.cube"
+    full = _tables(90)
+    write_cube(path, {k: v.iloc[: len(v) - 10] for k, v in full.items()})
+    data = tmp_path / json.loads((tmp_path / "x.cube.json").read_text())["data"]
+    inode, before = data.stat().st_ino, data.read_bytes()[:1000]
+
+    assert sync_cube(path, {k: v.iloc[: len(v) - 7] for k, v in full.items()})["mode"] == "appended"
+    assert append_cube(path, full) == 7 and append_cube(path, full) == 0
+    assert data.stat().st_ino == inode and data.read_bytes()[:1000] == before
+    cube = MemmapCube.open(path)
+    assert len(cube) == 90 and cube.header["capacity"] >= 90
+    for key, df in full.items():
+        pd.testing.assert_frame_equal(cube.frame(*key), df, check_freq=False)
+
+    assert sync_cube(path, full)["mode"] == "unchanged"
+    restated = dict(full)
+    restated[("us", 26)] = full[("us", 26)] * 2
+    assert sync_cube(path, restated)["mode"] == "rewritten"
+    rewritten = MemmapCube.open(path)
+    np.testing.assert_allclose(rewritten.series("us", 26, "alpha"), restated[("us", 26)]["alpha"].to_numpy())
+    with pytest.raises(ValueError, match="axes changed"):
+        append_cube(path, {("other", 26): full[("us", 26)]})
+
+
+def test_rewrite_swaps_the_header_last(tmp_path, monkeypatch):
+    path = tmp_path / "x.cube"
+    tables = _tables(60)
+    old = write_cube(path, tables)
+    restated = {k: v * 2 for k, v in tables.items()}
+
+    # a crash before the header swap leaves the old cube readable as it was
+    def crash(*args):
+        raise OSError("crashed")
+
+    monkeypatch.setattr(cube_mod, "_write_header", crash)
+    with pytest.raises(OSError):
+        write_cube(path, restated)
+    np.testing.assert_array_equal(MemmapCube.open(path).values, old.values)
+    monkeypatch.undo()
+
+    new = write_cube(path, restated)
+    np.testing.assert_allclose(new.series("us", 26, "alpha"), restated[("us", 26)]["alpha"].to_numpy())
+    # the old mapping still reads the old rows; its file is gone and the crashed write was reused
+    np.testing.assert_allclose(old.series("us", 26, "alpha"), tables[("us", 26)]["alpha"].to_numpy())
+    assert sorted(f.name for f in tmp_path.iterdir()) == ["x.cube.2", "x.cube.json"]
+
+
+def test_stage_leaves_windows_below_min_nobs_empty(tmp_path, sources):
+    cfg = replace(get_config(), out_data=tmp_path, rolling_window_weeks=52, rolling_windows_weeks=(26, 52), min_nobs=45)
+    sleeves = get_sleeves(cfg)
+    inputs = build_sleeve_frames(cfg, sources(120), sleeves)
+    for s in sleeves:
+        inputs.update(rolling_exposures(cfg, inputs, s))
+    exposures_cube(cfg, inputs, sleeves)
+    cube = MemmapCube.open(tmp_path / "cube" / "exposures.cube")
+    assert cube.windows == [26, 52]
+    assert np.isnan(cube.values[:, :, 0]).all()  # 26 < min_nobs: never fitted
+    assert not np.isnan(cube.values[:, :, 1]).all()
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, replace
+
+import pandas as pd
+import pytest
+
+from analysis.src.artifacts import ArtifactStore
+from analysis.src.dag import Pipeline, Stage, StageError, load_state
+
+
+@dataclass(frozen=True)
+class _Cfg:
+    scale: float = 2.0
+    label: str = "a"
+
+
+def _source(cfg, inputs):
+    return {"raw": pd.DataFrame({"x": [1.0, 2.0, 3.0]}, index=pd.date_range("2020-01-03", periods=3, freq="W-FRI"))}
+
+
+def _scaled(cfg, inputs):
+    return {"scaled": inputs["raw"] * cfg.scale}
+
+
+def _summary(cfg, inputs):
+    return {"summary": {"label": cfg.label, "total": float(inputs["scaled"]["x"].sum())}}
+
+
+def _stages(tmp_path):
+    return [
+        Stage("summary", _summary, inputs=("scaled",), outputs={"summary": tmp_path / "summary.json"}, config_fields=("label",)),
+        Stage("scaled", _scaled, inputs=("raw",), outputs={"scaled": tmp_path / "scaled.parquet"}, config_fields=("scale",)),
+        Stage("source", _source, outputs={"raw": None}, always_run=True),
+    ]
+
+
+def _run(tmp_path, cfg, persist=True, **kwargs):
+    store = ArtifactStore(persist=persist)
+    try:
+        decisions = Pipeline(_stages(tmp_path)).execute(cfg, store, tmp_path / "state.json", log=lambda msg: None, **kwargs)
+    finally:
+        store.close()
+    return {d.stage: d for d in decisions}
+
+
+def test_pipeline_skips_unchanged_stages_and_explains_reruns(tmp_path):
+    first = _run(tmp_path, _Cfg())
+    assert list(first) == ["source", "scaled", "summary"]
+    assert all(d.run for d in first.values())
+
+    second = _run(tmp_path, _Cfg())
+    assert second["source"].run
+    assert not second["scaled"].run and not second["summary"].run
+
+    # Only the stage reading `label` re-runs; the plan reports it without executing.
+    planned = _run(tmp_path, _Cfg(label="b"), plan_only=True)
+    assert not planned["scaled"].run
+    assert planned["summary"].reason == "config changed: label"
+
+    third = _run(tmp_path, replace(_Cfg(), scale=3.0))
+    assert third["scaled"].reason == "config changed: scale"
+    assert third["summary"].reason == "input changed: scaled"
+
+    (tmp_path / "summary.json").unlink()
+    assert _run(tmp_path, replace(_Cfg(), scale=3.0))["summary"].reason == "output missing: summary"
+
+
+def test_unpersisted_run_leaves_state_untouched(tmp_path):
+    _run(tmp_path, _Cfg())
+    assert _run(tmp_path, replace(_Cfg(), scale=5.0), persist=False)["scaled"].run
+    # nothing was written, so the next persisted run must not take the files on disk for scale=5
+    rerun = _run(tmp_path, replace(_Cfg(), scale=5.0))
+    assert rerun["scaled"].reason == "config changed: scale"
+    assert pd.read_parquet(tmp_path / "scaled.parquet")["x"].tolist() == [5.0, 10.0, 15.0]
+
+
+def _side(cfg, inputs, out):
+    out.write_text(str(float(inputs["scaled"]["x"].sum())))
+    return {"side": {"path": str(out)}}
+
+
+def test_stage_reruns_when_a_file_it_writes_is_missing(tmp_path):
+    out = tmp_path / "side.txt"
+    stages = _stages(tmp_path) + [
+        Stage("side", _side, inputs=("scaled",), outputs={"side": tmp_path / "side.json"}, params={"out": out}, files=lambda cfg: [out])
+    ]
+
+    def run():
+        store = ArtifactStore()
+        try:
+            return {d.stage: d for d in Pipeline(stages).execute(_Cfg(), store, tmp_path / "state.json", log=lambda msg: None)}
+        finally:
+            store.close()
+
+    run()
+    assert not run()["side"].run
+    out.unlink()
+    assert run()["side"].reason == "output missing: side.txt"
+    assert out.exists()
+
+
+def test_pipeline_rejects_unknown_inputs(tmp_path):
+    with pytest.raises(ValueError, match="no stage produces"):
+        Pipeline([Stage("scaled", _scaled, inputs=("raw",), outputs={"scaled": tmp_path / "s.parquet"})])
+
+
+def _boom(cfg, inputs):
+    print("about to fail")
+    raise RuntimeError("boom")
+
+
+def test_parallel_run_matches_sequential_and_propagates_errors(tmp_path):
+    seq_dir, par_dir = tmp_path / "seq", tmp_path / "par"
+    seq_dir.mkdir()
+    par_dir.mkdir()
+    _run(seq_dir, _Cfg())
+    lines = []
+    store = ArtifactStore()
+    try:
+        decisions = Pipeline(_stages(par_dir)).execute(_Cfg(), store, par_dir / "state.json", jobs=2, log=lines.append)
+    finally:
+        store.close()
+    assert [d.stage for d in decisions] == ["source", "scaled", "summary"]
+    assert [line.split()[1] for line in lines] == ["source", "scaled", "summary"]
+    pd.testing.assert_frame_equal(pd.read_parquet(seq_dir / "scaled.parquet"), pd.read_parquet(par_dir / "scaled.parquet"))
+
+    stages = _stages(par_dir) + [Stage("boom", _boom, inputs=("raw",), outputs={"never": None})]
+    store = ArtifactStore()
+    try:
+        with pytest.raises(StageError, match="'boom' failed: boom"):
+            Pipeline(stages).execute(_Cfg(), store, par_dir / "state.json", force=True, jobs=2, log=lambda msg: None)
+    finally:
+        store.close()
+    assert "source" in load_state(par_dir / "state.json")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from analysis.src.build_frames import quality_report
+from analysis.src.data_quality import rolling_median_mad, scan_returns
+from analysis.src.schemas import QualityReportModel
+
+
+def _returns():
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2020-01-03", periods=200, freq="W-FRI", name="date")
+    r = pd.DataFrame(rng.normal(0.001, 0.02, (200, 4)), index=idx, columns=list("ABCD"))
+    r.iloc[:10, 0] = np.nan  # late listing: not a gap
+    r.iloc[40:43, 0] = np.nan  # 3-period gap
+    r.iloc[60:65, 1] = 0.0  # stale price
+    r.iloc[100, 2] = -0.5  # unadjusted 2:1 split
+    r.iloc[120, 2] = 1 / 1.5 - 1  # unadjusted 3:2 split, a smaller move than jump_ratio
+    r.iloc[150, 3], r.iloc[151, 3] = 1.5, 1 / 2.5 - 1  # bad print, undone next period
+    r.iloc[170, 3] = 0.9  # a real jump
+    return r
+
+
+def test_scan_flags_each_kind_once():
+    r = _returns()
+    factors = pd.DataFrame(0.0, index=r.index.drop(r.index[[30, 31]]), columns=["MKT_RF"])
+    out = scan_returns(r, {"us": factors}, sources={"A": "us"}, freq="W-FRI")
+
+    kinds = {(i["ticker"], i["kind"], i["date"]) for i in out["issues"] if i["kind"] != "outlier"}
+    d = lambda k: str(r.index[k].date())
+    assert kinds == {
+        ("A", "gap", d(40)),
+        ("B", "stale", d(60)),
+        ("C", "split", d(100)),
+        ("C", "split", d(120)),
+        ("D", "reversal", d(150)),
+        ("D", "jump", d(170)),
+    }
+    assert ("C", d(100)) in {(i["ticker"], i["date"]) for i in out["issues"] if i["kind"] == "outlier"}
+
+    checks = out["ticker_checks"]
+    assert checks["A"]["gap_rows"] == 3 and checks["A"]["longest_gap"] == 3 and checks["A"]["missing_pct"] == 6.5
+    assert checks["B"]["stale_rows"] == 5 and checks["B"]["longest_stale_run"] == 5
+    assert out["calendar"]["factors"]["us"]["missing_in_factors"] == 2
+    # A is checked against its own factor calendar; the others against every table
+    assert [checks[t]["unaligned_rows"] for t in "ABCD"] == [2, 2, 2, 2]
+
+    report = {**quality_report(r, {"model_frame": 150}), **out}
+    assert QualityReportModel(**report).summary["splits"] == 2
+    assert report["coverage"]["A"] == {"start": d(10), "end": d(199), "rows_non_missing": 187}
+
+
+def test_rolling_mad_is_exact():
+    r = _returns()
+    med, mad = rolling_median_mad(r.to_numpy(), 20, min_periods=10)
+    roll = r.rolling(20, min_periods=10)
+    np.testing.assert_array_equal(med, roll.median().to_numpy()[19:])
+    expected = roll.apply(lambda v: np.nanmedian(np.abs(v - np.nanmedian(v))), raw=True).to_numpy()[19:]
+    np.testing.assert_allclose(mad, expected, rtol=0, atol=1e-15)
@@ -0,0 +1,161 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.src.config import get_config
+from analysis.src.export_json import export_json_bundle
+from analysis.src.stages import site_meta
+from analysis.src.validation import EXPOSURE_COLUMNS, validate_frame
+
+
+def _exposures(n=6):
+    idx = pd.date_range("2020-01-03", periods=n, freq="W-FRI")
+    return pd.DataFrame(
+        {
+            "alpha": np.linspace(-0.01, 0.01, n),
+            "beta_MKT_RF": np.linspace(0.8, 1.2, n),
+            "r2": np.linspace(0.2, 0.9, n),
+            "nobs": np.full(n, 52, dtype="int64"),
+        },
+        index=idx,
+    )
+
+
+def _attribution(exp):
+    y = pd.Series(np.linspace(-0.02, 0.02, len(exp)), index=exp.index)
+    explained = y * 0.5
+    return pd.DataFrame(
+        {
+            "y": y,
+            "alpha_contrib": exp["alpha"],
+            "contrib_MKT_RF": explained,
+            "explained_return": explained,
+            "residual_return": y - explained,
+            "explained_share": [np.nan] + [0.5] * (len(exp) - 1),
+            "cum_explained_return": explained.cumsum(),
+            "cum_residual_return": (y - explained).cumsum(),
+        }
+    )
+
+
+def _regimes(exp):
+    return pd.DataFrame(
+        {"regime": ["calm", "stress"] * (len(exp) // 2), "vol": 0.1, "vol_thresh": 0.15}, index=exp.index
+    )
+
+
+def _bundle(tmp_path, layout, **kwargs):
+    exp = _exposures()
+    out = tmp_path / layout
+    export_json_bundle(
+        out_json_dir=out,
+        meta=site_meta(get_config()),
+        exposures_us_path=exp,
+        exposures_intl_path=exp,
+        attrib_us_path=_attribution(exp),
+        attrib_intl_path=_attribution(exp),
+        regimes_path=_regimes(exp),
+        regime_summary_path={"metadata": {}, "summary": {}, "stress_fraction": 0.5},
+        layout=layout,
+        **kwargs,
+    )
+    return out
+
+
+def test_columnar_layout_matches_rows(tmp_path):
+    rows_dir = _bundle(tmp_path, "rows")
+    col_dir = _bundle(tmp_path, "columnar")
+    for name in ("exposures_equity_us.json", "attribution_equity_us.json"):
+        rows = json.loads((rows_dir / name).read_text())
+        table = json.loads((col_dir / name).read_text())
+        rebuilt = [
+            {"date": d, **table.get("constants", {}), **{c: v[i] for c, v in table["columns"].items()}}
+            for i, d in enumerate(table["dates"])
+        ]
+        assert rebuilt == rows
+        assert (col_dir / name).stat().st_size < (rows_dir / name).stat().st_size
+
+    regimes = json.loads((col_dir / "regimes.json").read_text())
+    assert regimes["data"]["columns"]["regime"][:2] == ["calm", "stress"]
+    assert json.loads((col_dir / "manifest.json").read_text())["export_layout"] == "columnar"
+
+
+def test_export_decimals_rounds_floats(tmp_path):
+    table = json.loads((_bundle(tmp_path, "columnar", decimals=3) / "exposures_equity_us.json").read_text())
+    assert all(v == round(v, 3) for v in table["columns"]["alpha"])
+
+
+def test_validate_frame_rejects_bad_tables():
+    exp = _exposures()
+    validate_frame(exp, EXPOSURE_COLUMNS, "exp", prefixed=("beta_",))
+
+    with pytest.raises(ValueError, match="not sorted"):
+        validate_frame(exp.iloc[::-1], EXPOSURE_COLUMNS, "exp", prefixed=("beta_",))
+    with pytest.raises(ValueError, match="missing values"):
+        validate_frame(exp.assign(beta_MKT_RF=np.nan), EXPOSURE_COLUMNS, "exp", prefixed=("beta_",))
+    with pytest.raises(ValueError, match="above"):
+        validate_frame(exp.assign(r2=1.5), EXPOSURE_COLUMNS, "exp", prefixed=("beta_",))
+    with pytest.raises(ValueError, match="no beta_"):
+        validate_frame(exp.drop(columns="beta_MKT_RF"), EXPOSURE_COLUMNS, "exp", prefixed=("beta_",))
+
+
+def test_arrow_bundle_mirrors_json(tmp_path):
+    import pyarrow as pa
+
+    out = _bundle(tmp_path, "rows")
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert manifest["binary"]["format"] == "arrow-ipc"
+    for name, filename in manifest["binary"]["files"].items():
+        table = pa.ipc.open_file(pa.memory_map(str(out / filename))).read_all()
+        payload = json.loads((out / f"{name}.json").read_text())
+        rows = payload["data"] if name == "regimes" else payload
+        constants = json.loads(table.schema.metadata[b"constants"]) if table.schema.metadata else {}
+        arrow_rows = [{**r, **constants, "date": r["date"].isoformat()} for r in table.to_pylist()]
+        assert arrow_rows == rows
+
+    assert not any(p.suffix == ".arrow" for p in _bundle(tmp_path / "off", "rows", arrow=False).iterdir())
+
+
+def test_unchanged_export_writes_nothing(tmp_path):
+    out = _bundle(tmp_path, "rows")
+    manifest = json.loads((out / "manifest.json").read_text())
+    entry = manifest["files"]["exposures_equity_us.json"]
+    assert entry["rows"] == 6 and entry["bytes"] == (out / entry["file"]).stat().st_size
+
+    before = {p.name: p.stat().st_mtime_ns for p in out.iterdir()}
+    _bundle(tmp_path, "rows")
+    assert {p.name: p.stat().st_mtime_ns for p in out.iterdir()} == before
+
+    _bundle(tmp_path, "rows", hashed_names=True)
+    hashed = json.loads((out / "manifest.json").read_text())["files"]["exposures_equity_us.json"]
+    assert hashed["file"] == f"exposures_equity_us.{entry['sha256'][:12]}.json"
+    assert (out / hashed["file"]).exists() and not (out / "exposures_equity_us.json").exists()
+
+
+def test_export_removes_files_it_no_longer_writes(tmp_path):
+    out = _bundle(tmp_path, "rows", shard_by="year")
+    assert any(p.suffix == ".arrow" for p in out.iterdir()) and (out / "shards" / "regimes" / "index.json").exists()
+    _bundle(tmp_path, "rows", arrow=False)
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert sorted(p.name for p in out.iterdir()) == sorted([*(e["file"] for e in manifest["files"].values()), "manifest.json", "shards"])
+    assert not any((out / "shards").iterdir())
+
+
+def test_aligned_bundle_shares_one_date_axis(tmp_path):
+    from analysis.src.align import align_on_dates
+
+    exp = _exposures(8)
+    dates, parts, dropped = align_on_dates({"a": exp.iloc[1:], "b": exp.iloc[:-2], "c": exp.iloc[::2]})
+    assert list(dates) == list(exp.index[[2, 4]])
+    assert all(df.index.equals(dates) for df in parts.values())
+    assert dropped == {"a": 5, "b": 4, "c": 2}
+
+    out = _bundle(tmp_path, "rows")
+    bundle = json.loads((out / "aligned_equity_us.json").read_text())
+    n = len(bundle["dates"])
+    assert n == bundle["rows"] and all(
+        len(v) == n for part in ("exposures", "attribution", "regimes") for v in bundle[part]["columns"].values()
+    )
+    assert json.loads((out / "manifest.json").read_text())["aligned"]["equity_us"]["dropped"] == bundle["dropped"]
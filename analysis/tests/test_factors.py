@@ -0,0 +1,66 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.data_factors import fetch_factor_set
+from analysis.src.ken_french import parse_csv_text
+
+FF5_CSV = """This file was created using the 202401 CRSP database.
+The 1-month TBill rate data until 202405 are from Ibbotson Associates.
+
+,Mkt-RF,SMB,HML,RMW,CMA,RF
+20240102,   -0.71,  -0.35,   0.82,  0.10,  0.25,  0.021
+20240103,   -0.94,   0.12,   0.43, -0.20, -0.05,  0.021
+20240104,   -0.28, -99.99,   0.21,  0.30,  0.11,  0.021
+20240105,    0.12,   0.05,  -0.14,  0.02,  0.01,  0.021
+20240108,    1.45,  -0.40,  -0.60,  0.08, -0.22,  0.021
+
+ Annual Factors: January-December
+,Mkt-RF,SMB,HML,RMW,CMA,RF
+2024,   10.00,   1.00,   2.00,  3.00,  4.00,  5.00
+
+Copyright 2024 Eugene F. Fama and Kenneth R. French
+"""
+
+MOM_CSV = """Missing data are indicated by -99.99.
+
+,Mom   
+20240102,    0.50
+20240103,   -0.25
+20240104,    0.10
+20240105,    0.00
+20240108,    0.30
+"""
+
+
+def _write_zip(path, name, text):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(f"{name}.csv", text)
+
+
+def test_parse_csv_text_splits_tables_and_missing():
+    tables = parse_csv_text(FF5_CSV)
+    assert len(tables) == 2
+    assert tables[1].title == "Annual Factors: January-December"
+    main = tables[0].to_frame()
+    assert list(main.columns) == ["Mkt-RF", "SMB", "HML", "RMW", "CMA", "RF"]
+    assert main.index[0] == pd.Timestamp("2024-01-02")
+    assert np.isnan(main.loc["2024-01-04", "SMB"])
+    assert tables[1].to_frame().index[0] == pd.Timestamp("2024-01-01")
+
+
+def test_fetch_factor_set_ff5_mom_from_cached_archives(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    _write_zip(raw / "F-F_Research_Data_5_Factors_2x3_daily_CSV.zip", "ff5", FF5_CSV)
+    _write_zip(raw / "F-F_Momentum_Factor_daily_CSV.zip", "mom", MOM_CSV)
+
+    out = fetch_factor_set("us", "FF5_MOM", start="2024-01-01", end=None, cache_dir=tmp_path, freq="W-FRI")
+    df = pd.read_parquet(out)
+
+    assert list(df.columns) == ["MKT_RF", "SMB", "HML", "RMW", "CMA", "MOM", "RF"]
+    first_week = (1 - 0.0071) * (1 - 0.0094) * (1 - 0.0028) * (1 + 0.0012) - 1
+    assert abs(df.loc["2024-01-05", "MKT_RF"] - first_week) < 1e-12
+    # parsed tables are cached next to the archive
+    assert (raw / "F-F_Momentum_Factor_daily" / "tables.json").exists()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from analysis.src.build_frames import FrameBuilder, build_frames
+from analysis.src.config import Sleeve
+
+
+def _inputs(tmp_path):
+    idx = pd.date_range("2019-01-04", periods=120, freq="W-FRI")
+    rng = np.random.default_rng(11)
+    rets = pd.DataFrame(rng.normal(0, 0.02, (len(idx), 4)), index=idx, columns=["AAA", "BBB", "CCC", "DDD"])
+    rets.to_parquet(tmp_path / "returns.parquet")
+    ff = pd.DataFrame(rng.normal(0, 0.01, (len(idx), 4)), index=idx, columns=["MKT_RF", "SMB", "HML", "RF"])
+    ff.to_parquet(tmp_path / "ff.parquet")
+    return rets, ff
+
+
+def test_frames_built_only_for_requested_sleeves(tmp_path):
+    rets, ff = _inputs(tmp_path)
+    weights = {t: 0.25 for t in rets.columns}
+    sleeves = [
+        Sleeve("core", ("AAA", "BBB"), target="excess", factors="us"),
+        Sleeve("macro", ("AAA", "BBB", "CCC"), target="total", factors="proxies", proxies=("CCC", "DDD")),
+    ]
+
+    out = build_frames(
+        returns_path=tmp_path / "returns.parquet",
+        factor_paths={"us": tmp_path / "ff.parquet"},
+        out_dir=tmp_path / "data" / "frames",
+        weights=weights,
+        sleeves=sleeves[:1],
+    )
+    assert set(out) == {"frame_core", "quality_report"}
+    assert not (tmp_path / "data" / "frames" / "frame_macro.parquet").exists()
+
+    core = pd.read_parquet(out["frame_core"])
+    assert list(core.columns) == ["Y", "MKT_RF", "SMB", "HML"]
+    expected_y = rets[["AAA", "BBB"]].mean(axis=1) - ff["RF"]
+    assert np.allclose(core["Y"], expected_y.loc[core.index])
+
+    builder = FrameBuilder(rets, {"us": ff}, weights, sleeves)
+    macro = builder.frame("macro")
+    assert list(macro.columns) == ["Y", "CCC", "DDD"]
+    # shared portfolio returns are memoized
+    assert builder.portfolio(("AAA", "BBB")) is builder.portfolio(("AAA", "BBB"))
+    assert builder.frame("macro") is macro
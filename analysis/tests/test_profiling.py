@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from analysis.src import profiling
+
+
+def test_span_is_noop_when_disabled():
+    profiling.enable(False)
+    with profiling.span("x") as sp:
+        sp.set(rows_out=1)
+    assert profiling.collect() == []
+
+
+def test_span_records_trace_and_summary(tmp_path):
+    profiling.enable(True)
+    try:
+        with profiling.span("stage_a", cat="stage", rows_in=3) as sp:
+            with profiling.span("step_b"):
+                held = np.ones(8 * 2**20)  # 64 MB still resident when the span closes
+            sp.set(rows_out=profiling.rows(pd.DataFrame({"x": [1, 2]})))
+    finally:
+        profiling.enable(False)
+    events = profiling.collect()
+    assert [e["name"] for e in events] == ["step_b", "stage_a"]
+
+    summary = profiling.summarize(events)
+    assert summary[0]["name"] == "stage_a" and summary[0]["kind"] == "stage"
+    assert summary[0]["rows_in"] == 3 and summary[0]["rows_out"] == 2
+    assert summary[0]["wall_s"] >= summary[1]["wall_s"] >= 0
+    assert {"process_read_bytes", "process_write_bytes"} <= summary[0].keys()
+    if summary[1]["rss_delta_mb"] is not None:  # /proc is Linux-only
+        assert summary[1]["rss_delta_mb"] > 50 and summary[1]["process_peak_rss_mb"] >= summary[1]["rss_delta_mb"]
+    del held
+
+    trace = json.loads(profiling.write_trace(events, tmp_path / "trace.json").read_text())
+    assert {e["ph"] for e in trace["traceEvents"]} == {"X"}
+    assert min(e["ts"] for e in trace["traceEvents"]) == 0
+    assert "stage_a" in profiling.format_table(summary)
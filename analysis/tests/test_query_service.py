@@ -0,0 +1,86 @@
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.artifacts import write_generation
+from analysis.src.query_service import QueryService, make_server
+
+
+def _write_outputs(out, n):
+    idx = pd.date_range("2022-01-07", periods=n, freq="W-FRI")
+    for folder, name, cols in (
+        ("exposures", "exposures_x", ["beta_MKT_RF", "r2"]),
+        ("attribution", "attrib_x", ["ret_MKT_RF", "alpha"]),
+    ):
+        (out / folder).mkdir(parents=True, exist_ok=True)
+        df = pd.DataFrame({c: np.arange(n, dtype=float) + k for k, c in enumerate(cols)}, index=idx)
+        df.to_parquet(out / folder / f"{name}.parquet")
+    (out / "regimes").mkdir(exist_ok=True)
+    regimes = pd.DataFrame({"regime": np.where(np.arange(n) % 2, "stress", "calm")}, index=idx)
+    regimes.iloc[1:].to_parquet(out / "regimes" / "regimes.parquet")  # one date fewer, so sleeves are aligned
+
+
+def _get(port, path, headers=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", headers=headers or {})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, dict(resp.headers), resp.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, dict(exc.headers), exc.read()
+
+
+def test_query_service_slices_caches_and_reloads(tmp_path):
+    _write_outputs(tmp_path, 60)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"build_timestamp": "a"}))
+    service = QueryService(tmp_path, manifest, log=lambda msg: None)
+    server = make_server(service, port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status, _, body = _get(port, "/tables/exposures/x?start=2022-02-01&end=2022-03-04&columns=r2")
+        payload = json.loads(body)
+        assert status == 200
+        assert payload["dates"] == ["2022-02-04", "2022-02-11", "2022-02-18", "2022-02-25", "2022-03-04"]
+        assert list(payload["columns"]) == ["r2"] and payload["columns"]["r2"] == [5.0, 6.0, 7.0, 8.0, 9.0]
+
+        status, headers, body = _get(port, "/sleeves/x?last=2")
+        sleeve = json.loads(body)
+        assert sleeve["rows"] == 2 and sleeve["dates"][-1] == "2023-02-24"
+        assert sleeve["regimes"]["columns"]["regime"] == ["calm", "stress"]
+
+        status, headers, _ = _get(port, "/sleeves/x?last=2", {"If-None-Match": headers["ETag"]})
+        assert status == 304
+
+        status, headers, body = _get(port, "/tables/attribution/x", {"Accept-Encoding": "gzip"})
+        assert headers.get("Content-Encoding") == "gzip"
+        assert json.loads(gzip.decompress(body))["rows"] == 60
+
+        assert _get(port, "/tables/exposures/x?columns=nope")[0] == 400
+        assert _get(port, "/tables/exposures/x?start=bad")[0] == 400
+        assert _get(port, "/tables/missing")[0] == 404
+
+        old = service.snapshot.version
+        _write_outputs(tmp_path, 61)
+        manifest.write_text(json.dumps({"build_timestamp": "b"}))
+        assert not service.reload_if_changed()  # outputs written, run not finished yet
+        write_generation(tmp_path, ["export"])
+        assert service.reload_if_changed()
+        assert service.snapshot.version != old
+        assert json.loads(_get(port, "/manifest")[2]) == {"build_timestamp": "b"}
+        assert json.loads(_get(port, "/tables/exposures/x?last=1")[2])["dates"] == ["2023-03-03"]
+        assert not service.reload_if_changed()
+
+        # a run that doesn't export still reloads
+        _write_outputs(tmp_path, 62)
+        write_generation(tmp_path, ["exposures:x"])
+        assert service.reload_if_changed()
+        assert json.loads(_get(port, "/tables/exposures/x?last=1")[2])["dates"] == ["2023-03-10"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -16,3 +16,19 @@ def test_regime_labels_and_fraction():
     summary = json.loads(summary_path.read_text())
     stress_fraction = summary["stress_fraction"]
     assert 0.15 <= stress_fraction <= 0.35
+
+
+def test_regime_labels_are_categorical():
+    import numpy as np
+
+    from analysis.src.regimes import compute_regimes
+
+    idx = pd.bdate_range("2018-01-01", periods=800)
+    rng = np.random.default_rng(3)
+    scale = np.where((np.arange(len(idx)) // 100) % 3 == 2, 0.03, 0.01)
+    rets = pd.Series(rng.normal(0, 1, len(idx)) * scale, index=idx)
+
+    regimes = compute_regimes(rets, vol_window_weeks=21, lookback_weeks=252, percentile=0.75)
+    assert isinstance(regimes["regime"].dtype, pd.CategoricalDtype)
+    assert list(regimes["regime"].cat.categories) == ["calm", "stress"]
+    assert (regimes["regime"].astype(str) == regimes["is_stress"].map({0: "calm", 1: "stress"})).all()
@@ -1,8 +1,10 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from analysis.src.config import get_config
+from analysis.src.rolling_model import extend_rolling_ols, run_rolling_ols
 
 ROOT = Path(__file__).resolve().parents[2]
 
@@ -38,3 +40,15 @@ def test_no_lookahead_and_stderr_present():
     assert exposures.index.max() == frame.index.max()
     assert "stderr_alpha" in exposures.columns
     assert any(c.startswith("stderr_beta_") for c in exposures.columns)
+
+
+def test_extend_rolling_ols_matches_full_fit():
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2020-01-03", periods=90, freq="W-FRI")
+    x = pd.DataFrame(rng.normal(size=(90, 2)), index=idx, columns=["A", "B"])
+    frame = x.assign(Y=0.5 * x["A"] - 0.2 * x["B"] + rng.normal(scale=0.1, size=90))
+
+    full = run_rolling_ols(frame, y_col="Y", x_cols=["A", "B"], window=20, min_nobs=15)
+    head = run_rolling_ols(frame.iloc[:70], y_col="Y", x_cols=["A", "B"], window=20, min_nobs=15)
+    extended = extend_rolling_ols(frame, head, y_col="Y", x_cols=["A", "B"], window=20, min_nobs=15)
+    pd.testing.assert_frame_equal(extended, full)
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from analysis.src.shards import split_shards, write_shards
+
+
+def _encode(part):
+    return json.dumps({"dates": part.index.strftime("%Y-%m-%d").tolist(), "x": part["x"].tolist()}).encode()
+
+
+def _frame(n):
+    idx = pd.date_range("2021-01-01", periods=n, freq="W-FRI")
+    return pd.DataFrame({"x": np.arange(n, dtype=float)}, index=idx)
+
+
+def test_weekly_append_only_rewrites_open_shard(tmp_path):
+    full = _frame(120)
+    first = write_shards(tmp_path, "t", full.iloc[:-1], "year", _encode)
+    mtimes = {p.name: p.stat().st_mtime_ns for p in tmp_path.glob("*.json")}
+
+    again = write_shards(tmp_path, "t", full.iloc[:-1], "year", _encode)
+    assert again["written"] == []
+
+    second = write_shards(tmp_path, "t", full, "year", _encode)
+    assert second["written"] == [second["shards"][0]["file"], "index.json"]
+    assert not second["shards"][0]["closed"] and all(s["closed"] for s in second["shards"][1:])
+    for s in second["shards"][1:]:
+        assert (tmp_path / s["file"]).stat().st_mtime_ns == mtimes[s["file"]]
+
+    # recent first, contiguous, complete
+    assert [s["start"] for s in second["shards"]] == sorted((s["start"] for s in second["shards"]), reverse=True)
+    assert sum(s["rows"] for s in second["shards"]) == len(full) == second["rows"]
+    assert json.loads((tmp_path / "index.json").read_text())["shards"] == second["shards"]
+    assert len(first["shards"]) == len(second["shards"])
+
+
+def test_restated_closed_shard_gets_new_file(tmp_path):
+    df = _frame(120)
+    before = write_shards(tmp_path, "t", df, "year", _encode)
+    restated = df.copy()
+    restated.iloc[0, 0] = -1.0
+    after = write_shards(tmp_path, "t", restated, "year", _encode)
+    assert before["shards"][-1]["file"] != after["shards"][-1]["file"]
+    assert not (tmp_path / before["shards"][-1]["file"]).exists()
+
+
+def test_row_shards_keep_boundaries_when_appending():
+    a = [(k, len(p), closed) for k, p, closed in split_shards(_frame(25), 10)]
+    b = [(k, len(p), closed) for k, p, closed in split_shards(_frame(31), 10)]
+    assert a == [("00000", 10, True), ("00001", 10, True), ("00002", 5, False)]
+    assert b[:2] == a[:2] and b[2] == ("00002", 10, True) and b[3] == ("00003", 1, False)
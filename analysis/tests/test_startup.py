@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "statsmodels", "yfinance", "pydantic")
+
+
+def test_dry_run_does_not_import_heavy_dependencies():
+    code = (
+        "import runpy, sys\n"
+        "sys.argv = ['run_pipeline', '--dry-run']\n"
+        "runpy.run_module('analysis.run_pipeline', run_name='__main__')\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_stage_graph_builds_without_stage_dependencies():
+    code = (
+        "import sys\n"
+        "from analysis.src.config import get_config, get_sleeves\n"
+        "from analysis.src.stages import build_stages\n"
+        "cfg = get_config()\n"
+        "build_stages(cfg, get_sleeves(cfg))\n"
+        "print(sorted(m for m in ('statsmodels', 'yfinance', 'pydantic') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == "[]"
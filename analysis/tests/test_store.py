@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from analysis.src.store import read_panel, write_panel
+
+
+def _panel() -> pd.DataFrame:
+    idx = pd.date_range("2018-01-05", periods=200, freq="W-FRI", name="Date")
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(0, 0.02, (len(idx), 4)), index=idx, columns=["SPY", "QQQ", "TLT", "GLD"])
+    df.iloc[3, 2] = np.nan
+    return df
+
+
+def test_store_roundtrip_matches_panel(tmp_path):
+    panel = _panel()
+    root = write_panel(panel, tmp_path / "returns")
+
+    assert any(p.name.startswith("year=") for p in root.iterdir())
+    back = read_panel(root)
+    pd.testing.assert_frame_equal(back, panel, check_freq=False, check_index_type=False)
+
+
+def test_store_ticker_and_date_filters(tmp_path):
+    panel = _panel()
+    root = write_panel(panel, tmp_path / "returns")
+
+    sub = read_panel(root, tickers=["TLT", "SPY", "XYZ"], start="2019-03-01", end="2020-06-30")
+    expected = panel.loc["2019-03-01":"2020-06-30", ["TLT", "SPY"]]
+    pd.testing.assert_frame_equal(sub, expected, check_freq=False, check_index_type=False)
+
+    # Single-file parquet goes through the same API.
+    panel.to_parquet(tmp_path / "returns.parquet")
+    flat = read_panel(tmp_path / "returns.parquet", tickers=["TLT", "SPY", "XYZ"], start="2019-03-01", end="2020-06-30")
+    pd.testing.assert_frame_equal(flat, expected, check_freq=False, check_index_type=False)
+
+
+def test_store_keeps_all_nan_dates_and_current_tickers(tmp_path):
+    panel = _panel()
+    panel.iloc[0] = np.nan  # e.g. the first pct_change row
+    root = write_panel(panel, tmp_path / "returns")
+    pd.testing.assert_frame_equal(read_panel(root), panel, check_freq=False, check_index_type=False)
+    sub = read_panel(root, tickers=["SPY"], end="2018-02-01")
+    assert sub.index[0] == panel.index[0] and sub["SPY"].isna().iloc[0]
+
+    # a rewrite without TLT/GLD no longer returns them by default
+    write_panel(panel[["SPY", "QQQ"]], root)
+    assert list(read_panel(root).columns) == ["SPY", "QQQ"]
@@ -0,0 +1,59 @@
+import json
+from dataclasses import replace
+
+import pytest
+
+from analysis.src import sweep
+from analysis.src.config import get_config, get_sleeves
+from analysis.src.sweep import expand_grid, run_sweep, run_variant, validate_overrides, variant_config, variant_name
+
+
+def test_expand_grid_and_variant_names(tmp_path):
+    variants = expand_grid({"rolling_window_weeks": [26, 52], "vol_percentile": [0.7, 0.8]})
+    assert len(variants) == 4
+    assert variants[0] == {"rolling_window_weeks": 26, "vol_percentile": 0.7}
+    names = [variant_name(v) for v in variants]
+    assert len(set(names)) == 4
+    assert names[0] == "rolling_window_weeks-26__vol_percentile-0.7"
+    assert variant_name({}) == "base"
+
+    cfg = variant_config(get_config(), variants[0], tmp_path / names[0])
+    assert cfg.rolling_window_weeks == 26
+    assert cfg.out_data == tmp_path / names[0] / "data"
+    assert cfg.site_public_data == tmp_path / names[0] / "json"
+
+
+def test_sweep_rejects_data_fields():
+    with pytest.raises(ValueError, match="share one data load"):
+        validate_overrides({"freq": "B"})
+    with pytest.raises(ValueError, match="Unknown Config fields"):
+        validate_overrides({"windows": 3})
+
+
+def test_run_sweep_indexes_variants_and_skips_unchanged_ones(tmp_path, monkeypatch, sources):
+    data = sources(160)
+    monkeypatch.setattr(sweep, "load_returns", lambda cfg, inputs: {"returns": data["returns"]})
+    monkeypatch.setattr(sweep, "load_factors", lambda cfg, inputs, regions: {f"factors_{r}": data[f"factors_{r}"] for r in regions})
+    base = replace(get_config(), out_data=tmp_path / "base")
+    sleeves = get_sleeves(base, ["equity_us", "equity_intl"])
+    variants = expand_grid({"rolling_window_weeks": [40, 52], "min_nobs": [36]})
+
+    index = json.loads(run_sweep(base, sleeves, variants, tmp_path / "sweep").read_text())
+    first, second = index["variants"]
+    assert [v["status"] for v in index["variants"]] == ["ok", "ok"]
+    assert first["overrides"] == {"rolling_window_weeks": 40, "min_nobs": 36} and "export" in first["stages_run"]
+    # a shorter window leaves more fitted windows
+    assert first["metrics"]["equity_us.windows"] - second["metrics"]["equity_us.windows"] == 12
+    assert (tmp_path / "sweep" / variant_name(variants[0]) / "json" / "manifest.json").exists()
+    assert not (tmp_path / "base").exists()
+
+    rerun = json.loads(run_sweep(base, sleeves, variants, tmp_path / "sweep", jobs=2).read_text())
+    assert [v["stages_run"] for v in rerun["variants"]] == [[], []]
+    assert [v["metrics"] for v in rerun["variants"]] == [first["metrics"], second["metrics"]]
+
+
+def test_run_variant_reports_failures(tmp_path):
+    # without the shared data nothing produces the source artifacts
+    cfg = variant_config(get_config(), {}, tmp_path)
+    result = run_variant("base", cfg, get_sleeves(cfg))
+    assert result["status"] == "failed" and "no stage produces" in result["error"]
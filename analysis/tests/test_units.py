@@ -1,10 +1,25 @@
 import pandas as pd
 from pathlib import Path
 
+from analysis.src.data_factors import factor_filename
+
 ROOT = Path(__file__).resolve().parents[2]
 
 def test_factor_units_decimals():
     factors_dir = ROOT / "analysis" / "outputs" / "data" / "factors"
-    us = pd.read_parquet(factors_dir / "F-F_Research_Data_Factors_weekly.parquet")
+    us = pd.read_parquet(factors_dir / factor_filename("us", "FF3", "W-FRI"))
     med = us["MKT_RF"].abs().median()
-    assert med < 0.2, f"Units too large (median abs={med}). Expected decimals, not percent."
\ No newline at end of file
+    assert med < 0.2, f"Units too large (median abs={med}). Expected decimals, not percent."
+
+def test_daily_factors_compound_without_zero_fill():
+    from analysis.src.data_factors import _compound_to_freq
+
+    idx = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-05", "2024-01-08"])
+    daily = pd.DataFrame({"MKT_RF": [0.01, -0.02, 0.005, 0.01]}, index=idx)
+
+    weekly = _compound_to_freq(daily, freq="W-FRI").dropna(how="all")
+    assert abs(weekly.iloc[0, 0] - ((1.01 * 0.98 * 1.005) - 1)) < 1e-12
+
+    # 2024-01-04 has no observation: it must not turn into a 0.0 return
+    business = _compound_to_freq(daily, freq="B").dropna(how="all")
+    assert list(business.index) == list(idx)
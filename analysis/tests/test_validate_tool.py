@@ -0,0 +1,61 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+_spec = importlib.util.spec_from_file_location("validate_and_manifest", ROOT / "tools" / "validate_and_manifest.py")
+vm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(vm)
+
+ROWS = [
+    {"date": "2020-01-03", "alpha": 0.1, "beta_MKT_RF": 1.0, "note": "a}b"},
+    {"date": "2020-01-10", "alpha": None, "beta_MKT_RF": 1.1, "note": "c"},
+    {"date": "2020-01-17", "alpha": -2e-5, "beta_MKT_RF": 0.9, "note": "\"d\""},
+]
+
+
+@pytest.mark.parametrize("chunk_bytes", [7, 64, 1 << 20])
+def test_streaming_scan_matches_full_parse(tmp_path, chunk_bytes):
+    rows_path = tmp_path / "rows.json"
+    rows_path.write_text(json.dumps(ROWS, indent=2))
+    columnar_path = tmp_path / "columnar.json"
+    columnar_path.write_text(
+        json.dumps(
+            {
+                "metadata": {"x": [1, {"y": "]"}]},
+                "data": {
+                    "dates": [r["date"] for r in ROWS],
+                    "columns": {"alpha": [1.5, None, -3e-7], "regime": ["calm", "stress", "calm"]},
+                },
+            }
+        )
+    )
+    for path, layout in ((rows_path, "rows"), (columnar_path, "columnar")):
+        result = vm.validate_dataset(path, "t", chunk_bytes=chunk_bytes)
+        assert (result["layout"], result["n"], result["start"], result["end"]) == (layout, 3, "2020-01-03", "2020-01-17")
+
+
+def test_streaming_scan_keeps_error_messages(tmp_path):
+    path = tmp_path / "bad.json"
+
+    path.write_text(json.dumps([ROWS[1], ROWS[0], ROWS[2]]))
+    with pytest.raises(ValueError, match=r"t: dates sorted=False, unique=True"):
+        vm.validate_dataset(path, "t", chunk_bytes=16)
+
+    path.write_text(json.dumps([ROWS[0], ROWS[0]]))
+    with pytest.raises(ValueError, match=r"t: dates sorted=True, unique=False"):
+        vm.validate_dataset(path, "t")
+
+    path.write_text(json.dumps([ROWS[0], {"alpha": 1.0}]))
+    with pytest.raises(ValueError, match=r"t: row 1 missing 'date'"):
+        vm.validate_dataset(path, "t")
+
+    path.write_text(json.dumps([ROWS[0], {**ROWS[1], "extra": 1}]))
+    with pytest.raises(ValueError, match=r"t: key mismatch at row 1 date=2020-01-10"):
+        vm.validate_dataset(path, "t")
+
+    path.write_text(json.dumps({"dates": ["2020-01-03"], "columns": {"a": [1, 2]}}))
+    with pytest.raises(ValueError, match=r"t: aligned lengths mismatch"):
+        vm.validate_dataset(path, "t")
@@ -0,0 +1,133 @@
+import json
+from dataclasses import replace
+
+import numpy as np
+
+from analysis.src import watch
+from analysis.src.artifacts import ArtifactStore
+from analysis.src.config import get_config, get_sleeves
+from analysis.src.dag import Pipeline
+from analysis.src.stages import build_stages, source_artifacts
+
+
+def _cfg(out):
+    return replace(
+        get_config(),
+        comovement=True,
+        exposures_cube=True,
+        out_data=out / "data",
+        out_json=out / "json",
+        out_reports=out / "reports",
+        site_public_data=out / "json",
+    )
+
+
+def _feed(monkeypatch, data):
+    """Point the watcher's loaders at `data` (mutated by the test) instead of the provider caches."""
+    monkeypatch.setattr(watch, "load_returns", lambda cfg, inputs: {"returns": data["returns"]})
+    monkeypatch.setattr(watch, "load_factors", lambda cfg, inputs, regions: {f"factors_{r}": data[f"factors_{r}"] for r in regions})
+
+
+def _pipeline_bundle(out, data):
+    cfg = _cfg(out)
+    sleeves = get_sleeves(cfg)
+    store = ArtifactStore()
+    try:
+        for key in source_artifacts(sleeves):
+            store.put(key, data[key])
+        Pipeline(build_stages(cfg, sleeves, include_sources=False), external=source_artifacts(sleeves)).execute(
+            cfg, store, cfg.out_data / "pipeline_state.json", log=lambda msg: None
+        )
+    finally:
+        store.close()
+    return cfg.site_public_data
+
+
+def _assert_same_bundle(a, b):
+    files = json.loads((a / "manifest.json").read_text())["files"]
+    assert files.keys() == json.loads((b / "manifest.json").read_text())["files"].keys()
+    for name, entry in files.items():
+        if name.endswith(".json"):
+            _assert_close(json.loads((a / entry["file"]).read_text()), json.loads((b / entry["file"]).read_text()), name)
+
+
+def _assert_close(x, y, where):
+    if isinstance(x, dict):
+        assert x.keys() == y.keys(), where
+        for k in x:
+            _assert_close(x[k], y[k], f"{where}.{k}")
+    elif isinstance(x, list):
+        assert len(x) == len(y), where
+        for i, (u, v) in enumerate(zip(x, y)):
+            _assert_close(u, v, f"{where}[{i}]")
+    elif isinstance(x, float) and isinstance(y, float):
+        np.testing.assert_allclose(x, y, rtol=1e-9, atol=1e-12, err_msg=where)
+    else:
+        assert x == y, where
+
+
+def test_update_extends_new_bars_and_matches_the_pipeline(tmp_path, monkeypatch, sources):
+    full = sources(190)
+    data = {k: v.iloc[:180] for k, v in full.items()}
+    _feed(monkeypatch, data)
+    cfg = _cfg(tmp_path / "watch")
+    watcher = watch.Watcher(cfg, get_sleeves(cfg), ArtifactStore())
+    try:
+        assert watcher.update()
+        assert set(watcher.status["exposure_updates"].values()) == {"full"}
+        assert not watcher.update()  # same content: nothing recomputed
+        _assert_same_bundle(cfg.site_public_data, _pipeline_bundle(tmp_path / "first", data))
+
+        data.update(full)
+        assert watcher.update()
+        assert set(watcher.status["exposure_updates"].values()) == {"incremental"}
+        assert watcher.status["last_bar"] == str(full["returns"].index[-1].date())
+        assert (cfg.site_public_data / "comovement.json").exists()
+        # stages outside the exposures/attribution path run too
+        assert watcher.store.get("asset_exposures").index[-1] == full["returns"].index[-1]
+        assert (cfg.out_reports / "exposures_cube.json").exists()
+        assert "ticker_checks" in json.loads((cfg.site_public_data / "quality_report.json").read_text())
+        _assert_same_bundle(cfg.site_public_data, _pipeline_bundle(tmp_path / "second", full))
+
+        # a restated early bar can't be extended: every sleeve is refitted
+        restated = full["returns"].copy()
+        restated.iloc[5] *= 1.5
+        data["returns"] = restated
+        assert watcher.update()
+        assert set(watcher.status["exposure_updates"].values()) == {"full"}
+    finally:
+        watcher.store.close()
+
+
+class _Polls:
+    """Stands in for the stop event: each wait runs the next scripted step; stops when the script runs out."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+
+    def is_set(self):
+        return not self.steps
+
+    def wait(self, timeout):
+        self.steps.pop(0)()
+
+
+def test_run_reloads_once_the_cache_signature_settles(tmp_path, monkeypatch, sources):
+    full = sources(190)
+    data = {k: v.iloc[:180] for k, v in full.items()}
+    _feed(monkeypatch, data)
+    cfg = _cfg(tmp_path)
+    watcher = watch.Watcher(cfg, get_sleeves(cfg), ArtifactStore())
+    cache = cfg.out_data / "returns_weekly.parquet"
+    cache.parent.mkdir(parents=True, exist_ok=True)
+
+    def fetch():
+        data.update(full)
+        cache.write_bytes(b"new bars")
+
+    lines = []
+    watcher.run(_Polls(lambda: None, fetch, lambda: None, lambda: None), poll_seconds=0, log=lines.append)
+    # the first poll loads; the changed signature is only acted on once it is stable across two polls
+    assert len(lines) == 2 and watcher.status["updates"] == 2
+    assert set(watcher.status["exposure_updates"].values()) == {"incremental"}
+    assert json.loads(watcher.status_path.read_text())["state"] == "stopped"
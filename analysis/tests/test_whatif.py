@@ -0,0 +1,35 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from analysis.bench.synthetic import make_market
+from analysis.src.config import get_config
+from analysis.src.whatif import WhatIf, max_deviation, move_weight, reference_run
+
+
+def test_whatif_matches_a_full_rerun():
+    m = make_market(8, 260, freq="W-FRI", seed=11)
+    returns = m.returns.copy()
+    returns.iloc[:10, 1] = np.nan  # a late listing: sleeve rows must follow FrameBuilder's drop_any
+    tickers = tuple(returns.columns)
+    cfg = replace(get_config(), tickers=tickers, weights=m.weights, sleeves=m.sleeves, vol_lookback_weeks=52)
+
+    whatif = WhatIf(cfg, m.sleeves, returns, m.factors)
+    scenario = move_weight(m.weights, tickers[0], tickers[5], 0.1)
+    fast = whatif.run(scenario)
+    full = reference_run(cfg, m.sleeves, returns, m.factors, scenario)
+
+    assert set(fast.exposures) == {"equity_us", "equity_intl"} and fast.regime_summary is not None
+    deviation = max_deviation(fast, full)
+    assert max(deviation.values()) < 1e-8, deviation
+    assert fast.regime_summary["stress_fraction"] == full.regime_summary["stress_fraction"]
+    for regime, stats in full.regime_summary["summary"].items():
+        assert fast.regime_summary["summary"][regime] == pytest.approx(stats, rel=1e-9)
+    base = whatif.run(m.weights)
+    assert not np.allclose(base.exposures["equity_us"]["beta_MKT_RF"], fast.exposures["equity_us"]["beta_MKT_RF"])
+
+    with pytest.raises(ValueError, match="only holds"):
+        move_weight(m.weights, tickers[0], tickers[1], 0.9)
+    with pytest.raises(ValueError, match="Unknown tickers"):
+        whatif.run({"NOPE": 1.0})
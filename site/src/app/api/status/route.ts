@@ -2,44 +2,29 @@ import { NextResponse } from "next/server";
 import fs from "node:fs";
 import path from "node:path";
 
-function load(p: string) {
-  return JSON.parse(fs.readFileSync(p, "utf8"));
-}
-
-function alignByIntersection(exposures: any[], attribution: any[], regimes: any[]) {
-  const Sexp = new Set(exposures.map((d) => d.date));
-  const Satt = new Set(attribution.map((d) => d.date));
-  const Sreg = new Set(regimes.map((d) => d.date));
-  const common = [...Sexp].filter((d) => Satt.has(d) && Sreg.has(d)).sort();
-  const C = new Set(common);
-
-  return {
-    exposures: exposures.filter((x) => C.has(x.date)),
-    attribution: attribution.filter((x) => C.has(x.date)),
-    regimes: regimes.filter((x) => C.has(x.date)),
-    start: common[0] ?? null,
-    end: common[common.length - 1] ?? null,
-  };
-}
-
+// Everything this route reports is in the exporter's manifest (row counts per
+// file, aligned ranges and dropped rows per sleeve), so it reads one small
+// file instead of re-parsing the datasets on every request.
 export async function GET() {
   // Next runs from /site as app root in dev. Use process.cwd()
   const dataDir = path.join(process.cwd(), "public", "data");
-
-  const eUs = load(path.join(dataDir, "exposures_equity_us.json"));
-  const aUs = load(path.join(dataDir, "attribution_equity_us.json"));
-  const r = load(path.join(dataDir, "regimes.json"));
-
-  const aligned = alignByIntersection(eUs, aUs, r);
+  const manifest = JSON.parse(fs.readFileSync(path.join(dataDir, "manifest.json"), "utf8"));
+  const files = manifest.files ?? {};
+  const us = manifest.aligned?.equity_us ?? {};
 
   return NextResponse.json({
-    raw: { exp: eUs.length, att: aUs.length, reg: r.length },
+    raw: {
+      exp: files["exposures_equity_us.json"]?.rows ?? null,
+      att: files["attribution_equity_us.json"]?.rows ?? null,
+      reg: files["regimes.json"]?.rows ?? null,
+    },
     aligned: {
-      exp: aligned.exposures.length,
-      att: aligned.attribution.length,
-      reg: aligned.regimes.length,
-      start: aligned.start,
-      end: aligned.end,
+      exp: us.rows ?? null,
+      att: us.rows ?? null,
+      reg: us.rows ?? null,
+      start: us.start ?? null,
+      end: us.end ?? null,
+      dropped: us.dropped ?? null,
     },
   });
 }
@@ -2,8 +2,8 @@
 
 import React, { useEffect, useMemo, useState } from "react";
 import dynamic from "next/dynamic";
-import { loadJson } from "@/lib/loadJson";
-import { alignByIntersection } from "@/lib/alignByDate";
+import { loadData, loadJson } from "@/lib/loadJson";
+import { fromAlignedBundle, type AlignedBundle } from "@/lib/alignByDate";
 import ConfidenceBands from "@/components/charts/ConfidenceBands";
 import DataQuality from "@/components/panels/DataQuality";
 import { computeConfidenceBands } from "@/utils/calculations/confidence";
@@ -29,12 +29,9 @@ export default function Dashboard() {
   const [regSummary, setRegSummary] = useState<Record<string, Record<string, number>> | null>(null);
   const [showBands, setShowBands] = useState<boolean>(false);
 
-  // Raw (un-aligned) data
-  const [expUs, setExpUs] = useState<ExposureRow[]>([]);
-  const [expIntl, setExpIntl] = useState<ExposureRow[]>([]);
-  const [attUs, setAttUs] = useState<AttribRow[]>([]);
-  const [attIntl, setAttIntl] = useState<AttribRow[]>([]);
-  const [regAll, setRegAll] = useState<RegimeRow[]>([]);
+  // Per-sleeve bundles, aligned on one date axis by the exporter
+  const [alignedUs, setAlignedUs] = useState<AlignedBundle | null>(null);
+  const [alignedIntl, setAlignedIntl] = useState<AlignedBundle | null>(null);
   const [qualityReport, setQualityReport] = useState<QualityReport | null>(null);
   const [manifest, setManifest] = useState<Manifest | null>(null);
 
@@ -46,26 +43,23 @@ export default function Dashboard() {
     (async () => {
       setLoadErr(null);
 
-      const m = await loadJson<Meta>("/data/meta.json");
-      const [eUs, eIntl, aUs, aIntl, rPayload, qReport, manifestPayload] = await Promise.all([
-        loadJson<ExposureRow[]>("/data/exposures_equity_us.json"),
-        loadJson<ExposureRow[]>("/data/exposures_equity_intl.json"),
-        loadJson<AttribRow[]>("/data/attribution_equity_us.json"),
-        loadJson<AttribRow[]>("/data/attribution_equity_intl.json"),
-        loadJson<RegimesPayload>("/data/regimes.json"),
-        loadJson<QualityReport>("/data/quality_report.json"),
-        loadJson<Manifest>("/data/manifest.json"),
+      // The manifest maps each file to its (possibly content-hashed) name, so
+      // it is always fetched fresh; hashed files can then come from the cache.
+      const manifestPayload = await loadJson<Manifest>("/data/manifest.json");
+      const [m, bUs, bIntl, rSummary, qReport] = await Promise.all([
+        loadData<Meta>(manifestPayload, "meta.json"),
+        loadData<AlignedBundle>(manifestPayload, "aligned_equity_us.json"),
+        loadData<AlignedBundle>(manifestPayload, "aligned_equity_intl.json"),
+        loadData<Pick<RegimesPayload, "summary">>(manifestPayload, "regime_summary.json"),
+        loadData<QualityReport>(manifestPayload, "quality_report.json"),
       ]);
 
       if (!alive) return;
 
       setMeta(m);
-      setExpUs(eUs);
-      setExpIntl(eIntl);
-      setAttUs(aUs);
-      setAttIntl(aIntl);
-      setRegAll(rPayload.data ?? []);
-      setRegSummary(rPayload.summary ?? null);
+      setAlignedUs(bUs);
+      setAlignedIntl(bIntl);
+      setRegSummary(rSummary.summary ?? null);
       setQualityReport(qReport ?? null);
       setManifest(manifestPayload ?? null);
     })().catch((err) => {
@@ -78,16 +72,13 @@ export default function Dashboard() {
     };
   }, []);
 
-  const exposureRows = which === "us" ? expUs : expIntl;
-  const attribRows = which === "us" ? attUs : attIntl;
+  const bundle = which === "us" ? alignedUs : alignedIntl;
 
-  // ✅ Align exactly once, based on universe
+  // Already aligned by the exporter; just expand to rows
   const aligned: Aligned = useMemo(() => {
-    if (!exposureRows.length || !attribRows.length || !regAll.length) {
-      return { exposures: [], attribution: [], regimes: [] };
-    }
-    return alignByIntersection(exposureRows, attribRows, regAll) as Aligned;
-  }, [exposureRows, attribRows, regAll]);
+    if (!bundle) return { exposures: [], attribution: [], regimes: [] };
+    return fromAlignedBundle<ExposureRow, AttribRow, RegimeRow>(bundle);
+  }, [bundle]);
 
   // Build regime map from aligned regimes (so it matches plotted dates)
   const regimeByDate = useMemo(() => {
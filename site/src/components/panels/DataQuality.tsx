@@ -38,6 +38,17 @@ export default function DataQuality({ report, lastRefresh }: Props) {
           <div style={{ fontSize: 12, opacity: 0.7 }}>Coverage range</div>
           <div>{tickers.length ? `${report.coverage[tickers[0]]?.start} → ${report.coverage[tickers[0]]?.end}` : "n/a"}</div>
         </div>
+        {report.summary && (
+          <div>
+            <div style={{ fontSize: 12, opacity: 0.7 }}>Flagged</div>
+            <div>
+              {["gaps", "stale_runs", "outliers", "splits", "reversals", "jumps", "unaligned_rows"]
+                .filter((k) => report.summary?.[k])
+                .map((k) => `${report.summary?.[k]} ${k.replace("_", " ")}`)
+                .join(" · ") || "none"}
+            </div>
+          </div>
+        )}
       </div>
 
       <div style={{ display: "grid", gap: 8 }}>
@@ -1,35 +1,40 @@
 // site/src/lib/alignByDate.ts
+//
+// Alignment happens once, in the Python exporter: aligned_<sleeve>.json holds
+// exposures, attribution and regimes on a single shared date axis. This only
+// expands that bundle into row objects for the charts.
 
 type Row = { date: string; [key: string]: any };
 
-export function alignByIntersection<
-  E extends Row,
-  A extends Row,
-  R extends Row
->(exposures: E[], attribution: A[], regimes: R[]) {
-  const Sexp = new Set(exposures.map(d => d.date));
-  const Satt = new Set(attribution.map(d => d.date));
-  const Sreg = new Set(regimes.map(d => d.date));
+type Columns = Record<string, (number | string | null)[]>;
 
-  const commonDates = [...Sexp]
-    .filter(d => Satt.has(d) && Sreg.has(d))
-    .sort();
+export type AlignedBundle = {
+  sleeve: string;
+  dates: string[];
+  rows: number;
+  start: string | null;
+  end: string | null;
+  dropped: { exposures: number; attribution: number; regimes: number };
+  exposures: { columns: Columns; constants?: Record<string, number | string | null> };
+  attribution: { columns: Columns };
+  regimes: { columns: Columns };
+};
 
-  const commonSet = new Set(commonDates);
-
-  const expAligned = exposures.filter(r => commonSet.has(r.date));
-  const attAligned = attribution.filter(r => commonSet.has(r.date));
-  const regAligned = regimes.filter(r => commonSet.has(r.date));
+function rowsOn<T extends Row>(dates: string[], columns: Columns, constants: Record<string, unknown> = {}): T[] {
+  const names = Object.keys(columns);
+  return dates.map((date, i) => {
+    const row: Record<string, unknown> = { date, ...constants };
+    for (const name of names) row[name] = columns[name][i];
+    return row as T;
+  });
+}
 
+export function fromAlignedBundle<E extends Row, A extends Row, R extends Row>(bundle: AlignedBundle) {
   return {
-    dates: commonDates,
-    exposures: expAligned,
-    attribution: attAligned,
-    regimes: regAligned,
-    dropped: {
-      exposures: exposures.length - expAligned.length,
-      attribution: attribution.length - attAligned.length,
-      regimes: regimes.length - regAligned.length,
-    },
+    dates: bundle.dates,
+    exposures: rowsOn<E>(bundle.dates, bundle.exposures.columns, bundle.exposures.constants),
+    attribution: rowsOn<A>(bundle.dates, bundle.attribution.columns),
+    regimes: rowsOn<R>(bundle.dates, bundle.regimes.columns),
+    dropped: bundle.dropped,
   };
 }
@@ -1,5 +1,62 @@
-export async function loadJson<T>(path: string): Promise<T> {
-  const res = await fetch(path, { cache: "no-store" });
+/** URL of an exported file, resolved through the manifest's `files` map when present. */
+export function dataPath(manifest: { files?: Record<string, { file: string }> | null } | null, name: string): string {
+  return `/data/${manifest?.files?.[name]?.file ?? name}`;
+}
+
+/**
+ * Cache mode for an exported file. Content-hashed names (`--hashed-names`)
+ * never change meaning, so they can be served from the HTTP cache; plain
+ * names are revalidated on every load.
+ */
+export function dataCache(manifest: { files?: Record<string, { file: string }> | null } | null, name: string): RequestCache {
+  const file = manifest?.files?.[name]?.file;
+  return file && file !== name ? "force-cache" : "no-cache";
+}
+
+/** Fetch JSON; the default `no-store` suits files that change in place, like manifest.json. */
+export async function loadJson<T>(path: string, cache: RequestCache = "no-store"): Promise<T> {
+  const res = await fetch(path, { cache });
   if (!res.ok) throw new Error(`Failed to load ${path}: ${res.status}`);
   return res.json() as Promise<T>;
 }
+
+/** Load an exported file by its logical name, with the name and cache mode the manifest implies. */
+export function loadData<T>(manifest: { files?: Record<string, { file: string }> | null } | null, name: string): Promise<T> {
+  return loadJson<T>(dataPath(manifest, name), dataCache(manifest, name));
+}
+
+/** Columnar table as written by `--export-layout columnar`. */
+export type ColumnarTable = {
+  dates: string[];
+  columns: Record<string, (number | string | null)[]>;
+  constants?: Record<string, number | string | null>;
+};
+
+/** Accept either export layout and return one object per date. */
+export function toRows<T>(table: T[] | ColumnarTable): T[] {
+  if (Array.isArray(table)) return table;
+  const names = Object.keys(table.columns);
+  return table.dates.map((date, i) => {
+    const row: Record<string, unknown> = { date, ...(table.constants ?? {}) };
+    for (const name of names) row[name] = table.columns[name][i];
+    return row as T;
+  });
+}
+
+export async function loadTable<T>(path: string, cache: RequestCache = "no-store"): Promise<T[]> {
+  return toRows(await loadJson<T[] | ColumnarTable>(path, cache));
+}
+
+/** Expand a packed upper triangle (row-major, diagonal included) into an n x n matrix. */
+export function unpackTriangle<T>(packed: T[], n: number): T[][] {
+  const out: T[][] = Array.from({ length: n }, () => new Array<T>(n));
+  let k = 0;
+  for (let i = 0; i < n; i++) {
+    for (let j = i; j < n; j++) {
+      out[i][j] = packed[k];
+      out[j][i] = packed[k];
+      k++;
+    }
+  }
+  return out;
+}
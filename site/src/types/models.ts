@@ -1,3 +1,5 @@
+import type { ColumnarTable } from "@/lib/loadJson";
+
 export type Meta = {
   tickers: string[];
   weights: Record<string, number>;
@@ -41,11 +43,23 @@ export type RegimesPayload = {
   };
   stress_fraction?: number;
   summary?: Record<string, Record<string, number>>;
-  data: RegimeRow[];
+  data: RegimeRow[] | ColumnarTable;
 };
 
 export type Manifest = {
   build_timestamp?: string;
+  export_layout?: string;
+  /** Per exported file: the name on disk (content-hashed with `--hashed-names`), sha256, size, rows. */
+  files?: Record<string, { file: string; sha256: string; bytes: number; rows: number | null }> | null;
+  /** Arrow IPC copies of the tables, keyed like the JSON files (without extension). */
+  binary?: { format: "arrow-ipc"; files: Record<string, string> } | null;
+  /** Per sleeve: the aligned bundle's file, shared date range and rows dropped per table. */
+  aligned?: Record<
+    string,
+    { file: string; rows: number; start: string | null; end: string | null; dropped: Record<string, number> }
+  > | null;
+  /** Shard index paths per table, when exported with `--shard-by`. */
+  shards?: Record<string, string> | null;
 };
 
 export type QualityReport = {
@@ -59,4 +73,37 @@ export type QualityReport = {
     }
   >;
   aligned_sample_sizes: Record<string, number>;
+  /** Data-quality scan (pipeline `data_quality` stage); absent in older exports. */
+  checks?: Record<string, number | string>;
+  summary?: Record<string, number>;
+  ticker_checks?: Record<
+    string,
+    {
+      missing_pct: number;
+      gap_rows: number;
+      longest_gap: number;
+      stale_rows: number;
+      longest_stale_run: number;
+      outliers: number;
+      splits: number;
+      reversals: number;
+      jumps: number;
+      unaligned_rows: number;
+    }
+  >;
+  issues?: { ticker: string; date: string; kind: "gap" | "stale" | "outlier" | "split" | "reversal" | "jump"; value: number }[];
+  issues_truncated?: boolean;
+};
+
+/** `comovement.json` (pipeline `--comovement`). Matrices are packed upper triangles: see `unpackTriangle`. */
+export type Comovement = {
+  tickers: string[];
+  window: number;
+  min_periods: number;
+  layout: "upper-triangle-row-major";
+  date: string | null;
+  latest: { cov: (number | null)[]; corr: (number | null)[] };
+  /** Average rolling correlation over the dates in each regime. */
+  regimes: Record<string, { dates: number; corr: (number | null)[] }>;
+  betas: { dates: string[]; fields: string[]; tickers: Record<string, Record<string, (number | null)[]>> };
 };
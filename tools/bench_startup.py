@@ -0,0 +1,74 @@
+"""
+Startup benchmark for the pipeline CLI.
+
+Runs `python -m analysis.run_pipeline --dry-run` several times, reports the
+median wall time and the slowest imports (from `-X importtime`), and exits
+non-zero if the median exceeds the target or a heavy dependency was imported.
+
+    python tools/bench_startup.py --target-ms 500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+COMMAND = [sys.executable, "-m", "analysis.run_pipeline", "--dry-run"]
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "statsmodels", "yfinance", "pydantic", "scipy")
+
+
+def time_runs(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(COMMAND, cwd=ROOT, check=True, capture_output=True)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def import_profile(top: int) -> tuple[list[tuple[int, str]], set[str]]:
+    """(slowest top-level imports by cumulative microseconds, heavy packages imported)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *COMMAND[1:]], cwd=ROOT, check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indent><module>"
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), name[1:]))
+    imported = {name.strip().split(".")[0] for _, name in rows}
+    heavy = {m for m in HEAVY_MODULES if m in imported}
+    top_level = [(us, name) for us, name in rows if not name.startswith(" ")]
+    return sorted(top_level, reverse=True)[:top], heavy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark run_pipeline --dry-run startup.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=500.0, help="Fail if the median wall time exceeds this.")
+    parser.add_argument("--top", type=int, default=8, help="How many of the slowest imports to list.")
+    args = parser.parse_args()
+
+    timings = time_runs(args.runs)
+    median = statistics.median(timings)
+    slowest, heavy = import_profile(args.top)
+
+    print(f"--dry-run startup: median {median:.0f} ms over {args.runs} runs (min {min(timings):.0f}, max {max(timings):.0f}); target {args.target_ms:.0f} ms")
+    print("Slowest top-level imports (cumulative):")
+    for us, name in slowest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if median > args.target_ms:
+        failures.append(f"median {median:.0f} ms exceeds target {args.target_ms:.0f} ms")
+    if heavy:
+        failures.append(f"--dry-run imported heavy dependencies: {sorted(heavy)}")
+    if failures:
+        raise SystemExit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
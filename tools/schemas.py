@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -101,41 +101,27 @@ class AttribRow(BaseModel):
         raise ValueError(f"attribution field '{info.field_name}' must be number or null, got {type(v).__name__}")
 
 
-def validate_attrib_keys(rows: List[AttribRow], label: str) -> None:
-    # Ensure all rows share the same key set (common failure mode)
-    if not rows:
-        return
-    base_keys = set(rows[0].__dict__.keys())
-    # includes dynamic keys + 'date'
-    for i, r in enumerate(rows[1:], start=1):
-        k = set(r.__dict__.keys())
-        if k != base_keys:
+def _row_keys(row: Any) -> frozenset:
+    if isinstance(row, dict):
+        return frozenset(row)
+    # pydantic keeps extra="allow" fields (the contrib_* keys) outside __dict__
+    return frozenset(row.__dict__) | frozenset(row.__pydantic_extra__ or ())
+
+
+def validate_attrib_keys(rows: Iterable[Any], label: str) -> None:
+    # Ensure all rows share the same key set (common failure mode); one pass,
+    # works on raw dicts as well as AttribRow models.
+    base_keys = None
+    for i, r in enumerate(rows):
+        k = _row_keys(r)
+        if base_keys is None:
+            base_keys = k
+        elif k != base_keys:
             missing = sorted(base_keys - k)
             extra = sorted(k - base_keys)
+            date = r["date"] if isinstance(r, dict) else r.date
             raise ValueError(
-                f"{label}: key mismatch at row {i} date={r.date}. "
+                f"{label}: key mismatch at row {i} date={date}. "
                 f"missing={missing[:10]} extra={extra[:10]}"
             )
 
-
-def align_by_intersection(
-    exposures: List[ExposureRow],
-    attribution: List[AttribRow],
-    regimes: List[RegimeRow],
-):
-    Sexp = {r.date for r in exposures}
-    Satt = {r.date for r in attribution}
-    Sreg = {r.date for r in regimes}
-
-    common = sorted(Sexp & Satt & Sreg)
-    C = set(common)
-
-    ex = [r for r in exposures if r.date in C]
-    at = [r for r in attribution if r.date in C]
-    rg = [r for r in regimes if r.date in C]
-
-    # enforce aligned lengths & same date set
-    if not (len(ex) == len(at) == len(rg) == len(common)):
-        raise ValueError("alignment produced inconsistent lengths")
-
-    return common, ex, at, rg
@@ -1,75 +1,372 @@
+"""
+Validate the exported site data directory and record the result in manifest.json.
+
+Each dataset is streamed: the file is read in fixed-size chunks and decoded
+one row (or one array element) at a time, and dates are checked for order,
+uniqueness and key sets in a single pass, so memory stays flat however large
+the export is. Datasets are validated concurrently on worker processes.
+
+    python tools/validate_and_manifest.py --jobs 4 --chunk-mb 1
+"""
+import argparse
 import json
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
 from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 
 DATA_DIR = Path("site/public/data")
 
-META = DATA_DIR / "meta.json"
-EXP_US = DATA_DIR / "exposures_equity_us.json"
-EXP_INTL = DATA_DIR / "exposures_equity_intl.json"
-ATT_US = DATA_DIR / "attribution_equity_us.json"
-ATT_INTL = DATA_DIR / "attribution_equity_intl.json"
-REG = DATA_DIR / "regimes.json"
-MANIFEST = DATA_DIR / "manifest.json"
+META = "meta.json"
+MANIFEST = "manifest.json"
+DATASETS = {
+    "exposures_us": "exposures_equity_us.json",
+    "exposures_intl": "exposures_equity_intl.json",
+    "attribution_us": "attribution_equity_us.json",
+    "attribution_intl": "attribution_equity_intl.json",
+    "regimes": "regimes.json",
+    "aligned_us": "aligned_equity_us.json",
+    "aligned_intl": "aligned_equity_intl.json",
+}
+CHUNK_BYTES = 1 << 20
+
+_DECODER = json.JSONDecoder()
+_NON_WS = re.compile(r"[^ \t\n\r]")
+_STRING_ITEM = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*([,\]])')
 
 
 def load_json(path: Path) -> Any:
     return json.loads(path.read_text())
 
 
-def is_sorted_unique(dates: List[str]) -> Tuple[bool, bool]:
-    sorted_ok = dates == sorted(dates)
-    unique_ok = len(dates) == len(set(dates))
-    return sorted_ok, unique_ok
-
-
-def require_list_of_dicts(name: str, obj: Any) -> List[Dict[str, Any]]:
-    if not isinstance(obj, list):
-        raise ValueError(f"{name}: expected list, got {type(obj)}")
-    for i, row in enumerate(obj[:5]):
+class JsonStream:
+    """
+    Incremental reader over one JSON file. Holds at most one chunk plus the
+    value being decoded; arrays and objects are walked element by element
+    (`iter_array`, `iter_object`) instead of being decoded whole.
+    """
+
+    def __init__(self, path: Path, chunk_bytes: int = CHUNK_BYTES):
+        self.path = path
+        self._f = open(path, "r", encoding="utf-8")
+        self._chunk = chunk_bytes
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def close(self) -> None:
+        self._f.close()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(self._chunk)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file), without consuming it."""
+        while True:
+            m = _NON_WS.search(self._buf, self._pos)
+            if m:
+                self._pos = m.start()
+                return self._buf[self._pos]
+            self._pos = len(self._buf)
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"{self.path.name}: expected {ch!r}, got {got or 'end of file'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value (use for rows and scalars, not whole tables)."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number ending exactly at the chunk boundary may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _next(self, close: str) -> bool:
+        ch = self.peek()
+        self._pos += 1
+        if ch == close:
+            return False
+        if ch != ",":
+            raise ValueError(f"{self.path.name}: expected ',' or {close!r}, got {ch or 'end of file'!r}")
+        return True
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self._next("]"):
+                return
+
+    def iter_batches(self) -> Iterator[List[Any]]:
+        """
+        Elements of an array in batches: everything up to the last complete
+        object in the buffer is decoded with one `json.loads` call. Falls back
+        to one element at a time where that doesn't parse (e.g. a '}' inside a
+        string, or elements that aren't objects).
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            cut = self._buf.rfind("}")
+            batch = None
+            if cut > self._pos:
+                try:
+                    batch = json.loads("[" + self._buf[self._pos : cut + 1] + "]")
+                except json.JSONDecodeError:
+                    batch = None
+            if batch is not None:
+                self._pos = cut + 1
+            else:
+                batch = [self.value()]
+            yield batch
+            if not self._next("]"):
+                return
+
+    def iter_strings(self, opened: bool = False) -> Iterator[str]:
+        """Like `iter_array` for an array of plain strings (dates), matched with one regex per item."""
+        if not opened:
+            self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            m = _STRING_ITEM.match(self._buf, self._pos)
+            if m is None:
+                if len(self._buf) - self._pos < 256 and self._fill():
+                    continue
+                # escapes, non-strings or malformed input: decode this item the slow way
+                yield self.value()
+                if not self._next("]"):
+                    return
+                continue
+            self._pos = m.end()
+            yield m.group(1)
+            if m.group(2) == "]":
+                return
+
+    def count_array(self) -> int:
+        """Length of an array of numbers/nulls, counted from its commas instead of decoding each element."""
+        self.expect("[")
+        if self.peek() == '"':
+            return sum(1 for _ in self.iter_strings(opened=True))
+        commas, seen = 0, False
+        while True:
+            end = self._buf.find("]", self._pos)
+            stop = len(self._buf) if end < 0 else end
+            segment = self._buf[self._pos : stop]
+            if '"' in segment or "{" in segment or "[" in segment:
+                raise ValueError(f"{self.path.name}: expected an array of numbers or strings")
+            commas += segment.count(",")
+            seen = seen or bool(segment.strip())
+            self._pos = stop
+            if end >= 0:
+                self._pos += 1
+                return commas + 1 if seen else 0
+            if not self._fill():
+                raise ValueError(f"{self.path.name}: unterminated array")
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield each key; the caller must consume its value before resuming."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if not self._next("}"):
+                return
+
+    def skip(self) -> None:
+        """Consume the next value without materializing containers."""
+        ch = self.peek()
+        if ch == "[":
+            self.expect("[")
+            if self.peek() == "]":
+                self._pos += 1
+                return
+            while True:
+                self.skip()
+                if not self._next("]"):
+                    return
+        elif ch == "{":
+            for _ in self.iter_object():
+                self.skip()
+        else:
+            self.value()
+
+
+_DAYS = date.max.toordinal() + 1
+
+
+class DateCheck:
+    """One pass over a date column: order, duplicates (a fixed-size day bitmap), range."""
+
+    def __init__(self):
+        self.n = 0
+        self.start = None
+        self.end = None
+        self.sorted_ok = True
+        self.unique_ok = True
+        self._seen = bytearray(_DAYS // 8 + 1)
+
+    def add(self, d: str) -> None:
+        if self.end is not None and d < self.end:
+            self.sorted_ok = False
+        try:
+            k = date.fromisoformat(d).toordinal()
+        except ValueError:
+            raise ValueError(f"invalid date format: {d}") from None
+        byte, bit = divmod(k, 8)
+        if self._seen[byte] & (1 << bit):
+            self.unique_ok = False
+        self._seen[byte] |= 1 << bit
+        if self.start is None:
+            self.start = d
+        self.end = d
+        self.n += 1
+
+
+@dataclass
+class Scan:
+    dates: DateCheck = field(default_factory=DateCheck)
+    lengths: Dict[str, int] = field(default_factory=dict)
+    layout: str = ""
+
+
+def _scan_rows(stream: JsonStream, name: str, out: Scan) -> None:
+    out.layout = "rows"
+    base_keys = None
+    i = -1
+    for row in (row for batch in stream.iter_batches() for row in batch):
+        i += 1
         if not isinstance(row, dict):
             raise ValueError(f"{name}: row {i} expected dict, got {type(row)}")
-    return obj  # type: ignore
-
-
-def require_dates(name: str, rows: List[Dict[str, Any]]) -> List[str]:
-    dates = []
-    for i, r in enumerate(rows):
-        if "date" not in r:
+        if "date" not in row:
             raise ValueError(f"{name}: row {i} missing 'date'")
-        if not isinstance(r["date"], str):
+        if not isinstance(row["date"], str):
             raise ValueError(f"{name}: row {i} 'date' must be string")
-        dates.append(r["date"])
-    return dates
-
-
-def align_by_intersection(
-    exposures: List[Dict[str, Any]],
-    attribution: List[Dict[str, Any]],
-    regimes: List[Dict[str, Any]],
-) -> Dict[str, Any]:
-    Sexp = set(r["date"] for r in exposures)
-    Satt = set(r["date"] for r in attribution)
-    Sreg = set(r["date"] for r in regimes)
-
-    common = sorted([d for d in Sexp if d in Satt and d in Sreg])
-    C = set(common)
-
-    exp2 = [r for r in exposures if r["date"] in C]
-    att2 = [r for r in attribution if r["date"] in C]
-    reg2 = [r for r in regimes if r["date"] in C]
-
+        if base_keys is None:
+            base_keys = row.keys()
+        elif row.keys() != base_keys:
+            missing = sorted(set(base_keys) - set(row))
+            extra = sorted(set(row) - set(base_keys))
+            raise ValueError(
+                f"{name}: key mismatch at row {i} date={row['date']}. missing={missing[:10]} extra={extra[:10]}"
+            )
+        out.dates.add(row["date"])
+
+
+_NESTED_TABLES = ("data", "exposures", "attribution", "regimes")
+
+
+def _scan_object(stream: JsonStream, name: str, out: Scan, prefix: str = "") -> None:
+    # columnar tables, the regimes payload and aligned bundles: walk the keys we check, skip the rest
+    for key in stream.iter_object():
+        ch = stream.peek()
+        if key == "dates" and ch == "[":
+            out.layout = out.layout or "columnar"
+            for d in stream.iter_strings():
+                out.dates.add(d)
+        elif key == "columns" and ch == "{":
+            for col in stream.iter_object():
+                out.lengths[f"{prefix}{col}"] = stream.count_array()
+        elif key == "data" and ch == "[":
+            _scan_rows(stream, name, out)
+        elif key in _NESTED_TABLES and ch == "{":
+            _scan_object(stream, name, out, prefix=f"{key}.")
+        else:
+            stream.skip()
+
+
+def validate_dataset(path: Path, name: str, chunk_bytes: int = CHUNK_BYTES) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    out = Scan()
+    stream = JsonStream(path, chunk_bytes)
+    try:
+        root = stream.peek()
+        if root == "[":
+            _scan_rows(stream, name, out)
+        elif root == "{":
+            _scan_object(stream, name, out)
+        if not out.layout:
+            raise ValueError(f"{name}: expected list, got {dict if root == '{' else 'no table'}")
+        if stream.peek():
+            raise ValueError(f"{name}: trailing data after the top-level value")
+    except ValueError as exc:
+        if str(exc).startswith(name):
+            raise
+        raise ValueError(f"{name}: {exc}") from None
+    finally:
+        stream.close()
+
+    dates = out.dates
+    if not dates.sorted_ok or not dates.unique_ok:
+        raise ValueError(f"{name}: dates sorted={dates.sorted_ok}, unique={dates.unique_ok}")
+    bad = {k: n for k, n in out.lengths.items() if n != dates.n}
+    if bad:
+        raise ValueError(f"{name}: aligned lengths mismatch {bad}")
+    seconds = time.perf_counter() - t0
+    size = path.stat().st_size
     return {
-        "exposures": exp2,
-        "attribution": att2,
-        "regimes": reg2,
-        "start": common[0] if common else None,
-        "end": common[-1] if common else None,
-        "aligned_n": len(common),
+        "name": name,
+        "file": path.name,
+        "layout": out.layout,
+        "n": dates.n,
+        "start": dates.start,
+        "end": dates.end,
+        "bytes": size,
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(size / 1e6 / seconds, 1) if seconds else None,
     }
 
 
+def _aligned_info(bundle_path: Path) -> Dict[str, Any]:
+    # dropped counts are a few small values at the top of the bundle
+    stream = JsonStream(bundle_path, chunk_bytes=1 << 14)
+    try:
+        for key in stream.iter_object():
+            if key == "dropped":
+                return stream.value()
+            stream.skip()
+    finally:
+        stream.close()
+    return {}
+
+
 class RegimeCfg(BaseModel):
     vol_window_weeks: int = Field(..., ge=1)
     percentile: float = Field(..., gt=0, lt=1)
@@ -78,7 +375,7 @@ class RegimeCfg(BaseModel):
 
 class Meta(BaseModel):
     tickers: List[str]
-    weights: List[float]
+    weights: Union[Dict[str, float], List[float]]
     frequency: str
     rolling_window_weeks: int = Field(..., ge=1)
     min_nobs: int = Field(..., ge=1)
@@ -98,66 +395,110 @@ class Meta(BaseModel):
         return self
 
 
-def validate_dataset(path: Path, name: str) -> Dict[str, Any]:
-    rows = require_list_of_dicts(name, load_json(path))
-    dates = require_dates(name, rows)
-    sorted_ok, unique_ok = is_sorted_unique(dates)
-    if not sorted_ok or not unique_ok:
-        raise ValueError(f"{name}: dates sorted={sorted_ok}, unique={unique_ok}")
-    return {"rows": rows, "n": len(rows), "start": dates[0], "end": dates[-1]}
+def resolve(data_dir: Path, manifest: Dict[str, Any], filename: str) -> Path:
+    """Path of an exported file, following content-hashed names recorded in the manifest."""
+    entry = (manifest.get("files") or {}).get(filename) or {}
+    return data_dir / entry.get("file", filename)
 
 
-def main():
-    # Validate meta
-    meta_raw = load_json(META)
-    meta = Meta.model_validate(meta_raw)
+def validate_all(data_dir: Path, jobs: int = 1, chunk_bytes: int = CHUNK_BYTES) -> Tuple[Dict[str, Any], float]:
+    manifest_path = data_dir / MANIFEST
+    manifest = load_json(manifest_path) if manifest_path.exists() else {}
+    paths = {name: resolve(data_dir, manifest, filename) for name, filename in DATASETS.items()}
 
-    # Validate datasets
-    exp_us = validate_dataset(EXP_US, "exposures_us")
-    exp_intl = validate_dataset(EXP_INTL, "exposures_intl")
-    att_us = validate_dataset(ATT_US, "attribution_us")
-    att_intl = validate_dataset(ATT_INTL, "attribution_intl")
-    reg = validate_dataset(REG, "regimes")
+    t0 = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {name: pool.submit(validate_dataset, p, name, chunk_bytes) for name, p in paths.items()}
+            results = {name: f.result() for name, f in futures.items()}
+    else:
+        results = {name: validate_dataset(p, name, chunk_bytes) for name, p in paths.items()}
+    for label in ("us", "intl"):
+        results[f"aligned_{label}"]["dropped"] = _aligned_info(paths[f"aligned_{label}"])
+    return results, time.perf_counter() - t0
 
-    # Align US and INTL separately
-    aligned_us = align_by_intersection(exp_us["rows"], att_us["rows"], reg["rows"])
-    aligned_intl = align_by_intersection(exp_intl["rows"], att_intl["rows"], reg["rows"])
 
-    # sanity: aligned counts must match
-    for label, A in [("US", aligned_us), ("INTL", aligned_intl)]:
-        if not (len(A["exposures"]) == len(A["attribution"]) == len(A["regimes"])):
-            raise ValueError(f"{label}: aligned lengths mismatch")
+def _peak_rss_mb() -> float:
+    usage = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
 
-    print("✅ Data validation PASSED\n")
 
-    print("US:")
-    print(f"  raw:     exp={exp_us['n']} att={att_us['n']} reg={reg['n']}")
-    print(f"  aligned: exp={len(aligned_us['exposures'])} att={len(aligned_us['attribution'])} reg={len(aligned_us['regimes'])}")
-    print(f"  range:   {aligned_us['start']} → {aligned_us['end']}\n")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--jobs", type=int, default=4, help="Datasets validated concurrently (default: 4).")
+    parser.add_argument("--chunk-mb", type=float, default=1.0, help="Read size per file (default: 1 MB).")
+    args = parser.parse_args(argv)
+    data_dir = args.data_dir
 
-    print("INTL:")
-    print(f"  raw:     exp={exp_intl['n']} att={att_intl['n']} reg={reg['n']}")
-    print(f"  aligned: exp={len(aligned_intl['exposures'])} att={len(aligned_intl['attribution'])} reg={len(aligned_intl['regimes'])}")
-    print(f"  range:   {aligned_intl['start']} → {aligned_intl['end']}\n")
+    # Validate meta
+    manifest_path = data_dir / MANIFEST
+    manifest = load_json(manifest_path) if manifest_path.exists() else {}
+    meta = Meta.model_validate(load_json(resolve(data_dir, manifest, META)))
+
+    # Validate datasets
+    results, wall = validate_all(data_dir, jobs=args.jobs, chunk_bytes=int(args.chunk_mb * (1 << 20)))
+    reg = results["regimes"]
 
-    manifest = {
+    print("✅ Data validation PASSED\n")
+
+    for label in ("us", "intl"):
+        exp, att, A = results[f"exposures_{label}"], results[f"attribution_{label}"], results[f"aligned_{label}"]
+        print(f"{label.upper()}:")
+        print(f"  raw:     exp={exp['n']} att={att['n']} reg={reg['n']}")
+        print(f"  aligned: exp={A['n']} att={A['n']} reg={A['n']} (dropped {A['dropped']})")
+        print(f"  range:   {A['start']} → {A['end']}\n")
+
+    total_bytes = sum(r["bytes"] for r in results.values())
+    print(f"{'dataset':<18}{'layout':<10}{'rows':>8}{'MB':>9}{'s':>8}{'MB/s':>8}")
+    for r in results.values():
+        print(f"{r['name']:<18}{r['layout']:<10}{r['n']:>8}{r['bytes'] / 1e6:>9.2f}{r['seconds']:>8.3f}{r['mb_per_s'] or 0:>8.1f}")
+    print(
+        f"total {total_bytes / 1e6:.2f} MB in {wall:.3f}s ({total_bytes / 1e6 / wall:.1f} MB/s) "
+        f"on {args.jobs} job(s), peak RSS {_peak_rss_mb():.0f} MB\n"
+    )
+
+    def span(r):
+        return {"start": r["start"], "end": r["end"]}
+
+    validation = {
+        "validated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "meta": meta.model_dump(),
         "raw": {
-            "us": {"exp": exp_us["n"], "att": att_us["n"], "reg": reg["n"], "start": exp_us["start"], "end": exp_us["end"]},
-            "intl": {"exp": exp_intl["n"], "att": att_intl["n"], "reg": reg["n"], "start": exp_intl["start"], "end": exp_intl["end"]},
+            label: {
+                "exp": results[f"exposures_{label}"]["n"],
+                "att": results[f"attribution_{label}"]["n"],
+                "reg": reg["n"],
+                **span(results[f"exposures_{label}"]),
+            }
+            for label in ("us", "intl")
         },
         "aligned": {
-            "us": {"exp": len(aligned_us["exposures"]), "att": len(aligned_us["attribution"]), "reg": len(aligned_us["regimes"]), "start": aligned_us["start"], "end": aligned_us["end"]},
-            "intl": {"exp": len(aligned_intl["exposures"]), "att": len(aligned_intl["attribution"]), "reg": len(aligned_intl["regimes"]), "start": aligned_intl["start"], "end": aligned_intl["end"]},
+            label: {
+                "exp": results[f"aligned_{label}"]["n"],
+                "att": results[f"aligned_{label}"]["n"],
+                "reg": results[f"aligned_{label}"]["n"],
+                **span(results[f"aligned_{label}"]),
+                "dropped": results[f"aligned_{label}"]["dropped"],
+            }
+            for label in ("us", "intl")
+        },
+        "throughput": {
+            "bytes": total_bytes,
+            "seconds": round(wall, 4),
+            "jobs": args.jobs,
+            "datasets": {r["name"]: {k: r[k] for k in ("layout", "bytes", "seconds", "mb_per_s")} for r in results.values()},
         },
         "notes": {
             "alignment_rule": "intersection of dates across exposures, attribution, regimes",
-            "data_dir": str(DATA_DIR),
+            "data_dir": str(data_dir),
         },
     }
 
-    MANIFEST.write_text(json.dumps(manifest, indent=2))
-    print(f"🧾 Wrote manifest: {MANIFEST.resolve()}")
+    # Recorded next to the exporter's manifest entries rather than replacing them.
+    manifest["validation"] = validation
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    print(f"🧾 Wrote manifest: {manifest_path.resolve()}")
 
 
 if __name__ == "__main__":